@@ -1,6 +1,76 @@
+import json
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from plate_discipline import PlateDisciplineCalculator
+from collections import deque
+from tkinter import ttk, messagebox, simpledialog, filedialog
+from diagnostics import DIAGNOSTICS, timed, process_memory
+from jobs import JobRunner
+from metrics import PREDICATE_FIELDS
+# plate_discipline (and everything it pulls in) is imported by the startup job, off the UI thread
+
+DIAGNOSTICS.mark("UI modules imported")
+
+# Hotkey entry mode: key -> (result, in_zone). Rows follow the button layout.
+HOTKEYS = {
+    "1": ("Ball", False),
+    "2": ("Swinging Strike", False),
+    "3": ("Foul", False),
+    "4": ("Dead Ball", False),
+    "5": ("In Play (Safe)", False),
+    "6": ("In Play (Out)", False),
+    "q": ("Called Strike", True),
+    "w": ("Swinging Strike", True),
+    "e": ("Foul", True),
+    "r": ("In Play (Safe)", True),
+    "t": ("In Play (Out)", True),
+}
+
+PITCH_RESULTS = ["Ball", "Called Strike", "Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)", "Dead Ball"]
+
+class PlayerCombobox(ttk.Combobox):
+    """Entry that offers registered players matching what has been typed (press Down to pick)."""
+    NAV_KEYS = ("Up", "Down", "Left", "Right", "Return", "Escape", "Tab")
+
+    def __init__(self, parent, calculator, team_getter=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.calculator = calculator
+        self.team_getter = team_getter
+        self.bind("<KeyRelease>", self.on_key)
+
+    def on_key(self, event):
+        if event.keysym in self.NAV_KEYS:
+            return
+        text = self.get().strip()
+        team = self.team_getter() if self.team_getter else None
+        self["values"] = self.calculator.complete_players(text, team) if text else []
+
+
+def ask_player(root, calculator, title, prompt, team=None):
+    """Modal dialog asking for a player name with autocomplete; returns the name or None."""
+    dialog = tk.Toplevel(root)
+    dialog.title(title)
+    dialog.transient(root)
+    result = {}
+    
+    ttk.Label(dialog, text=prompt).pack(padx=10, pady=(10, 2), anchor="w")
+    var = tk.StringVar()
+    cb = PlayerCombobox(dialog, calculator, team_getter=lambda: team, textvariable=var, width=30)
+    cb.pack(padx=10, pady=2, fill="x")
+    
+    def ok(event=None):
+        result["name"] = var.get().strip()
+        dialog.destroy()
+    
+    btn_f = ttk.Frame(dialog)
+    btn_f.pack(pady=10)
+    ttk.Button(btn_f, text="OK", command=ok).pack(side="left", padx=5)
+    ttk.Button(btn_f, text="Cancel", command=dialog.destroy).pack(side="left", padx=5)
+    cb.bind("<Return>", ok)
+    
+    cb.focus_set()
+    dialog.grab_set()
+    root.wait_window(dialog)
+    return result.get("name") or None
+
 
 class LineupEditor(ttk.Frame):
     def __init__(self, parent, calculator, team_entry=None, pitcher_entry=None):
@@ -15,8 +85,9 @@ class LineupEditor(ttk.Frame):
         ctrl.pack(fill="x", pady=2)
         
         self.add_var = tk.StringVar()
-        # Simple entry for now, or Combobox if we had a large list
-        self.entry = ttk.Entry(ctrl, textvariable=self.add_var)
+        # Suggests registered players, this team's first
+        self.entry = PlayerCombobox(ctrl, calculator, team_getter=lambda: self.team_entry.get() if self.team_entry else None,
+                                    textvariable=self.add_var)
         self.entry.pack(side="left", fill="x", expand=True)
         self.entry.bind("<Return>", lambda e: self.add_player())
         
@@ -62,7 +133,8 @@ class LineupEditor(ttk.Frame):
     def add_player(self):
         name = self.add_var.get().strip()
         if name:
-            self.players.append(name)
+            # Use the registered spelling if this is a known player typed differently
+            self.players.append(self.calculator.resolve_player(name))
             self.add_var.set("")
             self.refresh_list()
             self.entry.focus()
@@ -234,7 +306,7 @@ class PlateDisciplineApp:
         self.style.theme_use('clam')
         self.configure_styles()
 
-        self.calculator = PlateDisciplineCalculator()
+        self.calculator = None # set once the startup job has loaded the data
         
         # State Variables
         self.status_var = tk.StringVar(value="Waiting...")
@@ -242,11 +314,79 @@ class PlateDisciplineApp:
         self.batter_var = tk.StringVar(value="")
         self.pitcher_var = tk.StringVar(value="")
         self.info_var = tk.StringVar(value="")
+        self.save_status_var = tk.StringVar(value="")
+        self.hotkeys_var = tk.BooleanVar(value=False)
+        
+        # Pitch input queue: inputs are applied in order, saved in the background
+        self.input_queue = deque()
+        self._queue_scheduled = False
+        self._save_poll_scheduled = False
+        
+        # Dashboard stats are computed on a worker thread; results come back via root.after
+        self.stats_jobs = JobRunner(self.root.after)
+        self.sequence_jobs = JobRunner(self.root.after) # separate, so the Sequences tab never cancels the stats
+        self.rollup_jobs = JobRunner(self.root.after)
+        self.report_jobs = JobRunner(self.root.after)
+        self.load_jobs = JobRunner(self.root.after)
         
         self.main_container = ttk.Frame(self.root)
         self.main_container.pack(fill="both", expand=True)
         
-        self.show_main_menu()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Show the window right away; data is loaded in the background
+        self.show_loading()
+        self.load_calculator()
+
+    def load_calculator(self):
+        """Import the calculator and load the data on a worker thread, then open the main menu."""
+        def load(job):
+            from plate_discipline import PlateDisciplineCalculator
+            return PlateDisciplineCalculator()
+        
+        def on_done(calculator):
+            self.calculator = calculator
+            DIAGNOSTICS.mark("Data loaded")
+            # Hidden diagnostics panel
+            self.root.bind_all("<Control-Shift-D>", lambda e: self.show_diagnostics())
+            self.show_main_menu()
+            self.root.after_idle(self.startup_done)
+        
+        def on_error(e):
+            messagebox.showerror("Error", f"Failed to load data:\n{e}")
+            self.root.destroy()
+        
+        self.load_jobs.submit(load, on_done, on_error=on_error)
+
+    def startup_done(self):
+        """Runs once the main menu has been drawn."""
+        DIAGNOSTICS.mark("Interactive")
+        self.show_recovery_notes()
+
+    def show_recovery_notes(self):
+        """Tell the user about damaged data files that were replaced from backups."""
+        notes = self.calculator.pop_recovery_notes()
+        if not notes:
+            return
+        lines = []
+        for n in notes:
+            source = f"restored from {n['backup']}" if n["backup"] else "no valid backup found, started empty"
+            lines.append(f"{n['file']}: {n['error']}\n  {source}\n  damaged file kept as {n['moved_to']}")
+        messagebox.showwarning("Data Recovered", "Damaged data was detected:\n\n" + "\n\n".join(lines))
+
+    def on_close(self):
+        """Apply queued inputs and finish pending saves before quitting."""
+        if self.calculator is None:
+            # Still loading: nothing to save yet (file writes are atomic, so stopping a migration is safe)
+            self.root.destroy()
+            return
+        self.process_input_queue()
+        try:
+            self.calculator.close()
+        except OSError as e:
+            if not messagebox.askyesno("Save Error", f"Failed to save data:\n{e}\n\nQuit anyway?"):
+                return
+        self.root.destroy()
 
     def configure_styles(self):
         # NPB Style / Professional
@@ -270,11 +410,28 @@ class PlateDisciplineApp:
         self.style.configure("Yellow.TButton", background="#fff9db", foreground="#e67700", font=("Segoe UI", 12, "bold")) 
 
     def clear_frame(self):
+        self.root.unbind("<Key>")
+        self.stats_jobs.cancel()
+        self.sequence_jobs.cancel()
+        self.rollup_jobs.cancel()
         for widget in self.main_container.winfo_children():
             widget.destroy()
 
     # --- Screens ---
 
+    def show_loading(self):
+        self.clear_frame()
+        frame = ttk.Frame(self.main_container)
+        frame.place(relx=0.5, rely=0.5, anchor="center")
+        
+        ttk.Label(frame, text="Plate Discipline Manager", style="Header.TLabel").pack(pady=30)
+        ttk.Label(frame, text="Loading data...").pack(pady=5)
+        bar = ttk.Progressbar(frame, mode="indeterminate", length=250)
+        bar.pack(pady=10)
+        bar.start(15)
+        # Expose arrives once the window has actually been drawn
+        frame.bind("<Expose>", lambda e: DIAGNOSTICS.mark("First frame"))
+
     def show_main_menu(self):
         self.clear_frame()
         frame = ttk.Frame(self.main_container)
@@ -283,9 +440,12 @@ class PlateDisciplineApp:
         ttk.Label(frame, text="Plate Discipline Manager", style="Header.TLabel").pack(pady=30)
         
         ttk.Button(frame, text="New Game", command=self.show_new_game, width=25).pack(pady=10)
+        open_games = len(self.calculator.get_open_games())
+        if open_games:
+            ttk.Button(frame, text=f"Live Games ({open_games})", command=self.show_game_input, width=25).pack(pady=10)
         ttk.Button(frame, text="Stats Dashboard", command=self.show_dashboard, width=25).pack(pady=10)
         ttk.Button(frame, text="Manage Games", command=self.show_game_list, width=25).pack(pady=10)
-        ttk.Button(frame, text="Exit", command=self.root.quit, width=25).pack(pady=10)
+        ttk.Button(frame, text="Exit", command=self.on_close, width=25).pack(pady=10)
 
     def show_new_game(self):
         self.clear_frame()
@@ -348,6 +508,7 @@ class PlateDisciplineApp:
         ttk.Button(btn_f, text="Start Game", command=self.start_game, width=20).pack()
         ttk.Button(btn_f, text="Cancel", command=self.show_main_menu).pack()
 
+    @timed
     def show_game_list(self):
         self.clear_frame()
         
@@ -356,6 +517,20 @@ class PlateDisciplineApp:
         ttk.Button(h, text="< Back", command=self.show_main_menu).pack(side="left")
         ttk.Label(h, text="Manage Games", style="Header.TLabel").pack(side="left", padx=20)
         
+        # Season / Team Filters
+        filter_f = ttk.Frame(h)
+        filter_f.pack(side="right")
+        
+        ttk.Label(filter_f, text="Season:").pack(side="left")
+        season_var = tk.StringVar(value="All Seasons")
+        season_cb = ttk.Combobox(filter_f, textvariable=season_var, values=["All Seasons"] + self.calculator.get_season_list(), state="readonly", width=15)
+        season_cb.pack(side="left", padx=5)
+        
+        ttk.Label(filter_f, text="Team:").pack(side="left")
+        team_var = tk.StringVar(value="All Teams")
+        team_cb = ttk.Combobox(filter_f, textvariable=team_var, values=["All Teams"] + self.calculator.get_team_list(), state="readonly", width=10)
+        team_cb.pack(side="left", padx=5)
+        
         list_f = ttk.Frame(self.main_container, padding=10)
         list_f.pack(fill="both", expand=True)
         
@@ -378,10 +553,23 @@ class PlateDisciplineApp:
         tree.config(yscrollcommand=sb.set)
         
         # Populate
-        games = self.calculator.get_game_list()
-        for g in games:
-            score_str = f"{g['score_home']} - {g['score_away']}"
-            tree.insert("", "end", iid=g['id'], values=(g['date'], g['season'], g['title'], score_str))
+        def populate():
+            for item in tree.get_children():
+                tree.delete(item)
+            season = season_var.get()
+            team = team_var.get()
+            games = self.calculator.get_game_list(
+                season_filter=None if season == "All Seasons" else season,
+                team_filter=None if team == "All Teams" else team
+            )
+            for g in games:
+                score_str = f"{g['score_home']} - {g['score_away']}"
+                season_str = f"{g['season']} (archived)" if g['archived'] else g['season']
+                tree.insert("", "end", iid=g['id'], values=(g['date'], season_str, g['title'], score_str))
+        
+        season_cb.bind("<<ComboboxSelected>>", lambda e: populate())
+        team_cb.bind("<<ComboboxSelected>>", lambda e: populate())
+        populate()
             
         # Actions
         btn_f = ttk.Frame(self.main_container, padding=10)
@@ -391,6 +579,9 @@ class PlateDisciplineApp:
             sel = tree.selection()
             if not sel: return
             game_id = sel[0]
+            if self.calculator.is_archived_game(game_id):
+                messagebox.showinfo("Info", "Archived games are read-only. Unarchive the season first.")
+                return
             if messagebox.askyesno("Confirm", "Delete this game?"):
                 self.calculator.delete_game(game_id)
                 tree.delete(game_id)
@@ -399,17 +590,127 @@ class PlateDisciplineApp:
             sel = tree.selection()
             if not sel: return
             game_id = sel[0]
+            if self.calculator.is_archived_game(game_id):
+                messagebox.showinfo("Info", "Archived games are read-only. Unarchive the season first.")
+                return
             if self.calculator.load_game(game_id):
                 self.show_game_input()
             else:
                 messagebox.showerror("Error", "Failed to load game.")
 
-        ttk.Button(btn_f, text="Resume/Edit", command=resume_selected).pack(side="left")        
+        def convert_storage():
+            import os
+            target = os.path.splitext(self.calculator.data_file)[0]
+            if not messagebox.askyesno("Confirm", f"Split data into one file per game under '{target}'?\nThe current file is kept as a backup."):
+                return
+            try:
+                self.calculator.convert_storage(target)
+            except OSError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            messagebox.showinfo("Done", "Data converted to sharded storage.")
+            self.show_game_list()
+        
+        def compress_season():
+            season = season_var.get()
+            if season == "All Seasons":
+                messagebox.showinfo("Info", "Select a season to compress.")
+                return
+            if not messagebox.askyesno("Confirm", f"Compress all games of '{season}'?"):
+                return
+            n = self.calculator.compress_season(season)
+            messagebox.showinfo("Done", f"{n} games compressed.")
+
+        def toggle_archive():
+            season = season_var.get()
+            if season == "All Seasons":
+                messagebox.showinfo("Info", "Select a season to archive or unarchive.")
+                return
+            if season in self.calculator.get_archived_seasons():
+                if not messagebox.askyesno("Confirm", f"Unarchive '{season}'? Its games become editable again."):
+                    return
+                n = self.calculator.unarchive_season(season)
+                messagebox.showinfo("Done", f"{n} games restored.")
+            else:
+                if not messagebox.askyesno("Confirm", f"Archive '{season}'? Its games become read-only."):
+                    return
+                try:
+                    n = self.calculator.archive_season(season)
+                except (ValueError, OSError) as e:
+                    messagebox.showerror("Error", str(e))
+                    return
+                messagebox.showinfo("Done", f"{n} games archived.")
+            populate()
+
+        ttk.Button(btn_f, text="Resume/Edit", command=resume_selected).pack(side="left")
         ttk.Button(btn_f, text="Delete Game", command=delete_selected).pack(side="right")
+        ttk.Button(btn_f, text="Archive/Unarchive Season", command=toggle_archive).pack(side="right", padx=5)
+        ttk.Button(btn_f, text="Merge Players", command=self.show_merge_players).pack(side="right", padx=5)
+        if self.calculator.is_sharded():
+            ttk.Button(btn_f, text="Compress Season", command=compress_season).pack(side="right", padx=5)
+        else:
+            ttk.Button(btn_f, text="Split Storage", command=convert_storage).pack(side="right", padx=5)
+        
+        # Sync with other scoring machines through changeset files
+        def export_changes():
+            pending = self.calculator.get_unexported_count()
+            all_games = messagebox.askyesnocancel(
+                "Export Changes", f"{pending} game(s) changed since the last export.\n\n"
+                "Yes: export only those changes\nNo: export every game")
+            if all_games is None:
+                return
+            path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="changes.json",
+                                                filetypes=[("Changeset", "*.json *.json.gz")])
+            if not path: return
+            try:
+                n = self.calculator.export_changeset(path, all_games=not all_games)
+            except OSError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            messagebox.showinfo("Done", f"{n} game(s) exported.")
+        
+        def import_changes():
+            path = filedialog.askopenfilename(filetypes=[("Changeset", "*.json *.json.gz")])
+            if not path: return
+            try:
+                report = self.calculator.import_changeset(path)
+                if report["conflicts"]:
+                    lines = [f"{c['game']['date']} {c['game']['away']} @ {c['game']['home']}: {c['reason']}" for c in report["conflicts"]]
+                    choice = messagebox.askyesnocancel(
+                        "Conflicts", f"{len(lines)} game(s) were changed on both machines:\n\n" + "\n".join(lines[:15]) +
+                        "\n\nYes: take their version\nNo: keep this machine's version\nCancel: leave them for later")
+                    if choice is not None:
+                        settled = self.calculator.import_changeset(path, resolve="theirs" if choice else "mine")
+                        for k in ("added", "updated", "deleted"):
+                            report[k] += settled[k]
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Import failed:\n{e}")
+                return
+            messagebox.showinfo("Done", f"Added {report['added']}, updated {report['updated']}, deleted {report['deleted']}, "
+                                        f"unchanged {report['unchanged']} game(s).")
+            populate()
+        
+        sync_f = ttk.Frame(self.main_container, padding=(10, 0, 10, 10))
+        sync_f.pack(fill="x")
+        ttk.Button(sync_f, text="Import Changes...", command=import_changes).pack(side="right")
+        ttk.Button(sync_f, text="Export Changes...", command=export_changes).pack(side="right", padx=5)
 
+    @timed
     def show_game_input(self):
         self.clear_frame()
         
+        # Games open for input: switch between them without leaving this screen
+        games_f = ttk.Frame(self.main_container, padding=(5, 5, 5, 0))
+        games_f.pack(fill="x")
+        ttk.Label(games_f, text="Game:").pack(side="left")
+        self.open_game_var = tk.StringVar()
+        self.open_game_cb = ttk.Combobox(games_f, textvariable=self.open_game_var, state="readonly", width=45)
+        self.open_game_cb.pack(side="left", padx=5)
+        self.open_game_cb.bind("<<ComboboxSelected>>", lambda e: self.switch_game())
+        ttk.Button(games_f, text="+ Game", command=self.show_new_game).pack(side="left", padx=2)
+        ttk.Button(games_f, text="Close Game", command=self.close_game).pack(side="left", padx=2)
+        self.refresh_open_games()
+        
         # Header (Scoreboard) - Reduce padding
         header = ttk.Frame(self.main_container, padding=5)
         header.pack(fill="x")
@@ -489,15 +790,126 @@ class PlateDisciplineApp:
         ttk.Button(ctrl, text="Change Batter (PH)", command=self.change_batter).pack(side="left", expand=True, fill="x", padx=2)
         ttk.Button(ctrl, text="Change Pitcher", command=self.change_pitcher).pack(side="left", expand=True, fill="x", padx=2)
         ttk.Button(ctrl, text="Runner Out", command=self.runner_out).pack(side="left", expand=True, fill="x", padx=2)
+        ttk.Button(ctrl, text="Edit Pitches", command=self.show_pitch_editor).pack(side="left", expand=True, fill="x", padx=2)
         ttk.Button(ctrl, text="Undo", command=self.undo_last_action).pack(side="left", expand=True, fill="x", padx=2)
         ttk.Button(ctrl, text="End Game", command=self.show_main_menu).pack(side="right", expand=True, fill="x", padx=2)
+        
+        # Hotkey entry mode
+        hk = ttk.Frame(self.main_container, padding=(5, 0, 5, 5))
+        hk.pack(fill="x")
+        ttk.Checkbutton(hk, text="Hotkeys", variable=self.hotkeys_var).pack(side="left")
+        ttk.Label(hk, text="Out: 1 Ball 2 Swing 3 Foul 4 Dead 5 Hit 6 Out | In: Q Called W Swing E Foul R Hit T Out | BkSp Undo",
+                  font=("Segoe UI", 9), foreground="#868e96").pack(side="left", padx=5)
+        ttk.Label(hk, textvariable=self.save_status_var, font=("Segoe UI", 9), foreground="#868e96").pack(side="right")
+        
+        self.root.bind("<Key>", self.on_hotkey)
 
-    def undo_last_action(self):
-        if self.calculator.undo():
+    def refresh_open_games(self):
+        """Fill the game switcher with the open games (label -> game id)."""
+        if not hasattr(self, 'open_game_cb') or not self.open_game_cb.winfo_exists():
+            return
+        self.open_game_ids = {}
+        current = ""
+        for i, g in enumerate(self.calculator.get_open_games(), 1):
+            half = "Top" if g["is_top"] else "Bot"
+            label = f"{i}. {g['away']} @ {g['home']} ({half} {g['inning']})"
+            self.open_game_ids[label] = g["id"]
+            if g["active"]:
+                current = label
+        self.open_game_cb["values"] = list(self.open_game_ids)
+        self.open_game_var.set(current)
+
+    def switch_game(self):
+        game_id = self.open_game_ids.get(self.open_game_var.get())
+        # Inputs still queued belong to the game they were made for
+        self.process_input_queue()
+        if game_id and self.calculator.switch_game(game_id):
             self.update_game_ui_state()
+        self.refresh_open_games()
+
+    def close_game(self):
+        self.process_input_queue()
+        self.calculator.close_game()
+        if self.calculator.current_game:
+            self.update_game_ui_state()
+            self.refresh_open_games()
         else:
+            self.show_main_menu()
+
+    def on_hotkey(self, event):
+        if not self.hotkeys_var.get():
+            return
+        if event.state & 0x4: # Control held: leave shortcuts alone
+            return
+        if event.keysym == "BackSpace":
+            self.enqueue_input(("undo", False))
+            return
+        key = HOTKEYS.get(event.char.lower())
+        if key:
+            self.enqueue_input(("pitch",) + key)
+
+    def enqueue_input(self, action):
+        """Queue an input; the queue is drained on the next idle cycle."""
+        self.input_queue.append(action)
+        if not self._queue_scheduled:
+            self._queue_scheduled = True
+            self.root.after_idle(self.process_input_queue)
+
+    @timed
+    def process_input_queue(self):
+        """Apply queued inputs in order from memory, refresh the UI once, then save in the background."""
+        self._queue_scheduled = False
+        if not self.input_queue:
+            return
+        
+        nothing_to_undo = False
+        with self.calculator.deferred_saves():
+            while self.input_queue:
+                action = self.input_queue.popleft()
+                kind = action[0]
+                if kind == "pitch":
+                    s = self.calculator.get_game_state()
+                    if not s:
+                        self.input_queue.clear()
+                        break
+                    _, result, in_zone = action
+                    # Auto-detect first pitch: balls=0, strikes=0
+                    is_first = (s['balls'] == 0 and s['strikes'] == 0)
+                    zone = "In" if in_zone else "Out"
+                    self.calculator.log_pitch(zone, result, is_first)
+                elif kind == "undo":
+                    if not self.calculator.undo():
+                        nothing_to_undo = nothing_to_undo or action[1]
+                elif kind == "runner_out":
+                    self.calculator.record_runner_out()
+        
+        self.update_game_ui_state()
+        self.calculator.flush(background=True)
+        if not self._save_poll_scheduled:
+            self.poll_save_status()
+        
+        if nothing_to_undo:
             messagebox.showinfo("Info", "Nothing to undo.")
 
+    def poll_save_status(self):
+        """Show 'Saving...' until the background writer is idle; report write errors."""
+        self._save_poll_scheduled = False
+        err = self.calculator.pop_save_error()
+        if err:
+            self.save_status_var.set("Save failed")
+            messagebox.showerror("Save Error", f"Failed to save data:\n{err}")
+            return
+        if self.calculator.has_pending_saves():
+            self.save_status_var.set("Saving...")
+            self._save_poll_scheduled = True
+            self.root.after(200, self.poll_save_status)
+        else:
+            self.save_status_var.set("Saved")
+
+    def undo_last_action(self):
+        self.enqueue_input(("undo", True))
+
+    @timed
     def show_dashboard(self):
         self.clear_frame()
         
@@ -520,6 +932,24 @@ class PlateDisciplineApp:
         cb.pack(side="left", padx=5)
         cb.bind("<<ComboboxSelected>>", lambda e: self.update_dashboard_stats())
         
+        # Raw rates, or relative to the league (plus / percentile among qualified players)
+        ttk.Label(filter_f, text="View:").pack(side="left", padx=(10, 0))
+        self.stat_view_var = tk.StringVar(value="Raw")
+        view_cb = ttk.Combobox(filter_f, textvariable=self.stat_view_var, values=list(self.STAT_VIEWS), state="readonly", width=12)
+        view_cb.pack(side="left", padx=5)
+        view_cb.bind("<<ComboboxSelected>>", lambda e: self.update_dashboard_stats())
+        
+        ttk.Label(filter_f, text="Min PA:").pack(side="left")
+        self.min_pa_var = tk.IntVar(value=10)
+        ttk.Spinbox(filter_f, from_=0, to=1000, textvariable=self.min_pa_var, width=5,
+                    command=self.update_dashboard_stats).pack(side="left", padx=5)
+        
+        ttk.Button(filter_f, text="Export Pitches", command=self.show_export_dialog).pack(side="left", padx=5)
+        ttk.Button(filter_f, text="Custom Metrics", command=self.show_custom_metrics).pack(side="left")
+        ttk.Button(filter_f, text="HTML Report", command=self.export_report).pack(side="left", padx=5)
+        
+        self.create_filter_bar()
+        
         # Notebook for Tabs
         nb = ttk.Notebook(self.main_container)
         nb.pack(fill="both", expand=True, padx=10, pady=10)
@@ -527,8 +957,13 @@ class PlateDisciplineApp:
         tab_batter = ttk.Frame(nb)
         tab_pitcher = ttk.Frame(nb)
         
+        tab_rollup = ttk.Frame(nb)
+        tab_sequence = ttk.Frame(nb)
+        
         nb.add(tab_batter, text="Batter Stats")
         nb.add(tab_pitcher, text="Pitcher Stats")
+        nb.add(tab_rollup, text="Team / Lineup")
+        nb.add(tab_sequence, text="Sequences")
         
         # Columns (Updated v6.0)
         cols = [
@@ -538,6 +973,10 @@ class PlateDisciplineApp:
             "Zone%", "F-Strike%", "Whiff%", 
             "Put Away%", "SwStr%", "CStr%", "CSW%"
         ]
+        base_cols = list(cols)
+        # User-defined metrics get a column each, after the built-in ones
+        self.custom_metric_cols = [(m["name"], m.get("percent", True)) for m in self.calculator.get_custom_metrics()]
+        cols += [name for name, _percent in self.custom_metric_cols]
         
         def create_table(parent, role):
             tree = ttk.Treeview(parent, columns=cols, show="headings", selectmode="extended")
@@ -547,10 +986,11 @@ class PlateDisciplineApp:
                 l = [(tree.set(k, col), k) for k in tree.get_children('')]
                 
                 def convert(val):
+                    # Numbers before text ("-" for unranked / empty values)
                     try:
-                        return float(val.replace("%", "").strip())
+                        return (0, float(val.replace("%", "").strip()), "")
                     except ValueError:
-                        return val
+                        return (1, 0.0, val)
                 
                 l.sort(key=lambda t: convert(t[0]), reverse=reverse)
                 
@@ -577,30 +1017,7 @@ class PlateDisciplineApp:
             parent.grid_rowconfigure(0, weight=1)
             parent.grid_columnconfigure(0, weight=1)
             
-            # Populate
-            stats = self.calculator.get_aggregate_stats(role)
-            for name, s in stats.items():
-                vals = [name]
-                # Helper to format %
-                def f(k): return s[k] if isinstance(s[k], str) else f"{s[k]:.1f}%"
-                
-                vals.append(s["PA"])
-                vals.append(s["Pitches"])
-                vals.append(f("Swing%"))
-                vals.append(f("O-Swing%"))
-                vals.append(f("Z-Swing%"))
-                vals.append(f("Contact%"))
-                vals.append(f("O-Contact%"))
-                vals.append(f("Z-Contact%"))
-                vals.append(f("Zone%"))
-                vals.append(f("F-Strike%"))
-                vals.append(f("Whiff%"))
-                vals.append(f("Put Away%"))
-                vals.append(f("SwStr%"))
-                vals.append(f("CStr%"))
-                vals.append(f("CSW%"))
-                
-                tree.insert("", "end", values=vals)
+            # Rows are filled by update_dashboard_stats (off the UI thread)
             
             # Right-click Context Menu for Copy
             menu = tk.Menu(tree, tearoff=0)
@@ -664,23 +1081,163 @@ class PlateDisciplineApp:
             "batter": create_table(tab_batter, "batter"),
             "pitcher": create_table(tab_pitcher, "pitcher")
         }
+        self.create_rollup_tab(tab_rollup, base_cols[1:])
+        self.create_sequence_tab(tab_sequence)
         
         self.update_dashboard_stats()
 
+    def create_filter_bar(self):
+        """Second dashboard header row: date range, team, opponent, innings, side, starter/reliever."""
+        bar = ttk.Frame(self.main_container, padding=(10, 0))
+        bar.pack(fill="x")
+        teams = [""] + self.calculator.get_team_list()
+        innings = [""] + [str(i) for i in range(1, 16)]
+        
+        self.filter_vars = {k: tk.StringVar() for k in ("date_from", "date_to", "team", "opponent", "inning_from", "inning_to")}
+        self.filter_vars["home_away"] = tk.StringVar(value="All")
+        self.filter_vars["pitcher_role"] = tk.StringVar(value="All")
+        
+        def field(label, key, values=None, width=10):
+            ttk.Label(bar, text=label).pack(side="left", padx=(5, 0))
+            if values is None:
+                w = ttk.Entry(bar, textvariable=self.filter_vars[key], width=width)
+                w.bind("<Return>", lambda e: self.update_dashboard_stats())
+            else:
+                w = ttk.Combobox(bar, textvariable=self.filter_vars[key], values=values, state="readonly", width=width)
+                w.bind("<<ComboboxSelected>>", lambda e: self.update_dashboard_stats())
+            w.pack(side="left", padx=2)
+        
+        field("Date:", "date_from")
+        field("-", "date_to")
+        field("Team:", "team", teams, 10)
+        field("Opp:", "opponent", teams, 10)
+        field("Inn:", "inning_from", innings, 3)
+        field("-", "inning_to", innings, 3)
+        field("Side:", "home_away", ["All", "Home", "Away"], 6)
+        field("Pitcher:", "pitcher_role", ["All", "Starter", "Reliever"], 8)
+        
+        def clear():
+            for k, v in self.filter_vars.items():
+                v.set("All" if k in ("home_away", "pitcher_role") else "")
+            self.update_dashboard_stats()
+        
+        ttk.Button(bar, text="Apply", command=self.update_dashboard_stats).pack(side="left", padx=5)
+        ttk.Button(bar, text="Clear", command=clear).pack(side="left")
+        
+        # Progress of the background stats job
+        self.stats_status_var = tk.StringVar(value="")
+        self.stats_progress = ttk.Progressbar(bar, mode="determinate", length=100, maximum=1.0)
+        ttk.Label(bar, textvariable=self.stats_status_var, foreground="#868e96").pack(side="right", padx=5)
+    
+    def get_dashboard_filters(self):
+        """Filters from the filter bar in the calculator's format (see STAT_FILTERS); bad dates are ignored."""
+        from datetime import datetime
+        v = {k: var.get().strip() for k, var in self.filter_vars.items()}
+        filters = {}
+        for k in ("date_from", "date_to"):
+            if v[k]:
+                try:
+                    filters[k] = datetime.strptime(v[k], "%Y-%m-%d").strftime("%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("Filter", f"Dates must be YYYY-MM-DD: {v[k]}")
+        for k in ("team", "opponent"):
+            if v[k]:
+                filters[k] = v[k]
+        for k in ("inning_from", "inning_to"):
+            if v[k]:
+                filters[k] = int(v[k])
+        if v["home_away"] != "All":
+            filters["home_away"] = v["home_away"].lower()
+        if v["pitcher_role"] != "All":
+            filters["pitcher_role"] = v["pitcher_role"].lower()
+        return filters
+
+    # Dashboard value views: raw rates, plus (100 = league average), percentile among qualified
+    # players, empirical-Bayes shrunk rates, and 95% Wilson intervals
+    STAT_VIEWS = {"Raw": None, "Plus (100=Avg)": "plus", "Percentile": "percentile", "Shrunk (EB)": "shrunk", "95% CI": "ci"}
+
     def update_dashboard_stats(self):
+        """
+        Recompute the dashboard for the current season / view / filters on the worker thread.
+        A newer request (e.g. another filter change) cancels the one still running.
+        """
         season = self.season_var.get()
         season_filter = None if season == "All Seasons" else season
-        
+        view = self.STAT_VIEWS.get(self.stat_view_var.get())
+        filters = self.get_dashboard_filters()
+        try:
+            min_pa = max(0, int(self.min_pa_var.get()))
+        except (tk.TclError, ValueError):
+            min_pa = 0
+        roles = list(self.stats_trees)
+        version = self.calculator.data_version
+        
+        def compute(job):
+            calc = self.calculator
+            calc.warm_stats(season_filter, filters, progress=job.progress)
+            results = {}
+            for role in roles:
+                job.check()
+                stats = calc.get_aggregate_stats(role, season_filter, filters)
+                relative = None
+                intervals = None
+                if view in ("plus", "percentile"):
+                    relative = calc.get_relative_stats(role, season_filter, min_pa=min_pa, filters=filters)
+                elif view:
+                    intervals = calc.get_interval_stats(role, season_filter, filters=filters)
+                custom = calc.get_custom_stats(role, season_filter, filters)
+                results[role] = (stats, relative, intervals, custom)
+            return results
+        
+        def on_progress(done, total):
+            if not self.stats_progress.winfo_ismapped():
+                self.stats_progress.pack(side="right", padx=5)
+            self.stats_progress["value"] = done / total if total else 0
+            self.stats_status_var.set(f"Computing... {done}/{total} games")
+        
+        def on_error(e):
+            self.stats_done()
+            messagebox.showerror("Error", f"Failed to compute stats:\n{e}")
+        
+        def on_done(results):
+            if self.calculator.data_version != version:
+                # Games changed while the job ran (a pitch edit, a merge): run again on the new data
+                self.update_dashboard_stats()
+                return
+            self.show_dashboard_stats(results, view)
+        
+        self.stats_status_var.set("Computing...")
+        self.stats_jobs.submit(compute, on_done, on_progress=on_progress, on_error=on_error)
+
+    def stats_done(self):
+        self.stats_progress.pack_forget()
+        self.stats_status_var.set("")
+
+    @timed
+    def show_dashboard_stats(self, results, view):
+        """Fill the stat tables with a finished job's results (UI thread)."""
+        self.stats_done()
         for role, tree in self.stats_trees.items():
             # Clear current
             for item in tree.get_children():
                 tree.delete(item)
-                
-            stats = self.calculator.get_aggregate_stats(role, season_filter)
             
+            stats, relative, intervals, custom = results[role]
             for player, d in stats.items():
-                 # Helper to format %
-                def f(k): return d[k] if isinstance(d[k], str) else f"{d[k]:.1f}%"
+                if relative:
+                    rel = relative[view].get(player)
+                    if rel is None:
+                        continue # Below the PA threshold: not ranked
+                    def f(k): return "-" if rel[k] is None else f"{rel[k]:.0f}"
+                elif view == "shrunk":
+                    est = intervals["shrunk"][player]
+                    def f(k): return "-" if est[k] is None else f"{est[k]:.1f}%"
+                elif view == "ci":
+                    lo, hi = intervals["low"][player], intervals["high"][player]
+                    def f(k): return "-" if lo[k] is None else f"{lo[k]:.0f}-{hi[k]:.0f}%"
+                else:
+                    # Helper to format %
+                    def f(k): return d[k] if isinstance(d[k], str) else f"{d[k]:.1f}%"
                 
                 vals = (
                     player, d["PA"], d["Pitches"],
@@ -689,10 +1246,682 @@ class PlateDisciplineApp:
                     f("Zone%"), f("F-Strike%"), f("Whiff%"),
                     f("Put Away%"), f("SwStr%"), f("CStr%"), f("CSW%")
                 )
+                extra = custom.get(player, {})
+                for name, percent in self.custom_metric_cols:
+                    v = extra.get(name)
+                    vals += ("-" if v is None else f"{v:.1f}%" if percent else f"{v:.3f}",)
                 tree.insert("", "end", values=vals)
+            
+            if relative:
+                league = relative["league"]
+                vals = ["League Avg", league["PA"], league["Pitches"]] + [f"{league[k]:.1f}%" for k in self.calculator.RATE_STATS]
+                tree.insert("", 0, values=vals, tags=("league",))
+                tree.tag_configure("league", foreground="#868e96")
+        
+        self.refresh_rollup()
+        self.refresh_sequences()
+
+    # Rollup levels shown in the Team / Lineup tab, and where a double-click drills to
+    ROLLUP_LEVEL_NAMES = {"League": "league", "Season": "season", "Team": "team", "Player": "player", "Lineup Slot": "slot"}
+    ROLLUP_DRILL = {"league": "season", "season": "team", "team": "player"}
+
+    def create_rollup_tab(self, parent, stat_cols):
+        """League > season > team > player rollups (and lineup slots) with double-click drill-down."""
+        ctrl = ttk.Frame(parent, padding=5)
+        ctrl.grid(row=0, column=0, columnspan=2, sticky="ew")
+        
+        ttk.Label(ctrl, text="Role:").pack(side="left")
+        self.rollup_role_var = tk.StringVar(value="Batter")
+        role_cb = ttk.Combobox(ctrl, textvariable=self.rollup_role_var, values=["Batter", "Pitcher"], state="readonly", width=8)
+        role_cb.pack(side="left", padx=5)
+        
+        ttk.Label(ctrl, text="Level:").pack(side="left")
+        self.rollup_level_var = tk.StringVar(value="Team")
+        level_cb = ttk.Combobox(ctrl, textvariable=self.rollup_level_var, values=list(self.ROLLUP_LEVEL_NAMES), state="readonly", width=12)
+        level_cb.pack(side="left", padx=5)
+        
+        ttk.Button(ctrl, text="Up", command=self.rollup_up).pack(side="left", padx=5)
+        self.rollup_path_var = tk.StringVar(value="")
+        ttk.Label(ctrl, textvariable=self.rollup_path_var, font=("Segoe UI", 10)).pack(side="left", padx=5)
+        self.rollup_status_var = tk.StringVar(value="")
+        ttk.Label(ctrl, textvariable=self.rollup_status_var, foreground="#868e96").pack(side="right", padx=5)
+        
+        # Drill-down filters (season / team picked by double-click)
+        self.rollup_drill = {"season": None, "team": None}
+        
+        cols = ["Group"] + stat_cols
+        tree = ttk.Treeview(parent, columns=cols, show="headings", selectmode="browse")
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=220 if c == "Group" else 60, anchor="w" if c == "Group" else "center")
+        
+        vsb = ttk.Scrollbar(parent, orient="vertical", command=tree.yview)
+        hsb = ttk.Scrollbar(parent, orient="horizontal", command=tree.xview)
+        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        tree.grid(row=1, column=0, sticky="nsew")
+        vsb.grid(row=1, column=1, sticky="ns")
+        hsb.grid(row=2, column=0, sticky="ew")
+        parent.grid_rowconfigure(1, weight=1)
+        parent.grid_columnconfigure(0, weight=1)
+        
+        self.rollup_tree = tree
+        self.rollup_keys = {}
+        
+        role_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh_rollup())
+        level_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh_rollup())
+        tree.bind("<Double-1>", self.rollup_drill_down)
+
+    def refresh_rollup(self):
+        """Refill the Team / Lineup tab; the rollup is computed on a worker thread."""
+        if not hasattr(self, 'rollup_tree') or not self.rollup_tree.winfo_exists():
+            return
+        level = self.ROLLUP_LEVEL_NAMES[self.rollup_level_var.get()]
+        role = self.rollup_role_var.get().lower()
+        season = self.season_var.get()
+        season_filter = self.rollup_drill["season"] or (None if season == "All Seasons" else season)
+        
+        path = [f"Season: {season_filter}" if season_filter else "All Seasons"]
+        if self.rollup_drill["team"]:
+            path.append(f"Team: {self.rollup_drill['team']}")
+        self.rollup_path_var.set(" > ".join(path))
+        
+        calc = self.calculator
+        version = calc.data_version
+        team = self.rollup_drill["team"]
+        
+        def on_done(stats):
+            if calc.data_version != version:
+                self.refresh_rollup() # Games changed meanwhile
+                return
+            self.rollup_status_var.set("")
+            self.show_rollup(stats)
+        
+        def on_error(e):
+            self.rollup_status_var.set("")
+            messagebox.showerror("Error", f"Failed to compute rollups:\n{e}")
+        
+        self.rollup_status_var.set("Computing...")
+        self.rollup_jobs.submit(lambda job: calc.get_rollup_stats(level, role, season_filter, team), on_done, on_error=on_error)
+
+    @timed
+    def show_rollup(self, stats):
+        """Fill the Team / Lineup tab with a finished job's rollup (UI thread)."""
+        tree = self.rollup_tree
+        for item in tree.get_children():
+            tree.delete(item)
+        self.rollup_keys = {}
+        for key, d in sorted(stats.items(), key=lambda kv: [str(k) for k in kv[0]]):
+            def f(k): return f"{d[k]:.1f}%"
+            label = " / ".join(str(k) for k in key) or "League"
+            vals = (
+                label, d["PA"], d["Pitches"],
+                f("Swing%"), f("O-Swing%"), f("Z-Swing%"),
+                f("Contact%"), f("O-Contact%"), f("Z-Contact%"),
+                f("Zone%"), f("F-Strike%"), f("Whiff%"),
+                f("Put Away%"), f("SwStr%"), f("CStr%"), f("CSW%")
+            )
+            item = tree.insert("", "end", values=vals)
+            self.rollup_keys[item] = key
+
+    def rollup_drill_down(self, event):
+        item = self.rollup_tree.identify_row(event.y)
+        if not item: return
+        level = self.ROLLUP_LEVEL_NAMES[self.rollup_level_var.get()]
+        target = self.ROLLUP_DRILL.get(level)
+        if not target: return
+        
+        fields = self.calculator.ROLLUP_LEVELS[level]
+        key = dict(zip(fields, self.rollup_keys[item]))
+        if "season" in key:
+            self.rollup_drill["season"] = key["season"]
+        if "team" in key:
+            self.rollup_drill["team"] = key["team"]
+        
+        names = {v: k for k, v in self.ROLLUP_LEVEL_NAMES.items()}
+        self.rollup_level_var.set(names[target])
+        self.refresh_rollup()
+
+    def rollup_up(self):
+        names = {v: k for k, v in self.ROLLUP_LEVEL_NAMES.items()}
+        if self.rollup_drill["team"]:
+            self.rollup_drill["team"] = None
+            self.rollup_level_var.set(names["team"])
+        elif self.rollup_drill["season"]:
+            self.rollup_drill["season"] = None
+            self.rollup_level_var.set(names["season"])
+        else:
+            self.rollup_level_var.set(names["league"])
+        self.refresh_rollup()
+
+    ALL_PLAYERS = "(All Players)"
+
+    def create_sequence_tab(self, parent):
+        """Swing decisions after each kind of pitch, and the most common pitch sequences, per player."""
+        ctrl = ttk.Frame(parent, padding=5)
+        ctrl.pack(fill="x")
+        
+        ttk.Label(ctrl, text="Role:").pack(side="left")
+        self.seq_role_var = tk.StringVar(value="Batter")
+        role_cb = ttk.Combobox(ctrl, textvariable=self.seq_role_var, values=["Batter", "Pitcher"], state="readonly", width=8)
+        role_cb.pack(side="left", padx=5)
+        
+        ttk.Label(ctrl, text="Player:").pack(side="left")
+        self.seq_player_var = tk.StringVar(value=self.ALL_PLAYERS)
+        self.seq_player_cb = ttk.Combobox(ctrl, textvariable=self.seq_player_var, state="readonly", width=20)
+        self.seq_player_cb.pack(side="left", padx=5)
+        
+        ttk.Label(ctrl, text="Length:").pack(side="left")
+        self.seq_len_var = tk.IntVar(value=2)
+        ttk.Spinbox(ctrl, from_=1, to=self.calculator.SEQUENCE_MAX_N, textvariable=self.seq_len_var, width=3,
+                    state="readonly", command=self.refresh_sequences).pack(side="left", padx=5)
+        self.seq_status_var = tk.StringVar(value="")
+        ttk.Label(ctrl, textvariable=self.seq_status_var, foreground="#868e96").pack(side="right", padx=5)
+        
+        panes = ttk.Frame(parent)
+        panes.pack(fill="both", expand=True)
+        panes.grid_columnconfigure(0, weight=1)
+        panes.grid_columnconfigure(1, weight=1)
+        panes.grid_rowconfigure(1, weight=1)
+        
+        ttk.Label(panes, text="Next pitch after...", font=("Segoe UI", 10, "bold")).grid(row=0, column=0, sticky="w", padx=5)
+        ttk.Label(panes, text="Most common sequences", font=("Segoe UI", 10, "bold")).grid(row=0, column=1, sticky="w", padx=5)
+        
+        after_cols = ["Pitch", "Next", "Zone%", "Swing%", "Z-Swing%", "O-Swing%"]
+        after = ttk.Treeview(panes, columns=after_cols, show="headings", selectmode="browse")
+        for c in after_cols:
+            after.heading(c, text=c)
+            after.column(c, width=160 if c == "Pitch" else 60, anchor="w" if c == "Pitch" else "center")
+        after.grid(row=1, column=0, sticky="nsew", padx=5)
+        
+        seq_cols = ["Sequence", "Count", "Share%"]
+        seqs = ttk.Treeview(panes, columns=seq_cols, show="headings", selectmode="browse")
+        for c in seq_cols:
+            seqs.heading(c, text=c)
+            seqs.column(c, width=360 if c == "Sequence" else 60, anchor="w" if c == "Sequence" else "center")
+        vsb = ttk.Scrollbar(panes, orient="vertical", command=seqs.yview)
+        seqs.configure(yscrollcommand=vsb.set)
+        seqs.grid(row=1, column=1, sticky="nsew", padx=(5, 0))
+        vsb.grid(row=1, column=2, sticky="ns")
+        
+        self.seq_after_tree = after
+        self.seq_tree = seqs
+        
+        def on_role(event):
+            self.seq_player_var.set(self.ALL_PLAYERS)
+            self.refresh_sequences()
+        role_cb.bind("<<ComboboxSelected>>", on_role)
+        self.seq_player_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh_sequences())
+
+    def refresh_sequences(self):
+        """Refill the Sequences tab; the tables are built (or read from cache) on a worker thread."""
+        if not hasattr(self, 'seq_tree') or not self.seq_tree.winfo_exists():
+            return
+        role = self.seq_role_var.get().lower()
+        season = self.season_var.get()
+        season_filter = None if season == "All Seasons" else season
+        selected = self.seq_player_var.get()
+        try:
+            n = int(self.seq_len_var.get())
+        except (tk.TclError, ValueError):
+            n = 2
+        calc = self.calculator
+        version = calc.data_version
+        
+        def compute(job):
+            players = sorted(calc.get_aggregate_stats(role, season_filter))
+            player = selected if selected in players else None
+            job.check()
+            after = calc.get_transition_stats(role, player, season_filter)
+            job.check()
+            seqs = calc.get_sequence_frequencies(role, player, season_filter, n=n, top=100)
+            return players, player, after, seqs
+        
+        def on_done(result):
+            if calc.data_version != version:
+                self.refresh_sequences() # Games changed meanwhile
+                return
+            self.seq_status_var.set("")
+            self.show_sequences(*result)
+        
+        def on_error(e):
+            self.seq_status_var.set("")
+            messagebox.showerror("Error", f"Failed to compute sequences:\n{e}")
+        
+        self.seq_status_var.set("Computing...")
+        self.sequence_jobs.submit(compute, on_done, on_error=on_error)
+
+    @timed
+    def show_sequences(self, players, player, after, seqs):
+        """Fill the Sequences tab with a finished job's results (UI thread)."""
+        self.seq_player_cb["values"] = [self.ALL_PLAYERS] + players
+        self.seq_player_var.set(player or self.ALL_PLAYERS)
+        
+        def label(pitch):
+            zone, result = pitch
+            return f"{zone}: {result}"
+        
+        for tree in (self.seq_after_tree, self.seq_tree):
+            for item in tree.get_children():
+                tree.delete(item)
+        
+        for pitch, d in sorted(after.items(), key=lambda kv: -kv[1]["Next"]):
+            def f(k): return f"{d[k]:.1f}%"
+            self.seq_after_tree.insert("", "end", values=(
+                label(pitch), d["Next"], f("Zone%"), f("Swing%"), f("Z-Swing%"), f("O-Swing%")))
+        
+        for row in seqs:
+            self.seq_tree.insert("", "end", values=(
+                " > ".join(label(p) for p in row["sequence"]), row["count"], f"{row['share%']:.1f}%"))
+
+    def show_export_dialog(self):
+        """Export raw pitch rows (CSV / JSON Lines) with season/team/player filters."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Export Pitches")
+        dialog.geometry("350x250")
+        
+        form = ttk.Frame(dialog, padding=10)
+        form.pack(fill="both", expand=True)
+        
+        ttk.Label(form, text="Season:").grid(row=0, column=0, sticky="w", pady=3)
+        season_var = tk.StringVar(value=self.season_var.get() if hasattr(self, 'season_var') else "All Seasons")
+        ttk.Combobox(form, textvariable=season_var, values=["All Seasons"] + self.calculator.get_season_list(), state="readonly").grid(row=0, column=1, sticky="ew", pady=3)
+        
+        ttk.Label(form, text="Team:").grid(row=1, column=0, sticky="w", pady=3)
+        team_var = tk.StringVar(value="All Teams")
+        ttk.Combobox(form, textvariable=team_var, values=["All Teams"] + self.calculator.get_team_list(), state="readonly").grid(row=1, column=1, sticky="ew", pady=3)
+        
+        ttk.Label(form, text="Player:").grid(row=2, column=0, sticky="w", pady=3)
+        player_var = tk.StringVar(value="")
+        ttk.Entry(form, textvariable=player_var).grid(row=2, column=1, sticky="ew", pady=3)
+        
+        ttk.Label(form, text="Format:").grid(row=3, column=0, sticky="w", pady=3)
+        fmt_var = tk.StringVar(value="csv")
+        fmt_f = ttk.Frame(form)
+        fmt_f.grid(row=3, column=1, sticky="w", pady=3)
+        ttk.Radiobutton(fmt_f, text="CSV", variable=fmt_var, value="csv").pack(side="left")
+        ttk.Radiobutton(fmt_f, text="JSON Lines", variable=fmt_var, value="jsonl").pack(side="left", padx=5)
+        
+        form.columnconfigure(1, weight=1)
+        
+        def do_export():
+            fmt = fmt_var.get()
+            ext = ".csv" if fmt == "csv" else ".jsonl"
+            path = filedialog.asksaveasfilename(
+                parent=dialog,
+                defaultextension=ext,
+                filetypes=[("CSV", "*.csv")] if fmt == "csv" else [("JSON Lines", "*.jsonl")]
+            )
+            if not path: return
+            
+            season = season_var.get()
+            team = team_var.get()
+            player = player_var.get().strip()
+            
+            try:
+                n = self.calculator.export_pitches(
+                    path, fmt,
+                    season_filter=None if season == "All Seasons" else season,
+                    team_filter=None if team == "All Teams" else team,
+                    player_filter=player or None
+                )
+            except OSError as e:
+                messagebox.showerror("Error", str(e), parent=dialog)
+                return
+            messagebox.showinfo("Exported", f"{n} pitches exported.", parent=dialog)
+            dialog.destroy()
+        
+        ttk.Button(form, text="Export...", command=do_export).grid(row=4, column=0, columnspan=2, pady=10)
+
+    def export_report(self):
+        """Write the selected season as static HTML pages (only changed pages are rewritten)."""
+        season = self.season_var.get()
+        if season == "All Seasons":
+            messagebox.showinfo("Info", "Select a season first.")
+            return
+        out_dir = filedialog.askdirectory(title="Report Folder")
+        if not out_dir: return
+        
+        def on_progress(done, total):
+            if not self.stats_progress.winfo_exists():
+                return
+            if not self.stats_progress.winfo_ismapped():
+                self.stats_progress.pack(side="right", padx=5)
+            self.stats_progress["value"] = done / total if total else 0
+            self.stats_status_var.set(f"Writing report... {done}/{total} pages")
+        
+        def on_done(result):
+            if self.stats_progress.winfo_exists():
+                self.stats_done()
+            messagebox.showinfo("Done", f"{result['written']} of {result['pages']} pages written "
+                                        f"({result['unchanged']} unchanged) to:\n{out_dir}")
+        
+        def on_error(e):
+            if self.stats_progress.winfo_exists():
+                self.stats_done()
+            messagebox.showerror("Error", f"Failed to write report:\n{e}")
+        
+        self.stats_status_var.set("Writing report...")
+        self.report_jobs.submit(lambda job: self.calculator.export_report(out_dir, season, progress=job.progress),
+                                on_done, on_progress=on_progress, on_error=on_error)
+
+    def show_custom_metrics(self):
+        """Edit the custom metric definitions (JSON) shown as extra dashboard columns."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Custom Metrics")
+        dialog.geometry("560x520")
+        
+        conditions = "\n".join(f"  {k}: {v}" for k, v in PREDICATE_FIELDS.items())
+        help_text = (
+            'A list of {"name", "numerator", "denominator", "percent"}. The numerator counts pitches\n'
+            "matching both conditions; an empty condition ({}) matches every pitch.\n"
+            'Example: {"name": "2S O-Swing%", "denominator": {"zone": "Out", "strikes": 2}, "numerator": {"swing": true}}\n'
+            "Conditions:\n" + conditions
+        )
+        ttk.Label(dialog, text=help_text, font=("Segoe UI", 9), justify="left", padding=10).pack(fill="x")
+        
+        text = tk.Text(dialog, font=("Consolas", 10), undo=True)
+        text.pack(fill="both", expand=True, padx=10)
+        text.insert("1.0", json.dumps(self.calculator.get_custom_metrics(), ensure_ascii=False, indent=2))
+        
+        def save():
+            try:
+                definitions = json.loads(text.get("1.0", "end"))
+                self.calculator.set_custom_metrics(definitions)
+            except ValueError as e: # includes json.JSONDecodeError
+                messagebox.showerror("Error", f"Invalid definitions:\n{e}", parent=dialog)
+                return
+            dialog.destroy()
+            self.show_dashboard() # Rebuild the tables with the new columns
+        
+        btn_f = ttk.Frame(dialog, padding=10)
+        btn_f.pack(fill="x")
+        ttk.Button(btn_f, text="Save", command=save).pack(side="right")
+        ttk.Button(btn_f, text="Cancel", command=dialog.destroy).pack(side="right", padx=5)
+
+    def show_merge_players(self):
+        """Merge duplicate player names (suggested groups, or any two names picked by hand)."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Merge Players")
+        dialog.geometry("450x500")
+        
+        ttk.Label(dialog, text="Possible duplicates (merged into the first name):").pack(anchor="w", padx=10, pady=(10, 2))
+        lb = tk.Listbox(dialog, height=10)
+        lb.pack(fill="both", expand=True, padx=10)
+        
+        groups = []
+        def populate():
+            groups[:] = self.calculator.find_duplicate_players()
+            lb.delete(0, "end")
+            for g in groups:
+                lb.insert("end", " / ".join(g[1:]) + "  →  " + g[0])
+        
+        def merge(mapping):
+            try:
+                n = self.calculator.merge_players(mapping)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e), parent=dialog)
+                return
+            messagebox.showinfo("Merged", f"{n} games updated.", parent=dialog)
+            populate()
+            names = self.calculator.get_known_players()
+            from_cb["values"] = names
+            into_cb["values"] = names
+        
+        def merge_selected():
+            sel = lb.curselection() or range(len(groups))
+            mapping = {}
+            for i in sel:
+                g = groups[i]
+                for name in g[1:]:
+                    mapping[name] = g[0]
+            if mapping:
+                merge(mapping)
+        
+        ttk.Button(dialog, text="Merge Selected (or All)", command=merge_selected).pack(pady=5)
+        
+        manual = ttk.LabelFrame(dialog, text="Merge by hand", padding=5)
+        manual.pack(fill="x", padx=10, pady=5)
+        names = self.calculator.get_known_players()
+        from_var = tk.StringVar()
+        into_var = tk.StringVar()
+        ttk.Label(manual, text="Merge:").grid(row=0, column=0, sticky="w")
+        from_cb = ttk.Combobox(manual, textvariable=from_var, values=names)
+        from_cb.grid(row=0, column=1, sticky="ew", pady=2)
+        ttk.Label(manual, text="Into:").grid(row=1, column=0, sticky="w")
+        into_cb = ttk.Combobox(manual, textvariable=into_var, values=names)
+        into_cb.grid(row=1, column=1, sticky="ew", pady=2)
+        manual.columnconfigure(1, weight=1)
+        
+        def merge_manual():
+            src, dst = from_var.get().strip(), into_var.get().strip()
+            if src and dst and src != dst and messagebox.askyesno("Confirm", f"Merge '{src}' into '{dst}'?", parent=dialog):
+                merge({src: dst})
+        ttk.Button(manual, text="Merge", command=merge_manual).grid(row=2, column=0, columnspan=2, pady=5)
+        
+        reading_f = ttk.LabelFrame(dialog, text="Reading (kana) for autocomplete", padding=5)
+        reading_f.pack(fill="x", padx=10, pady=5)
+        reading_player = tk.StringVar()
+        reading_var = tk.StringVar()
+        PlayerCombobox(reading_f, self.calculator, textvariable=reading_player, width=18).pack(side="left")
+        ttk.Entry(reading_f, textvariable=reading_var, width=16).pack(side="left", padx=5)
+        
+        def set_reading():
+            name = reading_player.get().strip()
+            if name:
+                self.calculator.set_player_reading(self.calculator.resolve_player(name), reading_var.get())
+                reading_var.set("")
+        ttk.Button(reading_f, text="Set", command=set_reading).pack(side="left")
+        
+        populate()
+
+    def show_pitch_editor(self):
+        """List the current game's pitches; edit, insert or delete one (later counts are recomputed)."""
+        self.process_input_queue()
+        game = self.calculator.current_game
+        if not game:
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Edit Pitches")
+        dialog.geometry("750x500")
+        
+        cols = ("#", "Inning", "Count", "Batter", "Pitcher", "Zone", "Result")
+        tree = ttk.Treeview(dialog, columns=cols, show="headings")
+        widths = (40, 70, 60, 140, 140, 50, 130)
+        for c, w in zip(cols, widths):
+            tree.heading(c, text=c)
+            tree.column(c, width=w, anchor="center")
+        sb = ttk.Scrollbar(dialog, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=sb.set)
+        
+        form = ttk.Frame(dialog, padding=5)
+        form.pack(side="bottom", fill="x")
+        sb.pack(side="right", fill="y")
+        tree.pack(fill="both", expand=True)
+        
+        zone_var = tk.StringVar(value="In")
+        result_var = tk.StringVar(value=PITCH_RESULTS[0])
+        ttk.Label(form, text="Zone:").pack(side="left")
+        ttk.Combobox(form, textvariable=zone_var, values=["In", "Out"], state="readonly", width=5).pack(side="left", padx=2)
+        ttk.Label(form, text="Result:").pack(side="left", padx=(5, 0))
+        ttk.Combobox(form, textvariable=result_var, values=PITCH_RESULTS, state="readonly", width=16).pack(side="left", padx=2)
+        
+        def populate(select=None):
+            tree.delete(*tree.get_children())
+            for i, p in enumerate(game["pitches"]):
+                half = "Top" if p["is_top"] else "Bot"
+                count = f"{p['balls_before']}-{p['strikes_before']}"
+                tree.insert("", "end", iid=str(i), values=(i + 1, f"{p['inning']} {half}", count, p["batter"], p["pitcher"], p["zone"], p["result"]))
+            if select is not None and tree.exists(str(select)):
+                tree.selection_set(str(select))
+                tree.see(str(select))
+        
+        def on_select(event):
+            sel = tree.selection()
+            if sel:
+                p = game["pitches"][int(sel[0])]
+                zone_var.set(p["zone"])
+                result_var.set(p["result"])
+        tree.bind("<<TreeviewSelect>>", on_select)
+        
+        def selected_index():
+            sel = tree.selection()
+            if not sel:
+                messagebox.showwarning("Select", "Please select a pitch.", parent=dialog)
+                return None
+            return int(sel[0])
+        
+        def run(action, k):
+            try:
+                action()
+            except (ValueError, IndexError) as e:
+                messagebox.showerror("Error", str(e), parent=dialog)
+                return
+            populate(k)
+            self.update_game_ui_state()
+        
+        def edit():
+            k = selected_index()
+            if k is not None:
+                run(lambda: self.calculator.edit_pitch(k, zone_var.get(), result_var.get()), k)
+        
+        def insert():
+            k = selected_index()
+            if k is not None:
+                run(lambda: self.calculator.insert_pitch(k, zone_var.get(), result_var.get()), k)
+        
+        def delete():
+            k = selected_index()
+            if k is not None and messagebox.askyesno("Confirm", f"Delete pitch #{k + 1}?", parent=dialog):
+                run(lambda: self.calculator.delete_pitch(k), k)
+        
+        ttk.Button(form, text="Delete", command=delete).pack(side="right", padx=2)
+        ttk.Button(form, text="Insert Before", command=insert).pack(side="right", padx=2)
+        ttk.Button(form, text="Apply", command=edit).pack(side="right", padx=2)
+        
+        populate(len(game["pitches"]) - 1)
+
+    def show_diagnostics(self):
+        """Hidden panel (Ctrl+Shift+D): timing histograms, data size, history depth, memory, integrity check."""
+        if getattr(self, 'diag_win', None) and self.diag_win.winfo_exists():
+            self.diag_win.lift()
+            return
+        
+        win = tk.Toplevel(self.root)
+        win.title("Diagnostics")
+        win.geometry("900x600")
+        self.diag_win = win
+        
+        info_var = tk.StringVar()
+        ttk.Label(win, textvariable=info_var, padding=5, font=("Segoe UI", 10)).pack(fill="x")
+        startup_var = tk.StringVar()
+        ttk.Label(win, textvariable=startup_var, padding=(5, 0), font=("Segoe UI", 10)).pack(fill="x")
+        
+        # Timing table
+        bucket_cols = DIAGNOSTICS.bucket_labels()
+        cols = ["Name", "Calls", "Avg ms", "Max ms"] + bucket_cols
+        table_f = ttk.Frame(win)
+        table_f.pack(fill="both", expand=True, padx=5)
+        
+        tree = ttk.Treeview(table_f, columns=cols, show="headings")
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=220 if c == "Name" else 55, anchor="w" if c == "Name" else "center")
+        tree.grid(row=0, column=0, sticky="nsew")
+        vsb = ttk.Scrollbar(table_f, orient="vertical", command=tree.yview)
+        hsb = ttk.Scrollbar(table_f, orient="horizontal", command=tree.xview)
+        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        vsb.grid(row=0, column=1, sticky="ns")
+        hsb.grid(row=1, column=0, sticky="ew")
+        table_f.grid_rowconfigure(0, weight=1)
+        table_f.grid_columnconfigure(0, weight=1)
+        
+        # Profiler output
+        profile_txt = tk.Text(win, height=10, font=("Consolas", 9))
+        profile_txt.pack(fill="both", padx=5, pady=5)
+        
+        def refresh():
+            info = self.calculator.get_data_summary()
+            mem = process_memory()
+            mem_str = f"{mem / (1024 * 1024):.1f} MB" if mem else "n/a"
+            info_var.set(
+                f"File: {info['file_bytes'] / 1024:.0f} KB | Games: {info['games']} | "
+                f"Pitches: {info['pitches']} | Players: {info['players']} | "
+                f"History: {info['history_depth']} | Backups: {info['backups']} | Memory: {mem_str}"
+            )
+            # Seconds since launch (for the .exe, including unpacking)
+            startup_var.set("Startup: " + " | ".join(f"{name} {t:.2f} s" for name, t in DIAGNOSTICS.get_startup()))
+            
+            for item in tree.get_children():
+                tree.delete(item)
+            for r in DIAGNOSTICS.get_summary():
+                vals = [r["name"], r["calls"], f"{r['avg_ms']:.2f}", f"{r['max_ms']:.2f}"] + r["buckets"]
+                tree.insert("", "end", values=vals)
+        
+        def reset():
+            DIAGNOSTICS.reset()
+            refresh()
+        
+        profiling_var = tk.BooleanVar(value=DIAGNOSTICS.is_profiling())
+        
+        def toggle_profiler():
+            if profiling_var.get():
+                DIAGNOSTICS.start_profiler()
+            else:
+                text = DIAGNOSTICS.stop_profiler()
+                profile_txt.delete("1.0", "end")
+                profile_txt.insert("1.0", text)
+        
+        def dump():
+            path = filedialog.asksaveasfilename(parent=win, defaultextension=".json", filetypes=[("JSON", "*.json")])
+            if not path: return
+            try:
+                DIAGNOSTICS.dump(path, self.calculator.get_data_summary())
+            except OSError as e:
+                messagebox.showerror("Error", str(e), parent=win)
+                return
+            messagebox.showinfo("Saved", f"Diagnostics written to {path}", parent=win)
+        
+        def check_integrity():
+            problems = self.calculator.check_integrity(load_all=True)
+            profile_txt.delete("1.0", "end")
+            if not problems:
+                profile_txt.insert("1.0", "Integrity check: no problems found.")
+                return
+            lines = [f"Integrity check: {len(problems)} problem(s)"]
+            for p in problems:
+                where = p["game"] or "data"
+                if p["pitch"] is not None:
+                    where += f" pitch {p['pitch'] + 1}"
+                lines.append(f"{where}: {p['message']}")
+            profile_txt.insert("1.0", "\n".join(lines))
+        
+        def backup_now():
+            try:
+                path = self.calculator.create_backup()
+            except OSError as e:
+                messagebox.showerror("Error", str(e), parent=win)
+                return
+            if path:
+                messagebox.showinfo("Backup", f"Backup written to {path}", parent=win)
+            else:
+                messagebox.showwarning("Backup", "Backup skipped: the data files failed their checksum.", parent=win)
+            refresh()
+        
+        btn_f = ttk.Frame(win, padding=5)
+        btn_f.pack(fill="x")
+        ttk.Button(btn_f, text="Refresh", command=refresh).pack(side="left", padx=2)
+        ttk.Button(btn_f, text="Reset", command=reset).pack(side="left", padx=2)
+        ttk.Checkbutton(btn_f, text="Profiler", variable=profiling_var, command=toggle_profiler).pack(side="left", padx=10)
+        ttk.Button(btn_f, text="Check Integrity", command=check_integrity).pack(side="left", padx=2)
+        ttk.Button(btn_f, text="Back Up Now", command=backup_now).pack(side="left", padx=2)
+        ttk.Button(btn_f, text="Dump to File...", command=dump).pack(side="right", padx=2)
+        
+        refresh()
 
     # ... Logic methods ... (unchanged)
 
+    @timed
     def start_game(self):
         hn = self.home_name.get()
         an = self.away_name.get()
@@ -714,6 +1943,7 @@ class PlateDisciplineApp:
         except ValueError as e:
             messagebox.showerror("Error", str(e))
 
+    @timed
     def update_game_ui_state(self):
         s = self.calculator.get_game_state()
         if not s: return
@@ -727,37 +1957,41 @@ class PlateDisciplineApp:
         
         self.pitcher_var.set(s['pitcher'])
         self.batter_var.set(s['batter'])
+        self.refresh_open_games()
 
     def update_header(self):
         self.update_game_ui_state()
 
     def log(self, result, in_zone=False):
-        s = self.calculator.get_game_state()
-        # Auto-detect first pitch: balls=0, strikes=0
-        is_first = (s['balls'] == 0 and s['strikes'] == 0)
-        
-        zone = "In" if in_zone else "Out"
-        self.calculator.log_pitch(zone, result, is_first)
-        self.update_game_ui_state()
+        self.enqueue_input(("pitch", result, in_zone))
     
     def change_batter(self):
-        new_b = simpledialog.askstring("Change Batter", "Enter new batter name (PH):")
+        self.process_input_queue()
+        g = self.calculator.current_game
+        team = g["teams"]["away" if g["state"]["is_top"] else "home"]["name"]
+        new_b = ask_player(self.root, self.calculator, "Change Batter", "Enter new batter name (PH):", team)
         if new_b:
             self.calculator.substitute_batter(new_b)
             self.update_game_ui_state()
 
     def runner_out(self):
-        self.calculator.record_runner_out()
-        self.update_game_ui_state()
+        self.enqueue_input(("runner_out",))
 
     def change_pitcher(self):
-        new_p = simpledialog.askstring("Change Pitcher", "Enter new pitcher name:")
+        self.process_input_queue()
+        g = self.calculator.current_game
+        team = g["teams"]["home" if g["state"]["is_top"] else "away"]["name"]
+        new_p = ask_player(self.root, self.calculator, "Change Pitcher", "Enter new pitcher name:", team)
         if new_p:
             self.calculator.change_pitcher(new_p)
             self.update_game_ui_state()
 
 if __name__ == "__main__":
     import sys, os
+    if getattr(sys, 'frozen', False):
+        # Report pages render in worker processes, which the .exe starts as copies of itself
+        import multiprocessing
+        multiprocessing.freeze_support()
     root = tk.Tk()
     # Set window icon
     if getattr(sys, 'frozen', False):
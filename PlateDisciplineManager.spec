@@ -10,7 +10,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Standard-library packages the app never imports: less for the onefile build to unpack at every start
+    excludes=['unittest', 'doctest', 'pdb', 'pydoc', 'xmlrpc', 'asyncio', 'sqlite3', 'ssl', 'email', 'http', 'xml'],
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +27,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False, # UPX-packed DLLs are decompressed on every launch
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -0,0 +1,226 @@
+import functools
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class Diagnostics:
+    """Collects per-method timing counters, startup milestones and an optional cProfile session."""
+
+    def __init__(self):
+        self.timings = {}
+        self.profiler = None
+        self.startup = {} # milestone -> seconds since the process started
+
+    def record(self, name, elapsed):
+        """Add one call of `name` that took `elapsed` seconds."""
+        t = self.timings.get(name)
+        if t is None:
+            t = self.timings[name] = {
+                "calls": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "buckets": [0] * (len(BUCKETS_MS) + 1)
+            }
+        t["calls"] += 1
+        t["total"] += elapsed
+        if elapsed > t["max"]:
+            t["max"] = elapsed
+
+        ms = elapsed * 1000
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms < bound:
+                t["buckets"][i] += 1
+                break
+        else:
+            t["buckets"][-1] += 1
+
+    def reset(self):
+        self.timings = {}
+
+    def get_summary(self):
+        """Return a list of dicts (name, calls, avg_ms, max_ms, total_ms, buckets), slowest total first."""
+        rows = []
+        for name, t in self.timings.items():
+            rows.append({
+                "name": name,
+                "calls": t["calls"],
+                "avg_ms": t["total"] / t["calls"] * 1000 if t["calls"] else 0.0,
+                "max_ms": t["max"] * 1000,
+                "total_ms": t["total"] * 1000,
+                "buckets": list(t["buckets"])
+            })
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows
+
+    @staticmethod
+    def bucket_labels():
+        labels = [f"<{b}ms" for b in BUCKETS_MS]
+        labels.append(f">={BUCKETS_MS[-1]}ms")
+        return labels
+
+    # --- Startup ---
+
+    def mark(self, name):
+        """Record startup milestone `name` (only its first occurrence counts)."""
+        if name not in self.startup:
+            self.startup[name] = time.time() - PROCESS_START
+
+    def get_startup(self):
+        """[(milestone, seconds since process start)] in the order they were reached."""
+        return list(self.startup.items())
+
+    # --- Profiler ---
+
+    def is_profiling(self):
+        return self.profiler is not None
+
+    def start_profiler(self):
+        if self.profiler is None:
+            import cProfile # Only needed once profiling is switched on
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_profiler(self):
+        """Stop profiling and return the top entries as text (or '' if not running)."""
+        if self.profiler is None:
+            return ""
+        self.profiler.disable()
+        text = self._profile_text(self.profiler)
+        self.profiler = None
+        return text
+
+    @staticmethod
+    def _profile_text(profiler, limit=40):
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    # --- Dump ---
+
+    def dump(self, path, extra=None):
+        """Write timings (and a profile snapshot if running) to a JSON file."""
+        report = {
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "bucket_labels": self.bucket_labels(),
+            "timings": self.get_summary(),
+            "memory_bytes": process_memory(),
+            "startup_s": dict(self.startup),
+            "info": extra or {}
+        }
+        if self.profiler is not None:
+            report["profile"] = self._profile_text(self.profiler)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+
+def process_start_time():
+    """
+    Wall-clock time (epoch seconds) at which the program was launched, or None if unknown.
+    A PyInstaller onefile build runs in a child of the bootloader, which spends the first part
+    of startup unpacking the archive, so the bootloader's own start time is used there.
+    """
+    pid = os.getpid()
+    if getattr(sys, "frozen", False) and os.path.normcase(getattr(sys, "_MEIPASS", "")) != os.path.normcase(os.path.dirname(sys.executable)):
+        pid = os.getppid()
+
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+            PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if not handle:
+                return None
+            try:
+                times = [wintypes.FILETIME() for _ in range(4)]
+                if not kernel32.GetProcessTimes(handle, *[ctypes.byref(t) for t in times]):
+                    return None
+            finally:
+                kernel32.CloseHandle(handle)
+            created = (times[0].dwHighDateTime << 32) | times[0].dwLowDateTime
+            return (created - 116444736000000000) / 1e7 # 100 ns ticks since 1601 -> epoch seconds
+        except (OSError, AttributeError):
+            return None
+
+    try:
+        # Linux: start time in clock ticks since boot (field 22, after the parenthesised name)
+        with open(f"/proc/{pid}/stat") as f:
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Startup milestones are measured from here when the launch time cannot be read
+PROCESS_START = process_start_time() or time.time()
+DIAGNOSTICS = Diagnostics()
+
+
+def timed(func):
+    """Decorator: record wall time of each call in DIAGNOSTICS under the function's qualified name."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            DIAGNOSTICS.record(name, time.perf_counter() - start)
+    return wrapper
+
+
+def process_memory():
+    """Return the current resident memory of this process in bytes, or None if unavailable."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+        except (OSError, AttributeError):
+            pass
+        return None
+
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+
+    try:
+        import resource
+        # ru_maxrss is peak, in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
@@ -0,0 +1,483 @@
+import argparse
+import copy
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from plate_discipline import PlateDisciplineCalculator
+
+# Differential check of the stats engines.
+# Every faster path (cached / patched rollups, filter buckets, archived aggregates, custom
+# metrics, the storage backends, changeset import) must give exactly what a plain loop over
+# the raw pitches gives. This plays random but rule-valid games through the public API
+# (start_new_game / log_pitch / undo / substitute_batter / change_pitcher / record_runner_out),
+# computes the reference from a copy of the pitches, and compares every engine against it
+# (player stats, filters, custom metrics, rollups, pitch sequences, zone/result splits),
+# then keeps changing the data (pitch edits, player merges, reloads, storage conversion,
+# archives, sync) and compares again.
+#
+#   python differential.py             (4 rounds of 500 games: 2000 games)
+#   python differential.py --games 2000 --seed 7
+#
+# Exits with status 1 and prints the first differences (with the seed) if anything differs.
+
+# Results the input screen offers for each zone
+ZONE_RESULTS = {
+    "Out": ["Ball", "Swinging Strike", "Foul", "Dead Ball", "In Play (Safe)", "In Play (Out)"],
+    "In": ["Called Strike", "Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)"]
+}
+TEAMS = ["Dragons", "Giants", "Tigers", "Carp", "Swallows", "BayStars"]
+SEASONS = ["2024", "2025"]
+ROLES = ("batter", "pitcher", None)
+
+_SWINGS = {"Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)"}
+_CONTACT = {"Foul", "In Play (Safe)", "In Play (Out)"}
+_STRIKES = {"Called Strike", "Swinging Strike"}
+
+
+# --- Random games ---
+
+def play_game(calc, rng, season, max_pitches=400):
+    """Play one game to the end of the 9th (or max_pitches) with random inputs."""
+    home, away = rng.sample(TEAMS, 2)
+    roster = lambda team: [f"{team}{i}" for i in range(1, 13)]
+    home_lineup = rng.sample(roster(home), 9)
+    away_lineup = rng.sample(roster(away), 9)
+    game = calc.start_new_game(home, away, home_lineup, away_lineup, f"{home}P{rng.randint(1, 6)}", f"{away}P{rng.randint(1, 6)}", season)
+    game["date"] = f"{season}-{rng.randint(3, 10):02d}-{rng.randint(1, 28):02d} 18:00:00"
+    calc.save_data([game])
+    if rng.random() < 0.2:
+        # Starter replaced before throwing a pitch: every pitch of the game is in relief
+        calc.change_pitcher(f"{home}P{rng.randint(1, 6)}")
+
+    for _ in range(max_pitches):
+        s = calc.get_game_state()
+        if s["inning"] > 9:
+            break
+        x = rng.random()
+        if x < 0.02:
+            calc.substitute_batter(f"{s['batting_team']}{rng.randint(1, 12)}")
+        elif x < 0.035:
+            calc.change_pitcher(f"{s['pitching_team']}P{rng.randint(1, 6)}")
+        elif x < 0.045:
+            calc.record_runner_out()
+        elif x < 0.08:
+            calc.undo()
+        else:
+            zone = rng.choice(("In", "Out"))
+            calc.log_pitch(zone, rng.choice(ZONE_RESULTS[zone]), s["balls"] == 0 and s["strikes"] == 0)
+    calc.close_game()
+    return game
+
+
+def generate(calc, rng, n_games):
+    with calc.deferred_saves():
+        for _ in range(n_games):
+            play_game(calc, rng, rng.choice(SEASONS))
+    calc.flush()
+
+
+def merge_randomly(calc, rng, games, n=4):
+    """Merge a few random players (into another player or a new name) in calc and in `games`."""
+    names = sorted({p[role] for g in games for p in g["pitches"] for role in ("batter", "pitcher")})
+    mapping = {}
+    for old in rng.sample(names, min(n, len(names))):
+        new = rng.choice(names) if rng.random() < 0.5 else f"Merged{rng.randint(0, 10**6)}"
+        if new != old and new not in mapping:
+            mapping[old] = new
+    mapping = PlateDisciplineCalculator._flatten_merge(mapping)
+    calc.merge_players(mapping)
+    for g in games:
+        PlateDisciplineCalculator._rename_in_game(g, mapping)
+    return mapping
+
+
+def snapshot(calc):
+    """Plain copies of every game (live and archived): the input of the reference."""
+    games = []
+    for g in calc._iter_all_games():
+        games.append({
+            "season": g.get("season", ""), "date": g["date"],
+            "teams": copy.deepcopy(g["teams"]), "start": copy.deepcopy(g["start"]),
+            "pitches": [dict(p) for p in g["pitches"]]
+        })
+    return games
+
+
+# --- Reference ---
+
+def _new_counters():
+    return {k: 0 for k in PlateDisciplineCalculator.COUNTER_KEYS}
+
+
+def _count(c, p):
+    result = p["result"]
+    swing = result in _SWINGS
+    contact = result in _CONTACT
+    zone = "Z" if p["zone"] == "In" else "O"
+    c["Pitches"] += 1
+    c[zone + "-Pitch"] += 1
+    c["Swing"] += swing
+    c["Contact"] += contact
+    c[zone + "-Swing"] += swing
+    c[zone + "-Contact"] += swing and contact
+    if p["is_first_pitch"]:
+        c["FirstPitch"] += 1
+        c["FirstStrike"] += result != "Ball"
+    c["SwingingStrike"] += result == "Swinging Strike"
+    c["CalledStrike"] += result == "Called Strike"
+    two_strikes = p["strikes_before"] == 2
+    c["TwoStrikePitches"] += two_strikes
+    c["Strikeouts"] += two_strikes and result in _STRIKES
+    c["PA"] += ("In Play" in result or result == "Dead Ball"
+                or (result == "Ball" and p["balls_before"] == 3)
+                or (two_strikes and result in _STRIKES))
+
+
+def _rates(c):
+    def pct(n, d): return (n / d * 100) if d > 0 else 0.0
+    return {
+        "PA": c["PA"], "Pitches": c["Pitches"],
+        "Swing%": pct(c["Swing"], c["Pitches"]),
+        "O-Swing%": pct(c["O-Swing"], c["O-Pitch"]),
+        "Z-Swing%": pct(c["Z-Swing"], c["Z-Pitch"]),
+        "Contact%": pct(c["Contact"], c["Swing"]),
+        "O-Contact%": pct(c["O-Contact"], c["O-Swing"]),
+        "Z-Contact%": pct(c["Z-Contact"], c["Z-Swing"]),
+        "Zone%": pct(c["Z-Pitch"], c["Pitches"]),
+        "F-Strike%": pct(c["FirstStrike"], c["FirstPitch"]),
+        "Whiff%": pct(c["SwingingStrike"], c["Swing"]),
+        "Put Away%": pct(c["Strikeouts"], c["TwoStrikePitches"]),
+        "SwStr%": pct(c["SwingingStrike"], c["Pitches"]),
+        "CStr%": pct(c["CalledStrike"], c["Pitches"]),
+        "CSW%": pct(c["SwingingStrike"] + c["CalledStrike"], c["Pitches"])
+    }
+
+
+def _keeps(g, f, side, p):
+    """Whether filters `f` keep a pitch of the player on `side` (the rules of STAT_FILTERS)."""
+    other = "away" if side == "home" else "home"
+    date = g["date"][:10]
+    if "season" in f and g["season"] != f["season"]:
+        return False
+    if ("date_from" in f and date < f["date_from"]) or ("date_to" in f and date > f["date_to"]):
+        return False
+    if "team" in f and g["teams"][side]["name"].strip() != f["team"]:
+        return False
+    if "opponent" in f and g["teams"][other]["name"].strip() != f["opponent"]:
+        return False
+    if "home_away" in f and side != f["home_away"]:
+        return False
+    if ("inning_from" in f and p["inning"] < f["inning_from"]) or ("inning_to" in f and p["inning"] > f["inning_to"]):
+        return False
+    if "pitcher_role" in f:
+        pitching = "home" if p["is_top"] else "away"
+        if (p["pitcher"] == g["start"][pitching]["pitcher"]) != (f["pitcher_role"] == "starter"):
+            return False
+    return True
+
+
+def reference_stats(games, role=None, filters=None, key=None):
+    """
+    Rates per group from a plain loop over every pitch.
+    key(game, side, pitch, player) -> group (default: the player).
+    """
+    f = filters or {}
+    counters = {}
+    for g in games:
+        for p in g["pitches"]:
+            batting, pitching = ("away", "home") if p["is_top"] else ("home", "away")
+            for r, side, player in (("batter", batting, p["batter"]), ("pitcher", pitching, p["pitcher"])):
+                if role is not None and r != role:
+                    continue
+                if not _keeps(g, f, side, p):
+                    continue
+                group = key(g, side, p, player) if key else player
+                c = counters.get(group)
+                if c is None:
+                    c = counters[group] = _new_counters()
+                _count(c, p)
+    return {group: _rates(c) for group, c in counters.items()}
+
+
+def reference_sequences(games, role, season=None, n=2):
+    """
+    Per player: {pitch n (zone, result): {pitch n+1 (zone, result): count}} and the counts of
+    runs of `n` pitches, within plate appearances (a PA restarts on a first pitch and whenever
+    batter, pitcher, inning or half-inning changes).
+    """
+    transitions, runs = {}, {}
+    for g in games:
+        if season is not None and g["season"] != season:
+            continue
+        pa = []
+        last = None
+        for p in g["pitches"]:
+            where = (p["batter"], p["pitcher"], p["inning"], p["is_top"])
+            if p["is_first_pitch"] or where != last:
+                pa = []
+            last = where
+            pitch = (p["zone"], p["result"])
+            player = p[role]
+            if pa:
+                row = transitions.setdefault(player, {}).setdefault(pa[-1], {})
+                row[pitch] = row.get(pitch, 0) + 1
+            pa.append(pitch)
+            if len(pa) >= n:
+                by_run = runs.setdefault(player, {})
+                run = tuple(pa[-n:])
+                by_run[run] = by_run.get(run, 0) + 1
+    return transitions, runs
+
+
+def reference_splits(games, role, season):
+    """{(team, player): {(zone, result): pitches}} for one season."""
+    splits = {}
+    for g in games:
+        if g["season"] != season:
+            continue
+        for p in g["pitches"]:
+            batting, pitching = ("away", "home") if p["is_top"] else ("home", "away")
+            side = batting if role == "batter" else pitching
+            cells = splits.setdefault((g["teams"][side]["name"], p[role]), {})
+            cells[(p["zone"], p["result"])] = cells.get((p["zone"], p["result"]), 0) + 1
+    return splits
+
+
+# Custom metric definitions that must reproduce built-in rates
+BUILTIN_AS_CUSTOM = [
+    {"name": "O-Swing%", "denominator": {"zone": "Out"}, "numerator": {"swing": True}},
+    {"name": "Z-Contact%", "denominator": {"zone": "In", "swing": True}, "numerator": {"contact": True}},
+    {"name": "Whiff%", "denominator": {"swing": True}, "numerator": {"result": "Swinging Strike"}},
+    {"name": "Put Away%", "denominator": {"strikes": 2}, "numerator": {"result": ["Called Strike", "Swinging Strike"]}},
+    {"name": "CSW%", "numerator": {"result": ["Called Strike", "Swinging Strike"]}}
+]
+
+ROLLUP_KEYS = {
+    "league": lambda season, team, slot, player: (),
+    "season": lambda season, team, slot, player: (season,),
+    "team": lambda season, team, slot, player: (season, team),
+    "player": lambda season, team, slot, player: (season, team, player),
+    "slot": lambda season, team, slot, player: (season, team, slot)
+}
+
+
+# --- Comparison ---
+
+class Differences:
+    def __init__(self, limit=20):
+        self.items = []
+        self.limit = limit
+        self.checks = 0
+
+    def compare(self, label, got, expected):
+        self.checks += 1
+        if got == expected:
+            return
+        if len(self.items) >= self.limit:
+            return
+        missing = sorted(map(str, set(expected) - set(got)))[:3]
+        extra = sorted(map(str, set(got) - set(expected)))[:3]
+        detail = []
+        if missing: detail.append(f"missing {missing}")
+        if extra: detail.append(f"unexpected {extra}")
+        for k in sorted(set(got) & set(expected), key=str):
+            if got[k] != expected[k]:
+                diff = {s: (got[k].get(s), expected[k].get(s)) for s in set(got[k]) | set(expected[k])
+                        if got[k].get(s) != expected[k].get(s)}
+                detail.append(f"{k}: {diff}")
+                break
+        self.items.append(f"{label}: " + "; ".join(detail))
+
+
+def random_filters(rng, games):
+    f = {}
+    if rng.random() < 0.5:
+        f["season"] = rng.choice(SEASONS)
+    if rng.random() < 0.3:
+        f["team"] = rng.choice(TEAMS)
+    if rng.random() < 0.2:
+        f["opponent"] = rng.choice(TEAMS)
+    if rng.random() < 0.3:
+        lo = rng.randint(1, 9)
+        f["inning_from"], f["inning_to"] = lo, rng.randint(lo, 10)
+    if rng.random() < 0.3:
+        f["home_away"] = rng.choice(("home", "away"))
+    if rng.random() < 0.3:
+        f["pitcher_role"] = rng.choice(("starter", "reliever"))
+    if rng.random() < 0.3:
+        dates = sorted(g["date"][:10] for g in games) or ["2024-01-01"]
+        a, b = sorted((rng.choice(dates), rng.choice(dates)))
+        f["date_from"], f["date_to"] = a, b
+    return f
+
+
+def check_engines(calc, games, rng, diffs, stage, n_filters=6):
+    """Compare every stats path of `calc` with the reference computed from `games`."""
+    # Filters first: on a fresh sharded load they are what reads the unloaded games, and the
+    # starter / reliever split is the part that depends on the game body
+    filters = [{"pitcher_role": rng.choice(("starter", "reliever"))}]
+    filters += [random_filters(rng, games) for _ in range(n_filters - 1)]
+    for f in filters:
+        season = f.pop("season", None)
+        ref_f = dict(f, season=season) if season else f
+        for role in ("batter", "pitcher"):
+            expected = reference_stats(games, role, ref_f)
+            diffs.compare(f"{stage} filtered role={role} {ref_f}", calc.get_aggregate_stats(role, season, f), expected)
+            names = [d["name"] for d in BUILTIN_AS_CUSTOM]
+            custom = calc.get_custom_stats(role, season, f)
+            diffs.compare(f"{stage} custom metrics role={role} {ref_f}",
+                          {p: {k: v if v is not None else 0.0 for k, v in d.items()} for p, d in custom.items()},
+                          {p: {k: d[k] for k in names} for p, d in expected.items()})
+
+    for season in [None] + SEASONS:
+        f = {"season": season} if season else {}
+        for role in ROLES:
+            diffs.compare(f"{stage} aggregate role={role} season={season}",
+                          calc.get_aggregate_stats(role, season), reference_stats(games, role, f))
+
+    for level, group in ROLLUP_KEYS.items():
+        for role in ("batter", "pitcher"):
+            def key(g, side, p, player, group=group):
+                return group(g["season"], g["teams"][side]["name"], p["lineup_slot"] + 1, player)
+            diffs.compare(f"{stage} rollup level={level} role={role}",
+                          calc.get_rollup_stats(level, role), reference_stats(games, role, key=key))
+
+    n = rng.randint(1, calc.SEQUENCE_MAX_N)
+    for season in [None] + SEASONS:
+        for role in ("batter", "pitcher"):
+            transitions, runs = reference_sequences(games, role, season, n)
+            # The engine's own player list too, so names that should be gone are checked as well
+            players = set(transitions) | set(runs) | set(calc.get_aggregate_stats(role, season))
+            diffs.compare(f"{stage} transitions role={role} season={season}",
+                          {p: calc.get_transition_matrix(role, p, season) for p in players},
+                          {p: transitions.get(p, {}) for p in players})
+            diffs.compare(f"{stage} sequences n={n} role={role} season={season}",
+                          {p: {row["sequence"]: row["count"] for row in calc.get_sequence_frequencies(role, p, season, n=n)}
+                           for p in players},
+                          {p: runs.get(p, {}) for p in players})
+            if season is not None:
+                diffs.compare(f"{stage} zone splits role={role} season={season}",
+                              calc.get_zone_result_splits(role, season), reference_splits(games, role, season))
+
+
+def edit_randomly(calc, rng, n_edits):
+    """
+    Pitch edits, inserts and deletes on random live games, some of them undone. An undo (or an
+    edit in another season) drops the cached counters, so the edits end with a run in one
+    season that only patches them.
+    """
+    games = [g for g in calc.get_games() if g["pitches"]]
+    with calc.deferred_saves():
+        _edit_games(calc, rng, games, n_edits, undo_rate=0.2)
+        season = rng.choice(games)["season"]
+        calc.get_aggregate_stats(None, season) # Cache the season's counters again
+        _edit_games(calc, rng, [g for g in games if g["season"] == season], n_edits, undo_rate=0)
+    calc.flush()
+
+
+def _edit_games(calc, rng, games, n_edits, undo_rate):
+    for _ in range(n_edits):
+        g = rng.choice(games)
+        calc.load_game(g["id"])
+        k = rng.randrange(len(g["pitches"]))
+        zone = rng.choice(("In", "Out"))
+        x = rng.random()
+        if x < 0.5:
+            calc.edit_pitch(k, zone, rng.choice(ZONE_RESULTS[zone]), game_id=g["id"])
+        elif x < 0.75:
+            calc.insert_pitch(k, zone, rng.choice(ZONE_RESULTS[zone]), game_id=g["id"])
+        elif len(g["pitches"]) > 1:
+            calc.delete_pitch(k, game_id=g["id"])
+        if rng.random() < undo_rate:
+            calc.undo()
+        calc.close_game()
+
+
+def run(games=500, seed=0, rounds=4, verbose=True):
+    """Run the whole differential check; returns a Differences (empty .items when everything matched)."""
+    diffs = Differences()
+    rng = random.Random(seed)
+    for r in range(rounds):
+        started = time.perf_counter()
+        work = tempfile.mkdtemp(prefix="differential-")
+        try:
+            _run_round(os.path.join(work, "data.json"), work, rng, games, diffs)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        if verbose:
+            print(f"round {r + 1}/{rounds}: {games} games, {diffs.checks} comparisons, "
+                  f"{len(diffs.items)} differences ({time.perf_counter() - started:.1f}s)")
+        if diffs.items:
+            break
+    return diffs
+
+
+def _run_round(path, work, rng, n_games, diffs):
+    calc = PlateDisciplineCalculator(path)
+    calc.set_custom_metrics(BUILTIN_AS_CUSTOM)
+    generate(calc, rng, n_games)
+    games = snapshot(calc)
+    check_engines(calc, games, rng, diffs, "live")
+
+    # Caches patched by edits vs. the pitches after the edits
+    edit_randomly(calc, rng, max(5, n_games // 4))
+    games = snapshot(calc)
+    check_engines(calc, games, rng, diffs, "after edits")
+
+    # Player merges on top of the caches warmed above
+    merge_randomly(calc, rng, games)
+    check_engines(calc, games, rng, diffs, "merged")
+
+    # Cold reload of the single file
+    check_engines(PlateDisciplineCalculator(path), games, rng, diffs, "json reload")
+
+    # Sharded storage, reloaded, then with one season gzip-compressed
+    shards = os.path.join(work, "data")
+    calc.convert_storage(shards)
+    check_engines(PlateDisciplineCalculator(shards), games, rng, diffs, "sharded reload")
+    calc.compress_season(SEASONS[0])
+    check_engines(PlateDisciplineCalculator(shards), games, rng, diffs, "compressed reload")
+
+    # Archived season (stored aggregates), reloaded, and back
+    calc.archive_season(SEASONS[0])
+    check_engines(calc, games, rng, diffs, "archived")
+    check_engines(PlateDisciplineCalculator(shards), games, rng, diffs, "archived reload")
+    # Merges reach archived games only through the alias table
+    merge_randomly(calc, rng, games)
+    check_engines(calc, games, rng, diffs, "archived merged")
+    check_engines(PlateDisciplineCalculator(shards), games, rng, diffs, "archived merged reload")
+    calc.unarchive_season(SEASONS[0])
+    check_engines(calc, games, rng, diffs, "unarchived")
+
+    # Changeset round trip into an empty data file
+    changes = os.path.join(work, "changes.json")
+    calc.export_changeset(changes, all_games=True)
+    other = PlateDisciplineCalculator(os.path.join(work, "other.json"))
+    other.set_custom_metrics(BUILTIN_AS_CUSTOM)
+    other.import_changeset(changes)
+    check_engines(other, games, rng, diffs, "changeset import")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare every stats engine with a plain recount of random games.")
+    parser.add_argument("--games", type=int, default=500, help="games generated per round")
+    parser.add_argument("--rounds", type=int, default=4, help="rounds, each with fresh data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    diffs = run(args.games, args.seed, args.rounds)
+    if diffs.items:
+        print(f"\nDifferences (seed {args.seed}):")
+        for line in diffs.items:
+            print("  " + line)
+        return 1
+    print("All engines match the reference.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
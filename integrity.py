@@ -0,0 +1,94 @@
+from collections import Counter
+
+import replay
+from pitch import FIELDS, ZONES, RESULTS
+
+# Data integrity checks.
+# Per-game checks replay the game and compare it with what is stored; they are cheap enough
+# to rerun for every game that changed (the calculator caches results per game revision).
+# Cross-game checks (duplicate ids, unregistered players) run over the per-game results.
+# A problem is {"game": game id or None, "pitch": 0-based index or None, "message": text}.
+
+# Pitch fields a replay reproduces; batter / pitcher only for games with a start snapshot
+# (older games only know the final lineups)
+_REPLAYED_FIELDS = ("is_first_pitch", "inning", "is_top", "balls_before", "strikes_before", "lineup_slot")
+_STATE_FIELDS = ("inning", "is_top", "outs", "balls", "strikes", "current_batter_idx")
+
+
+def problem(game_id, pitch, message):
+    return {"game": game_id, "pitch": pitch, "message": message}
+
+
+def _game_names(g):
+    names = set()
+    for src in (g["teams"], g.get("start")):
+        if src:
+            for side in ("home", "away"):
+                names.update(src[side]["lineup"])
+                names.add(src[side]["pitcher"])
+    for ev in g.get("events", []):
+        if "name" in ev:
+            names.add(ev["name"])
+    return names
+
+
+def check_game(g):
+    """Problems within one game, and the player names it uses: (problems, names)."""
+    gid = g.get("id")
+    for key in ("teams", "state", "pitches"):
+        if key not in g:
+            return [problem(gid, None, f"Missing '{key}'")], set()
+
+    problems = []
+    names = _game_names(g)
+    replayed = _REPLAYED_FIELDS + (("batter", "pitcher") if "start" in g else ())
+    final = None
+    for i, (p, state, teams) in enumerate(replay.iter_pitch_states(g)):
+        if p is None:
+            final = state
+            break
+        missing = [f for f in FIELDS if f not in p]
+        if missing:
+            problems.append(problem(gid, i, "Missing " + ", ".join(missing)))
+        if p.get("zone") not in ZONES:
+            problems.append(problem(gid, i, f"Unknown zone {p.get('zone')!r}"))
+        if p.get("result") not in RESULTS:
+            problems.append(problem(gid, i, f"Unknown result {p.get('result')!r}"))
+            break # Cannot replay past it
+        names.update(p[f] for f in ("batter", "pitcher") if f in p)
+
+        derived = replay.derive_pitch_fields(state, teams)
+        wrong = [f for f in replayed if f in p and p[f] != derived[f]]
+        if wrong:
+            recorded = ", ".join(f"{f}={p[f]!r}" for f in wrong)
+            expected = ", ".join(f"{f}={derived[f]!r}" for f in wrong)
+            problems.append(problem(gid, i, f"Recorded {recorded} but the replay gives {expected}"))
+
+    if final is not None:
+        stored = g["state"]
+        wrong = [f for f in _STATE_FIELDS if stored.get(f) != final[f]]
+        if wrong:
+            recorded = ", ".join(f"{f}={stored.get(f)!r}" for f in wrong)
+            expected = ", ".join(f"{f}={final[f]!r}" for f in wrong)
+            problems.append(problem(gid, None, f"Stored state {recorded} does not match the pitches ({expected})"))
+    return problems, names
+
+
+def duplicate_ids(games):
+    counts = Counter(g["id"] for g in games)
+    return [problem(gid, None, f"Game id used {n} times") for gid, n in counts.items() if n > 1]
+
+
+def unregistered_players(names, players, aliases):
+    """Names used in games but missing from the player list, and aliases pointing nowhere."""
+    registered = set(players)
+    problems = []
+    for name in sorted(names - registered):
+        if name in aliases:
+            problems.append(problem(None, None, f"Merged player '{name}' is still used (now '{aliases[name]}')"))
+        else:
+            problems.append(problem(None, None, f"Player '{name}' is not in the player list"))
+    for alias, target in sorted(aliases.items()):
+        if target not in registered:
+            problems.append(problem(None, None, f"Alias '{alias}' points to unknown player '{target}'"))
+    return problems
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's function once the job has been cancelled."""
+
+
+class Job:
+    """
+    Handle passed to a job function. The function reports progress with `progress(done, total)`,
+    which also raises JobCancelled when the job was cancelled (call `check()` between steps
+    that do not report progress).
+    """
+
+    PROGRESS_INTERVAL = 0.05 # seconds between progress messages sent to the UI
+
+    def __init__(self, runner, fn, on_done, on_progress, on_error):
+        self.runner = runner
+        self.fn = fn
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self._cancelled = threading.Event()
+        self._last_progress = 0.0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def progress(self, done, total):
+        self.check()
+        now = time.perf_counter()
+        if self.on_progress and (now - self._last_progress >= self.PROGRESS_INTERVAL or done >= total):
+            self._last_progress = now
+            self.runner._post(self, "progress", (done, total))
+
+
+class JobRunner:
+    """
+    Runs jobs one at a time on a worker thread. Callbacks (on_done / on_progress / on_error)
+    always run on the thread that owns `schedule` (Tk: `root.after`), never on the worker:
+    the worker only puts messages on a queue, which a scheduled poll drains.
+    Submitting a job cancels the one before it, so only the latest request is shown.
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self._tasks = queue.Queue()
+        self._messages = queue.Queue()
+        self._current = None
+        self._polling = False
+        self._thread = threading.Thread(target=self._run, name="JobRunner", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, on_done, on_progress=None, on_error=None):
+        """Run `fn(job)` on the worker; `on_done(result)` gets its return value."""
+        self.cancel()
+        job = Job(self, fn, on_done, on_progress, on_error)
+        self._current = job
+        self._tasks.put(job)
+        if not self._polling:
+            self._polling = True
+            self.schedule(self.POLL_MS, self._poll)
+        return job
+
+    def cancel(self):
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+
+    def is_busy(self):
+        return self._current is not None
+
+    def _post(self, job, kind, payload):
+        self._messages.put((job, kind, payload))
+
+    def _run(self):
+        while True:
+            job = self._tasks.get()
+            if job.cancelled:
+                continue
+            try:
+                result = job.fn(job)
+            except JobCancelled:
+                continue
+            except Exception as e:
+                self._post(job, "error", e)
+                continue
+            self._post(job, "done", result)
+
+    def _poll(self):
+        while True:
+            try:
+                job, kind, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled or job is not self._current:
+                continue # Superseded: drop stale results
+            if kind == "progress":
+                job.on_progress(*payload)
+            elif kind == "done":
+                self._current = None
+                job.on_done(payload)
+            elif kind == "error":
+                self._current = None
+                if job.on_error:
+                    job.on_error(payload)
+                else:
+                    raise payload
+
+        if self._current is not None or not self._messages.empty():
+            self.schedule(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
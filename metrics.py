@@ -0,0 +1,175 @@
+import json
+
+from pitch import ZONES, RESULTS
+
+# User-defined metrics.
+# A metric is a ratio of two pitch predicates, written as plain data so it can be stored in
+# data["custom_metrics"] and edited without touching code:
+#
+#   {"name": "2S O-Swing%",
+#    "denominator": {"zone": "Out", "strikes": 2},
+#    "numerator": {"swing": true}}
+#
+# The numerator only counts pitches that also match the denominator, so it only needs the
+# extra conditions. A predicate is an AND of any of PREDICATE_FIELDS; an empty one matches
+# every pitch. Values are percentages unless "percent" is false.
+#
+# Predicates only look at zone, result, count and inning, so every pitch falls into one of
+# N_CLASSES classes. Counting pitches per class once gives everything any metric needs:
+# each predicate compiles to a mask over the classes, and all metrics are evaluated in one
+# pass over a player's class counts instead of one scan of the pitches per metric.
+
+MAX_INNING = 10 # innings from here on share a class ("extra innings")
+
+_RESULT_INDEX = {r: i for i, r in enumerate(RESULTS)}
+_ZONE_INDEX = {z: i for i, z in enumerate(ZONES)}
+_SWINGS = {"Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)"}
+_CONTACT = {"Foul", "In Play (Safe)", "In Play (Out)"}
+_PER_INNING = len(ZONES) * len(RESULTS) * 12
+N_CLASSES = MAX_INNING * _PER_INNING
+
+PREDICATE_FIELDS = {
+    "zone": "'In' or 'Out'",
+    "result": "a result or list of results",
+    "swing": "true / false",
+    "contact": "true / false",
+    "balls": "balls before the pitch (number or list)",
+    "strikes": "strikes before the pitch (number or list)",
+    "first_pitch": "true / false (0-0 count)",
+    "inning_from": f"first inning (inclusive, 1-{MAX_INNING}; {MAX_INNING} = extra innings)",
+    "inning_to": f"last inning (inclusive, 1-{MAX_INNING}; {MAX_INNING} = extra innings)"
+}
+
+
+def pitch_class(zone, result, balls, strikes, inning):
+    inning = min(max(inning, 1), MAX_INNING) - 1
+    return (((inning * 4 + balls) * 3 + strikes) * len(ZONES) + _ZONE_INDEX[zone]) * len(RESULTS) + _RESULT_INDEX[result]
+
+
+def zone_result(c):
+    """(zone, result) of a pitch class."""
+    rest, result = divmod(c, len(RESULTS))
+    return ZONES[rest % len(ZONES)], RESULTS[result]
+
+
+def _decode(c):
+    rest, result = divmod(c, len(RESULTS))
+    rest, zone = divmod(rest, len(ZONES))
+    rest, strikes = divmod(rest, 3)
+    inning, balls = divmod(rest, 4)
+    return ZONES[zone], RESULTS[result], balls, strikes, inning + 1
+
+
+def _as_set(value):
+    return set(value) if isinstance(value, (list, tuple, set)) else {value}
+
+
+def _check_predicate(name, part, pred):
+    if not isinstance(pred, dict):
+        raise ValueError(f"{name}: {part} must be an object")
+    unknown = set(pred) - set(PREDICATE_FIELDS)
+    if unknown:
+        raise ValueError(f"{name}: unknown condition {', '.join(sorted(unknown))} in {part}")
+    for key, allowed in (("zone", ZONES), ("result", RESULTS)):
+        if key in pred and not _as_set(pred[key]) <= set(allowed):
+            raise ValueError(f"{name}: {part} {key} must be one of {', '.join(allowed)}")
+    for key, top in (("balls", 3), ("strikes", 2)):
+        if key in pred and not all(isinstance(v, int) and 0 <= v <= top for v in _as_set(pred[key])):
+            raise ValueError(f"{name}: {part} {key} must be 0-{top}")
+    for key in ("swing", "contact", "first_pitch"):
+        if key in pred and not isinstance(pred[key], bool):
+            raise ValueError(f"{name}: {part} {key} must be true or false")
+    # Innings past MAX_INNING share its class, so a bound beyond it could not be honoured
+    for key in ("inning_from", "inning_to"):
+        if key in pred and not (isinstance(pred[key], int) and not isinstance(pred[key], bool) and 1 <= pred[key] <= MAX_INNING):
+            raise ValueError(f"{name}: {part} {key} must be 1-{MAX_INNING} ({MAX_INNING} = extra innings)")
+
+
+def validate(definitions):
+    """Check a list of metric definitions; raises ValueError naming the first problem."""
+    if not isinstance(definitions, list):
+        raise ValueError("Metric definitions must be a list")
+    names = set()
+    for d in definitions:
+        if not isinstance(d, dict) or not isinstance(d.get("name"), str) or not d["name"].strip():
+            raise ValueError("Every metric needs a name")
+        name = d["name"]
+        if name in names:
+            raise ValueError(f"Metric '{name}' is defined twice")
+        names.add(name)
+        unknown = set(d) - {"name", "numerator", "denominator", "percent"}
+        if unknown:
+            raise ValueError(f"{name}: unknown key {', '.join(sorted(unknown))}")
+        if "numerator" not in d:
+            raise ValueError(f"{name}: numerator is required")
+        _check_predicate(name, "numerator", d["numerator"])
+        _check_predicate(name, "denominator", d.get("denominator", {}))
+        if not isinstance(d.get("percent", True), bool):
+            raise ValueError(f"{name}: percent must be true or false")
+
+
+def _matches(pred, cls):
+    zone, result, balls, strikes, inning = cls
+    if "zone" in pred and zone not in _as_set(pred["zone"]):
+        return False
+    if "result" in pred and result not in _as_set(pred["result"]):
+        return False
+    if "swing" in pred and (result in _SWINGS) != pred["swing"]:
+        return False
+    if "contact" in pred and (result in _CONTACT) != pred["contact"]:
+        return False
+    if "balls" in pred and balls not in _as_set(pred["balls"]):
+        return False
+    if "strikes" in pred and strikes not in _as_set(pred["strikes"]):
+        return False
+    if "first_pitch" in pred and (balls == 0 and strikes == 0) != pred["first_pitch"]:
+        return False
+    # The last inning class stands for every extra inning
+    if "inning_from" in pred and inning < pred["inning_from"]:
+        return False
+    if "inning_to" in pred and inning > pred["inning_to"]:
+        return False
+    return True
+
+
+class CompiledMetrics:
+    """Metric definitions turned into per-class weights, evaluated together."""
+
+    def __init__(self, definitions):
+        validate(definitions)
+        self.names = [d["name"] for d in definitions]
+        self.scales = [100.0 if d.get("percent", True) else 1.0 for d in definitions]
+        classes = [_decode(c) for c in range(N_CLASSES)]
+        # Per class: indexes of the metrics whose denominator / numerator it counts toward
+        den_of = [[] for _ in range(N_CLASSES)]
+        num_of = [[] for _ in range(N_CLASSES)]
+        for i, d in enumerate(definitions):
+            den, num = d.get("denominator", {}), d["numerator"]
+            for c, cls in enumerate(classes):
+                if _matches(den, cls):
+                    den_of[c].append(i)
+                    if _matches(num, cls):
+                        num_of[c].append(i)
+        self._den_of = [tuple(x) for x in den_of]
+        self._num_of = [tuple(x) for x in num_of]
+
+    def evaluate(self, class_counts):
+        """{name: value or None (empty denominator)} from one player's {class: pitches}."""
+        k = len(self.names)
+        nums = [0] * k
+        dens = [0] * k
+        den_of, num_of = self._den_of, self._num_of
+        for c, n in class_counts.items():
+            for i in den_of[c]:
+                dens[i] += n
+            for i in num_of[c]:
+                nums[i] += n
+        return {
+            name: (nums[i] / dens[i] * self.scales[i]) if dens[i] else None
+            for i, name in enumerate(self.names)
+        }
+
+
+def definitions_key(definitions):
+    """Hashable form of a definition list (for cache keys)."""
+    return json.dumps(definitions, sort_keys=True, ensure_ascii=False)
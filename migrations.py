@@ -0,0 +1,37 @@
+import replay
+
+# Data schema versions.
+# data["schema_version"] records which of the steps below a data file has been through.
+# Each step runs once, when a newer version of the app first opens older data, and the
+# upgraded data is saved straight away. Code reading pitches can then rely on every record
+# having the current shape instead of guessing defaults for missing fields.
+#
+#   0: anything written before schema_version existed. Pitches from before v6.0 may lack
+#      balls_before / strikes_before / is_first_pitch / inning / is_top, and all of them
+#      predate lineup_slot.
+#   1: every pitch record has all of pitch.FIELDS.
+
+SCHEMA_VERSION = 1
+
+
+def _complete_pitch_records(game):
+    return replay.fill_pitch_fields(game)
+
+
+# version -> step that upgrades one game body from the version before it
+GAME_MIGRATIONS = {
+    1: _complete_pitch_records,
+}
+
+
+def needs_migration(data):
+    return data.get("schema_version", 0) < SCHEMA_VERSION
+
+
+def migrate_game(game, from_version):
+    """Run every step after `from_version` on one game; returns how many pitch records changed."""
+    changed = 0
+    for version in sorted(GAME_MIGRATIONS):
+        if version > from_version:
+            changed += GAME_MIGRATIONS[version](game)
+    return changed
@@ -0,0 +1,172 @@
+import sys
+from collections.abc import MutableMapping
+
+# Compact in-memory pitch record.
+# A plain dict per pitch costs several hundred bytes, and json.load creates a fresh string for
+# every batter/pitcher/result value. A slotted record with interned strings keeps one pointer
+# per field and shares each distinct name, while still reading like the dict it replaces
+# (p["batter"], p.get("balls_before", 0), dict(p)) and serializing to the same JSON.
+
+FIELDS = (
+    "batter", "pitcher", "zone", "result", "is_first_pitch",
+    "inning", "is_top", "balls_before", "strikes_before", "lineup_slot"
+)
+_FIELD_SET = frozenset(FIELDS)
+
+# The pitch vocabulary: every zone and result a record may hold (codes elsewhere index these tuples)
+ZONES = ("In", "Out")
+RESULTS = ("Ball", "Called Strike", "Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)", "Dead Ball")
+_intern = sys.intern
+
+
+class Pitch:
+    """
+    One pitch. Fields missing from the source record stay unset (so `get` falls back to its
+    default and `to_dict` leaves them out); unknown keys are kept in `extra`.
+    """
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, fields=None, **kwargs):
+        self.extra = None
+        if fields:
+            self.update(fields)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, d):
+        if isinstance(d, Pitch):
+            return d
+        return cls(d)
+
+    def to_dict(self):
+        d = {}
+        for f in FIELDS:
+            try:
+                d[f] = getattr(self, f)
+            except AttributeError:
+                pass
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    # --- dict interface ---
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if isinstance(value, str):
+            value = _intern(value)
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return bool(self.extra) and key in self.extra
+
+    def __iter__(self):
+        for f in FIELDS:
+            if hasattr(self, f):
+                yield f
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[k] for k in self]
+
+    def items(self):
+        return [(k, self[k]) for k in self]
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, "items") else other
+        for k, v in items:
+            self[k] = v
+        for k, v in kwargs.items():
+            self[k] = v
+
+    def copy(self):
+        p = Pitch.__new__(Pitch)
+        for f in FIELDS:
+            try:
+                setattr(p, f, getattr(self, f))
+            except AttributeError:
+                pass
+        p.extra = dict(self.extra) if self.extra else None
+        return p
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        # Field values are immutable (str / int / bool), so a shallow copy is a deep one
+        return self.copy()
+
+    def __eq__(self, other):
+        if isinstance(other, Pitch):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Pitch({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Pitch, (self.to_dict(),))
+
+
+MutableMapping.register(Pitch)
+
+
+def compact_pitches(game):
+    """Replace a game's pitch dicts with Pitch records in place; returns the game."""
+    pitches = game.get("pitches")
+    if pitches:
+        game["pitches"] = [Pitch.from_dict(p) for p in pitches]
+    return game
+
+
+def to_json(obj):
+    """`default=` hook for json.dump so Pitch records serialize as plain objects."""
+    if isinstance(obj, Pitch):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,47 +1,470 @@
+import bisect
+import csv
 import json
+import math
 import os
+import shutil
 import uuid
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import copy
 
+import replay
+import migrations
+import integrity
+import sync
+import sequences
+import sessions
+import metrics
+from pitch import Pitch, ZONES, RESULTS
+from players import PlayerIndex
+from diagnostics import timed
+from storage import (open_storage, game_summary, season_slug, JsonStorage, ShardedStorage, LazyGame,
+                     BackgroundSaver, write_season_archive, read_season_archive, remove_season_archive,
+                     write_changeset, read_changeset)
+
 class PlateDisciplineCalculator:
     def __init__(self, data_file='data.json'):
         self.data_file = data_file
+        self.storage = open_storage(data_file)
         self.data = self.load_data()
-        self.data = self.load_data()
-        self.current_game = None
-        self.history = []
+        self.sessions = sessions.SessionManager() # games open for input (see sessions.py)
+        self._rebuild_indexes()
+        self._replays = {}
+        # Per-game revision (bumped when save_data is told the game changed) and the
+        # filterable counters built from each game at a given revision
+        self._game_revs = {}
+        self._game_buckets = {}
+        self._integrity = {} # game id -> (revision, game, problems, player names)
+        self._sequence_cache = {} # season -> ((game id, revision) per game, sequence tables)
+        self._game_classes = {} # game id -> (revision, game, pitch-class counts for custom metrics)
+        self._compiled = None # (definitions key, metrics.CompiledMetrics)
+        # Built from archived seasons, keyed by (season, file, created): archives never change, so
+        # these survive data changes until a player merge renames what they were built from
+        self._archive_games = {}
+        self._archive_rollups = {}
+        self._archive_sequences = {}
+        # Changeset sync (see sync.py): this session's version-vector id, games changed since the last export
+        self._session = sync.new_session_id()
+        self._unexported = set(self.data.get("sync", {}).get("unexported", []))
+        self.players = PlayerIndex(self.data.get("players", []), self.data.get("player_aliases", {}),
+                                   self.data.get("player_readings", {}), self.data.get("player_recent"))
+
+        # Derived-data caches, dropped whenever data changes (see save_data)
+        self._data_version = 0
+        self._cache = {}
+        self._cache_version = 0
+
+        # Deferred / background persistence (see deferred_saves and flush)
+        self._defer_depth = 0
+        self._dirty = False
+        self._dirty_games = {}
+        self._saved_copies = {} # game id -> (revision, game, copy handed to the writer thread)
+        self._saved_values = {} # top-level key -> copy handed to the writer thread
+        self._storage_lock = threading.Lock()
+        self._saver = BackgroundSaver(self._write)
+
+        if migrations.needs_migration(self.data):
+            self.migrate_schema()
+        if "player_recent" not in self.data:
+            self._backfill_player_recent()
+
+    @property
+    def current_game(self):
+        """The game of the active session (what pitches are logged to), or None."""
+        session = self.sessions.active
+        return session.game if session else None
 
+    @property
+    def data_version(self):
+        """Bumped by every change (see save_data); lets a background job tell whether its inputs moved under it."""
+        return self._data_version
+
+    @property
+    def history(self):
+        """Undo snapshots of the active session."""
+        session = self.sessions.active
+        return session.history if session else []
+
+    @timed
     def load_data(self):
-        if not os.path.exists(self.data_file):
-            return {"games": [], "players": []}
+        return self.storage.load()
+
+    # --- Game Indexes ---
+    # id -> game, plus season/team -> {game_id: game} (dicts keep insertion order)
+
+    def _rebuild_indexes(self):
+        self._games_by_id = {}
+        self._games_by_season = {}
+        self._games_by_team = {}
+        for g in self.data["games"]:
+            self._index_game(g)
+
+    def _index_game(self, g):
+        gid = g["id"]
+        summary = game_summary(g)
+        self._games_by_id[gid] = g
+        self._games_by_season.setdefault(summary["season"], {})[gid] = g
+        for side in ("home", "away"):
+            self._games_by_team.setdefault(summary[side], {})[gid] = g
+
+    def _unindex_game(self, g):
+        gid = g["id"]
+        summary = game_summary(g)
+        self._games_by_id.pop(gid, None)
+        season = summary["season"]
+        bucket = self._games_by_season.get(season)
+        if bucket is not None:
+            bucket.pop(gid, None)
+            if not bucket:
+                del self._games_by_season[season]
+        for side in ("home", "away"):
+            team = summary[side]
+            bucket = self._games_by_team.get(team)
+            if bucket is not None:
+                bucket.pop(gid, None)
+                if not bucket:
+                    del self._games_by_team[team]
+
+    def get_game(self, game_id):
+        """Return the game dict for `game_id`, or None."""
+        return self._games_by_id.get(game_id)
+
+    def get_games(self, season_filter=None, team_filter=None):
+        """Return games (in stored order) matching the optional season and team."""
+        if season_filter is None and team_filter is None:
+            return list(self.data["games"])
+
+        if season_filter is not None and team_filter is not None:
+            by_season = self._games_by_season.get(season_filter, {})
+            by_team = self._games_by_team.get(team_filter, {})
+            # Walk the smaller bucket, probe the larger
+            if len(by_season) > len(by_team):
+                by_season, by_team = by_team, by_season
+            return [g for gid, g in by_season.items() if gid in by_team]
+
+        if season_filter is not None:
+            return list(self._games_by_season.get(season_filter, {}).values())
+        return list(self._games_by_team.get(team_filter, {}).values())
+
+    @timed
+    def save_data(self, games=None, track=True):
+        """
+        Persist data. `games`: games whose content changed (default: the current game).
+        Sharded storage only rewrites those games' shards (plus the manifest if needed).
+        track: count the change in the games' version vectors and queue them for the next
+        changeset export (False for changes that are not edits: migrations, imports).
+        """
+        if games is None:
+            games = [self.current_game] if self.current_game else []
+
+        # Every mutation ends in save_data, so this is where caches go stale
+        self._data_version += 1
+        for g in games:
+            self._game_revs[g["id"]] = self._game_revs.get(g["id"], 0) + 1
+            if track:
+                self._track_change(g)
+
+        if self._defer_depth:
+            # Inside deferred_saves(): just remember what changed
+            for g in games:
+                self._dirty_games[g["id"]] = g
+            self._dirty = True
+            return
+
+        # Never let an older background snapshot land after this save
+        self._saver.wait()
+        self._write(self.data, games)
+
+    def _cached(self, key, compute):
+        """Return compute() memoized under `key` until the data next changes."""
+        if self._cache_version != self._data_version:
+            self._cache = {}
+            self._cache_version = self._data_version
+        # Keep the dict compute() started under: if the data changes meanwhile (a worker thread,
+        # see warm_stats), the result lands in the discarded cache, not the new one
+        cache = self._cache
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def _write(self, data, games):
+        with self._storage_lock:
+            self.storage.save(data, games)
+
+    @contextmanager
+    def deferred_saves(self):
+        """
+        Within this block save_data() only marks data dirty; call flush() afterwards.
+        Lets a burst of pitches be applied in memory and written once.
+        """
+        self._defer_depth += 1
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {"games": [], "players": []}
+            yield
+        finally:
+            self._defer_depth -= 1
+
+    def _snapshot(self, games):
+        """
+        Copy everything a save serializes, so the writer thread never reads a structure that
+        keeps changing on the UI thread. A game's copy is reused until its revision changes,
+        so a flush only copies the games edited since the previous one; unloaded shards are
+        stood in for by their summaries (the writer only lists them).
+        """
+        copies = {}
+        snapshot_games = []
+        for g in self.data["games"]:
+            if isinstance(g, LazyGame) and not g.loaded:
+                snapshot_games.append(LazyGame(self.storage, dict(g.summary)))
+                continue
+            rev = self._game_revs.get(g["id"], 0)
+            hit = self._saved_copies.get(g["id"])
+            if hit is None or hit[0] != rev or hit[1] is not g:
+                hit = (rev, g, copy.deepcopy(g))
+            copies[g["id"]] = hit
+            snapshot_games.append(hit[2])
+        self._saved_copies = copies
+        data = {}
+        for k, v in self.data.items():
+            if k == "games":
+                data[k] = snapshot_games
+                continue
+            # An unchanged value (archive counters, mostly) keeps its copy: comparing is far cheaper than copying
+            prev = self._saved_values.get(k)
+            data[k] = prev if prev is not None and prev == v else copy.deepcopy(v)
+        self._saved_values = {k: v for k, v in data.items() if k != "games"}
+        # Deleted games have no copy: dropping them from the manifest is all their save needs
+        return data, [copies[g["id"]][2] for g in games if g["id"] in copies]
+
+    @timed
+    def flush(self, background=False):
+        """
+        Write changes collected by deferred_saves().
+        background=True hands a snapshot to the writer thread and returns immediately.
+        """
+        if self._dirty:
+            games = list(self._dirty_games.values())
+            self._dirty = False
+            self._dirty_games = {}
+            if background:
+                data, copies = self._snapshot(games)
+                self._saver.submit(data, copies)
+                return
+            self._saver.wait()
+            self._write(self.data, games)
+        elif not background:
+            self._saver.wait()
+
+    def pop_save_error(self):
+        """Return (and clear) the last error raised by a background save, if any."""
+        err = self._saver.error
+        self._saver.error = None
+        return err
+
+    def has_pending_saves(self):
+        return self._dirty or not self._saver.is_idle()
+
+    def close(self):
+        """Flush everything to disk; call before the application exits."""
+        self.flush()
+        err = self.pop_save_error()
+        if err:
+            raise err
+
+    def pop_recovery_notes(self):
+        """Files the storage replaced from backups (or moved aside) since the last call."""
+        notes = list(self.storage.recovered)
+        self.storage.recovered.clear()
+        return notes
+
+    def create_backup(self):
+        """Write pending changes, then back up the data files now. Returns the backup path (None if skipped)."""
+        self.flush()
+        with self._storage_lock:
+            return self.storage.backup()
+
+    @timed
+    def check_integrity(self, load_all=False):
+        """
+        Problems in the data (see integrity.py). Per-game checks rerun only for games saved
+        since the last call; duplicate ids and unregistered players are checked every time.
+        Games not loaded yet (sharded storage) are skipped unless load_all.
+        """
+        problems = []
+        names = set()
+        checked = set()
+        for g in self.data["games"]:
+            if isinstance(g, LazyGame) and not g.loaded:
+                if not load_all:
+                    continue
+                g.load()
+            rev = self._game_revs.get(g["id"], 0)
+            hit = self._integrity.get(g["id"])
+            if hit is None or hit[0] != rev or hit[1] is not g:
+                hit = self._integrity[g["id"]] = (rev, g) + integrity.check_game(g)
+            problems.extend(hit[2])
+            names |= hit[3]
+            checked.add(g["id"])
+        for gid in [gid for gid in self._integrity if gid not in checked]:
+            del self._integrity[gid]
+
+        problems.extend(integrity.duplicate_ids(self.data["games"]))
+        problems.extend(integrity.unregistered_players(names, self.data.get("players", []),
+                                                       self.data.get("player_aliases", {})))
+        return problems
+
+    def is_sharded(self):
+        return isinstance(self.storage, ShardedStorage)
 
-    def save_data(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=4, ensure_ascii=False)
+    def convert_storage(self, path):
+        """
+        Rewrite all data into a new location and switch to it.
+        A directory path gives sharded storage, a `.json` path the single-file layout.
+        Season archives are copied along (their paths are relative to the storage root).
+        The old files are left untouched.
+        """
+        self.flush()
+        for g in self.data["games"]:
+            if isinstance(g, LazyGame):
+                g.load()
+
+        ext = os.path.splitext(path)[1]
+        new_storage = ShardedStorage(path) if (os.path.isdir(path) or not ext) else JsonStorage(path)
+        for archive in self.data.get("archives", {}).values():
+            src = self._archive_path(archive["file"])
+            dst = os.path.join(new_storage.base_dir(), *archive["file"].split("/"))
+            if os.path.abspath(src) != os.path.abspath(dst):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                remove_season_archive(dst) # A stale read-only copy from an earlier conversion
+                shutil.copy2(src, dst)
+        new_storage.save(self.data, self.data["games"])
+        self.storage = new_storage
+        self.data_file = path
+
+    def compress_season(self, season):
+        """Gzip the shards of one season (sharded storage only). Returns the number of games compressed."""
+        if not self.is_sharded():
+            raise ValueError("Season compression requires sharded storage")
+        self.flush()
+        with self._storage_lock:
+            return self.storage.compress_season(self.data, season)
+
+    def get_data_summary(self):
+        """Return size information about the loaded data (for the diagnostics panel)."""
+        loaded = [g for g in self.data["games"] if not (isinstance(g, LazyGame) and not g.loaded)]
+        return {
+            "data_file": self.data_file,
+            "storage": "sharded" if self.is_sharded() else "single file",
+            "file_bytes": self.storage.size_bytes(),
+            "games": len(self.data["games"]),
+            "loaded_games": len(loaded),
+            "pitches": sum(len(g["pitches"]) for g in loaded),
+            "players": len(self.data.get("players", [])),
+            "history_depth": len(self.history),
+            "backups": len(self.storage.backups.list())
+        }
+
+    @timed
+    def migrate_schema(self):
+        """
+        One-time upgrade of data written by an older version (see migrations.py).
+        Every game is loaded and upgraded, archived seasons are rewritten with recounted
+        aggregates, and the result is saved. Returns the number of pitch records changed.
+        """
+        version = self.data.get("schema_version", 0)
+        changed = 0
+        for g in self.data["games"]:
+            if isinstance(g, LazyGame):
+                g.load()
+            changed += migrations.migrate_game(g, version)
+
+        for season, archive in self.data.get("archives", {}).items():
+            path = self._archive_path(archive["file"])
+            games = read_season_archive(path)["games"]
+            archive_changed = sum(migrations.migrate_game(g, version) for g in games)
+            if archive_changed:
+                aggregates = {"batter": {}, "pitcher": {}}
+                for g in games:
+                    self._count_pitches(g["pitches"], "batter", aggregates["batter"])
+                    self._count_pitches(g["pitches"], "pitcher", aggregates["pitcher"])
+                write_season_archive(path, season, games, aggregates)
+                archive["aggregates"] = aggregates
+                changed += archive_changed
+
+        self.data["schema_version"] = migrations.SCHEMA_VERSION
+        if self.data["games"] or self.data.get("archives"):
+            self.save_data(self.data["games"], track=False)
+        return changed
 
     def get_player_list(self):
         return sorted(self.data.get("players", []))
 
+    def resolve_player(self, name):
+        """Registered spelling of a typed name (NFKC / width / spacing / aliases folded)."""
+        return self.players.resolve(name)
+
+    def _backfill_player_recent(self):
+        """
+        Build the last-appearance registry (for autocomplete ranking) from the games in memory.
+        Runs once; the registry is saved with the data and kept up to date afterwards.
+        """
+        for g in self.data["games"]:
+            if isinstance(g, LazyGame) and not g.loaded:
+                continue
+            names = {"home": set(g["teams"]["home"]["lineup"]), "away": set(g["teams"]["away"]["lineup"])}
+            for side in ("home", "away"):
+                names[side].add(g["teams"][side]["pitcher"])
+            for p in g["pitches"]:
+                bat, pit = ("away", "home") if p["is_top"] else ("home", "away")
+                names[bat].add(p["batter"])
+                names[pit].add(p["pitcher"])
+            for side in ("home", "away"):
+                for name in names[side]:
+                    self.players.touch(name, g.get("date", ""), g["teams"][side]["name"])
+        self.data["player_recent"] = self.players.recent
+
+    def _note_players(self, names, team_key):
+        """Record that `names` appeared in the current game for one side (recency for autocomplete)."""
+        g = self.current_game
+        for name in names:
+            self.players.touch(name, g["date"], g["teams"][team_key]["name"])
+        self.data["player_recent"] = self.players.recent
+
+    def complete_players(self, text, team=None, limit=10):
+        """Autocomplete: registered players matching the typed prefix (see PlayerIndex.complete)."""
+        return self.players.complete(text, team, limit)
+
+    def set_player_reading(self, name, reading):
+        """Set (or clear with '') the kana reading a player can also be found by."""
+        self.players.set_reading(name, reading.strip())
+        self.data["player_readings"] = self.players.readings
+        self.save_data([])
+
     def add_player(self, name):
+        """Register a player; returns the name as stored (an existing spelling if it matches one)."""
+        name = self.resolve_player(name)
         if name not in self.data["players"]:
             self.data["players"].append(name)
-            self.save_data()
+            self.players.add(name)
+            self.save_data([])
+        return name
 
+    @timed
     def start_new_game(self, home_team, away_team, home_lineup, away_lineup, home_pitcher, away_pitcher, season=""):
         if len(home_lineup) != 9:
             raise ValueError(f"Home lineup must have exactly 9 players. Current: {len(home_lineup)}")
         if len(away_lineup) != 9:
             raise ValueError(f"Away lineup must have exactly 9 players. Current: {len(away_lineup)}")
 
+        home_lineup = [self.resolve_player(p) for p in home_lineup]
+        away_lineup = [self.resolve_player(p) for p in away_lineup]
+        home_pitcher = self.resolve_player(home_pitcher)
+        away_pitcher = self.resolve_player(away_pitcher)
+
         game_id = str(uuid.uuid4())
         
-        self.current_game = {
+        game = {
             "id": game_id,
             "season": season,
             "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -57,19 +480,20 @@ class PlateDisciplineCalculator:
                     "pitcher": away_pitcher
                 }
             },
-            "state": {
-                "inning": 1,
-                "is_top": True, # True = Top (Away bats), False = Bottom (Home bats)
-                "outs": 0,
-                "balls": 0,
-                "strikes": 0,
-                "current_batter_idx": {"home": 0, "away": 0},
-                "score": {"home": 0, "away": 0}
+            "state": replay.new_state(),
+            "pitches": [],
+            # Replay inputs: starting lineups plus non-pitch events (see replay.py)
+            "start": {
+                "home": {"lineup": list(home_lineup), "pitcher": home_pitcher},
+                "away": {"lineup": list(away_lineup), "pitcher": away_pitcher}
             },
-            "pitches": []
+            "events": []
         }
         
-        self.history = [] # Reset history for new game
+        # Opens alongside any games already in progress
+        self.sessions.open(game)
+        self._note_players(home_lineup + [home_pitcher], "home")
+        self._note_players(away_lineup + [away_pitcher], "away")
         
         # Register all players
         for p in home_lineup + away_lineup:
@@ -78,6 +502,7 @@ class PlateDisciplineCalculator:
         self.add_player(away_pitcher)
 
         self.data["games"].append(self.current_game)
+        self._index_game(self.current_game)
         self.save_data()
         return self.current_game
     
@@ -95,13 +520,13 @@ class PlateDisciplineCalculator:
             "team": team_name,
             "pitcher": pitcher_name
         }
-        self.save_data()
+        self.save_data([])
 
     def delete_lineup(self, name):
         """Delete a saved lineup."""
         if "saved_lineups" in self.data and name in self.data["saved_lineups"]:
             del self.data["saved_lineups"][name]
-            self.save_data()
+            self.save_data([])
 
     def get_saved_lineups(self):
         """Return dict of saved lineups."""
@@ -136,72 +561,145 @@ class PlateDisciplineCalculator:
             "score": state["score"]
         }
 
-    def get_game_list(self):
-        """Return list of (id, date, home_team, away_team, score_h, score_a, season) for all games."""
+    @timed
+    def get_game_list(self, season_filter=None, team_filter=None):
+        """Return list of (id, date, home_team, away_team, score_h, score_a, season, archived) for all games."""
+        summaries = [(game_summary(g), False) for g in self.get_games(season_filter, team_filter)]
+        for season, archive in self.data.get("archives", {}).items():
+            if season_filter is not None and season != season_filter:
+                continue
+            for summary in archive["games"]:
+                if team_filter is None or team_filter in (summary["home"], summary["away"]):
+                    summaries.append((summary, True))
+
         games = []
-        for g in self.data["games"]:
-            s = g["state"]["score"]
-            h_name = g["teams"]["home"]["name"]
-            a_name = g["teams"]["away"]["name"]
-            title = f"{h_name} vs {a_name}"
+        for s, archived in summaries:
+            # Summary avoids loading shards just to list games
+            title = f"{s['home']} vs {s['away']}"
             games.append({
-                "id": g["id"],
-                "date": g["date"],
-                "season": g.get("season", ""),
+                "id": s["id"],
+                "date": s["date"],
+                "season": s["season"],
                 "title": title,
-                "score_home": s["home"],
-                "score_away": s["away"]
+                "score_home": s["score_home"],
+                "score_away": s["score_away"],
+                "archived": archived
             })
         return games
 
     def get_season_list(self):
         """Return a sorted list of unique seasons found in games."""
-        seasons = set()
-        for g in self.data["games"]:
-            seasons.add(g.get("season", "").strip())
+        seasons = set(s.strip() for s in self._games_by_season)
+        seasons.update(s.strip() for s in self.data.get("archives", {}))
         return sorted([s for s in seasons if s])
 
+    def get_team_list(self):
+        """Return a sorted list of unique team names found in games."""
+        teams = set(t.strip() for t in self._games_by_team)
+        for archive in self.data.get("archives", {}).values():
+            for summary in archive["games"]:
+                teams.add(summary["home"].strip())
+                teams.add(summary["away"].strip())
+        return sorted([t for t in teams if t])
+
+    @timed
     def delete_game(self, game_id):
-        self.data["games"] = [g for g in self.data["games"] if g["id"] != game_id]
-        if self.current_game and self.current_game["id"] == game_id:
-            self.current_game = None
-        self.save_data()
+        game = self._games_by_id.get(game_id)
+        if game is None:
+            return
+        # Tombstone, so the deletion reaches other machines with the next changeset
+        self._sync_state()["deleted"][game_id] = self._game_versions(game)
+        self._remove_game(game)
+        self.save_data([])
 
-    def load_game(self, game_id):
-        """Load an existing game and set it as current."""
-        found = None
-        for g in self.data["games"]:
-            if g["id"] == game_id:
-                found = g
+    def _remove_game(self, game):
+        self._unindex_game(game)
+        # Identity scan only to find the list position; no list rebuild
+        for i, g in enumerate(self.data["games"]):
+            if g is game:
+                del self.data["games"][i]
                 break
+        self._replays.pop(game["id"], None)
+        self.sessions.close(game["id"])
+
+    @timed
+    def load_game(self, game_id):
+        """
+        Open an existing game for input and make it current. A game that is already open
+        just becomes the active one again, keeping its undo history.
+        """
+        found = self._games_by_id.get(game_id)
         
         if found:
-            self.current_game = found
-            self.history = [] # Reset history regarding of previous state
+            if isinstance(found, LazyGame):
+                found.load()
+            self.sessions.open(found)
             return True
         return False
 
-    def _save_state(self):
-        """Push current state to history."""
-        if self.current_game:
-            self.history.append(copy.deepcopy(self.current_game))
+    def switch_game(self, game_id):
+        """Make an open game current. Returns False if it is not open."""
+        session = self.sessions.get(game_id)
+        if session is None:
+            return False
+        self.sessions.open(session.game)
+        return True
+
+    def close_game(self, game_id=None):
+        """Stop inputting a game (default: the current one); the game itself stays saved."""
+        session = self.sessions.get(game_id) if game_id else self.sessions.active
+        if session is not None:
+            self.sessions.close(session.game["id"])
+
+    def get_open_games(self):
+        """Games open for input, in the order they were opened: summary plus inning, half, undo depth and whether active."""
+        active = self.current_game
+        out = []
+        for session in self.sessions:
+            g = session.game
+            info = game_summary(g)
+            info["inning"] = g["state"]["inning"]
+            info["is_top"] = g["state"]["is_top"]
+            info["undo"] = len(session.history)
+            info["active"] = g is active
+            out.append(info)
+        return out
 
+    @timed
+    def _save_state(self, game=None):
+        """Push a game's state (default: the current game) to its session's undo history."""
+        session = self.sessions.get(game["id"]) if game else self.sessions.active
+        if session:
+            session.history.append(copy.deepcopy(session.game))
+
+    @timed
     def undo(self):
-        """Revert to previous state."""
-        if not self.history:
+        """Revert the current game to its previous state."""
+        session = self.sessions.active
+        if not session or not session.history:
             return False
         
-        self.current_game = self.history.pop()
+        snapshot = session.history.pop()
         
-        # Update the game in the main data list to match the reverted state
-        for i, g in enumerate(self.data["games"]):
-            if g["id"] == self.current_game["id"]:
-                self.data["games"][i] = self.current_game
-                break
+        # Restore into the live game dict in place, so data["games"] and the
+        # indexes keep pointing at the same object
+        live = self._games_by_id.get(snapshot["id"])
+        if live is None:
+            session.game = snapshot
+        else:
+            # The snapshot's version vector is one that may already have been exported: keep the
+            # live one, so the save below makes the undone game newer than every copy sent out
+            snapshot["versions"] = sync.merged(snapshot.get("versions") or {}, self._game_versions(live))
+            live.clear()
+            live.update(snapshot)
+            session.game = live
+        # A pitch edit may have changed records before the end, so replay from scratch
+        self._get_replay(self.current_game).invalidate_from(0)
                 
         self.save_data()
         return True
 
+    @timed
     def log_pitch(self, zone, result, is_first_pitch):
         if not self.current_game:
             raise ValueError("No active game")
@@ -220,17 +718,22 @@ class PlateDisciplineCalculator:
         pre_balls = raw_state["balls"]
         pre_strikes = raw_state["strikes"]
         
-        pitch_data = {
-            "batter": derived_state["batter"],
-            "pitcher": derived_state["pitcher"],
-            "zone": zone,
-            "result": result,
-            "is_first_pitch": is_first_pitch,
-            "inning": raw_state["inning"],
-            "is_top": raw_state["is_top"],
-            "balls_before": pre_balls,     # NEW for v6.0
-            "strikes_before": pre_strikes  # NEW for v6.0
-        }
+        batting_key = "away" if raw_state["is_top"] else "home"
+        lineup = self.current_game["teams"][batting_key]["lineup"]
+        slot = raw_state["current_batter_idx"][batting_key] % len(lineup)
+        
+        pitch_data = Pitch(
+            batter=derived_state["batter"],
+            pitcher=derived_state["pitcher"],
+            zone=zone,
+            result=result,
+            is_first_pitch=is_first_pitch,
+            inning=raw_state["inning"],
+            is_top=raw_state["is_top"],
+            balls_before=pre_balls,     # NEW for v6.0
+            strikes_before=pre_strikes, # NEW for v6.0
+            lineup_slot=slot            # NEW: batting order slot (0-8)
+        )
         self.current_game["pitches"].append(pitch_data)
         
         # Update Counts
@@ -240,101 +743,56 @@ class PlateDisciplineCalculator:
 
     def _update_counts(self, result, state_info):
         """Internal logic to update balls, strikes, outs, innings."""
-        s = self.current_game["state"]
-        
-        if result == "Ball":
-            s["balls"] += 1
-            if s["balls"] >= 4:
-                self._next_batter() # Walk
-        
-        elif result in ["Called Strike", "Swinging Strike"]:
-            if s["strikes"] < 2:
-                s["strikes"] += 1
-            else:
-                self._record_out() # Strikeout
-        
-        elif result == "Foul":
-            if s["strikes"] < 2:
-                s["strikes"] += 1
-            # Foul with 2 strikes stays at 2 strikes
-        
-        elif result == "Dead Ball":
-            self._next_batter()
-
-        elif "In Play" in result:
-            if "(Out)" in result:
-                self._record_out()
-            else:
-                self._next_batter() # Assume Safe/Hit/Error if not explicitly Out 
+        replay.apply_result(self.current_game["state"], result)
 
     # Explicit methods for Outs and Advances to be called by GUI
     def record_out_explicit(self):
         """Call this when a batter makes an out in play."""
+        self._log_event({"type": "batter_out"})
         self._record_out()
 
     def record_safe_explicit(self):
         """Call this when a batter reaches base in play."""
+        self._log_event({"type": "batter_safe"})
         self._next_batter()
 
+    def _log_event(self, event):
+        """Record a non-pitch action so the game can be replayed (see replay.py)."""
+        event["at"] = len(self.current_game["pitches"])
+        self.current_game.setdefault("events", []).append(event)
+
     def _next_batter(self):
         """Reset count and move to next batter in lineup."""
-        s = self.current_game["state"]
-        s["balls"] = 0
-        s["strikes"] = 0
-        
-        team_key = "away" if s["is_top"] else "home"
-        s["current_batter_idx"][team_key] += 1
-        
+        replay.next_batter(self.current_game["state"])
         self.save_data()
 
+    @timed
     def record_runner_out(self):
         """Manually record an out (caught stealing, pick-off, etc.). 
         Does not advance to next batter even if it's the 3rd out."""
         if not self.current_game: return
         self._save_state()
         
-        s = self.current_game["state"]
-        s["outs"] += 1
-        
-        if s["outs"] >= 3:
-            self._switch_sides()
-        else:
-            self.save_data()
+        self._log_event({"type": "runner_out"})
+        replay.runner_out(self.current_game["state"])
+        self.save_data()
 
     def _record_out(self):
         """Increment outs. Switch sides if 3 outs."""
-        s = self.current_game["state"]
-        s["outs"] += 1
-        s["balls"] = 0
-        s["strikes"] = 0
-        
-        # Batter index increments even on an out
-        team_key = "away" if s["is_top"] else "home"
-        s["current_batter_idx"][team_key] += 1
-
-        if s["outs"] >= 3:
-            self._switch_sides()
-            
+        replay.record_out(self.current_game["state"])
         self.save_data()
 
     def _switch_sides(self):
-        s = self.current_game["state"]
-        s["outs"] = 0
-        s["balls"] = 0
-        s["strikes"] = 0
-        
-        if s["is_top"]:
-            s["is_top"] = False # Go to Bottom
-        else:
-            s["is_top"] = True # Go to Top of Next Inning
-            s["inning"] += 1
+        replay.switch_sides(self.current_game["state"])
 
+    @timed
     def substitute_batter(self, new_batter_name):
         """Replace the current batter in the lineup with a new player (Pinch Hitter)."""
         if not self.current_game:
             return
             
         self._save_state()
+        new_batter_name = self.resolve_player(new_batter_name)
 
         s = self.current_game["state"]
         # Identify current team
@@ -348,125 +806,325 @@ class PlateDisciplineCalculator:
         # Note: In real baseball, the player is replaced in the lineup slot permanently for the game.
         slot_idx = idx % len(lineup)
         lineup[slot_idx] = new_batter_name
+        self._log_event({"type": "sub_batter", "team": team_key, "slot": slot_idx, "name": new_batter_name})
+        self._note_players([new_batter_name], team_key)
         
         self.add_player(new_batter_name)
         self.save_data()
 
+    @timed
     def change_pitcher(self, new_pitcher_name):
         """Update the current pitcher for the fielding team."""
         if not self.current_game:
             return
         
         self._save_state()
+        new_pitcher_name = self.resolve_player(new_pitcher_name)
             
         s = self.current_game["state"]
         # If top, away is batting, home is pitching.
         pitching_team_key = "home" if s["is_top"] else "away"
         
         self.current_game["teams"][pitching_team_key]["pitcher"] = new_pitcher_name
+        self._log_event({"type": "change_pitcher", "team": pitching_team_key, "name": new_pitcher_name})
+        self._note_players([new_pitcher_name], pitching_team_key)
         self.add_player(new_pitcher_name)
         self.save_data()
 
-    def get_aggregate_stats(self, role_filter=None, season_filter=None):
+    COUNTER_KEYS = [
+        "PA", "Pitches",
+        "Swing", "Contact",
+        "O-Swing", "O-Pitch",
+        "Z-Swing", "Z-Pitch",
+        "Z-Contact", "O-Contact",
+        "FirstPitch", "FirstStrike",
+        "SwingingStrike", "CalledStrike",
+        "TwoStrikePitches", "Strikeouts"
+    ]
+
+    @timed
+    def get_aggregate_stats(self, role_filter=None, season_filter=None, filters=None):
         """
         Calculate stats.
         role_filter: 'batter' (returns stats where player was batter), 'pitcher' (where player was pitcher), or None (all).
         season_filter: if params provided, filter only games with matching season string.
+        filters: optional dashboard filters (see STAT_FILTERS).
+        Archived seasons contribute their stored counters instead of re-reading pitches.
         """
-        stats = {}
-        
-        for g in self.data["games"]:
-            # Check Season Filter
-            if season_filter:
-                g_season = g.get("season", "")
-                if g_season != season_filter:
+        fkey = self._filter_key(season_filter, filters)
+        return self._cached(("aggregate", role_filter, fkey),
+                            lambda: self._final_stats(self._aggregate_counters(role_filter, season_filter, filters)))
+
+    def _aggregate_counters(self, role_filter=None, season_filter=None, filters=None):
+        """Raw counters (player -> counter dict) behind get_aggregate_stats."""
+        fkey = self._filter_key(season_filter, filters)
+        if any(k != "season" for k, _v in fkey):
+            return self._cached(("filtered_counters", role_filter, fkey), lambda: self._filtered_counters(role_filter, dict(fkey)))
+
+        roles = [role_filter] if role_filter in ("batter", "pitcher") else ["batter", "pitcher"]
+
+        def compute():
+            stats = {}
+
+            def merge(player, counters):
+                if player not in stats:
+                    stats[player] = dict.fromkeys(self.COUNTER_KEYS, 0)
+                s = stats[player]
+                for k in self.COUNTER_KEYS:
+                    s[k] += counters.get(k, 0)
+
+            # Live seasons: sums of the cached per-season counters (patched in place by pitch edits)
+            seasons = [season_filter] if season_filter else list(self._games_by_season)
+            for season in seasons:
+                if season not in self._games_by_season:
                     continue
+                counters = self._live_rollup_counters(season)
+                for role in roles:
+                    for (_team, player, _slot), c in counters[role].items():
+                        merge(player, c)
 
-            for p in g["pitches"]:
-                # Determine targets
-                targets = []
-                if role_filter == "batter":
-                    targets.append(p["batter"])
-                elif role_filter == "pitcher":
-                    targets.append(p["pitcher"])
+            for season, archive in list(self.data.get("archives", {}).items()):
+                if season_filter and season != season_filter:
+                    continue
+                for role in roles:
+                    for player, counters in archive["aggregates"][role].items():
+                        merge(player, counters)
+
+            return stats
+
+        return self._cached(("aggregate_counters", role_filter, season_filter or None), compute)
+
+    # Rate stats of _final_stats (everything except the PA / Pitches counts)
+    RATE_STATS = [
+        "Swing%", "O-Swing%", "Z-Swing%",
+        "Contact%", "O-Contact%", "Z-Contact%",
+        "Zone%", "F-Strike%", "Whiff%",
+        "Put Away%", "SwStr%", "CStr%", "CSW%"
+    ]
+
+    @timed
+    def get_relative_stats(self, role="batter", season_filter=None, min_pa=0, min_pitches=0, filters=None):
+        """
+        League-relative versions of every rate stat for one role and season:
+          'league':     league rate (from the summed counters, not a mean of player rates)
+          'plus':       {player: {stat: 100 * player / league}} (100 = league average; None if league is 0)
+          'percentile': {player: {stat: 0-100}} for players with at least min_pa PA and min_pitches pitches
+          'qualified':  number of players ranked
+        All stats are computed in one pass and cached per role / season / thresholds.
+        """
+        if role not in ("batter", "pitcher"):
+            raise ValueError(f"Unknown role: {role}")
+
+        def compute():
+            counters = self._aggregate_counters(role, season_filter, filters)
+            stats = self.get_aggregate_stats(role, season_filter, filters)
+
+            totals = dict.fromkeys(self.COUNTER_KEYS, 0)
+            for c in counters.values():
+                for k in self.COUNTER_KEYS:
+                    totals[k] += c[k]
+            league = self._final_stats({"": totals})[""]
+
+            qualified = [n for n, s in stats.items() if s["PA"] >= min_pa and s["Pitches"] >= min_pitches]
+            plus = {n: {} for n in stats}
+            percentile = {n: {} for n in qualified}
+            for stat in self.RATE_STATS:
+                avg = league[stat]
+                for n, s in stats.items():
+                    plus[n][stat] = s[stat] / avg * 100 if avg else None
+
+                # Mid-rank percentile against one sorted array per stat
+                values = sorted(stats[n][stat] for n in qualified)
+                total = len(values)
+                for n in qualified:
+                    v = stats[n][stat]
+                    below = bisect.bisect_left(values, v)
+                    ties = bisect.bisect_right(values, v) - below
+                    percentile[n][stat] = (below + ties / 2) / total * 100
+
+            return {"league": league, "plus": plus, "percentile": percentile, "qualified": len(qualified)}
+
+        return self._cached(("relative", role, self._filter_key(season_filter, filters), min_pa, min_pitches), compute)
+
+    # Counter parts of each rate stat: (numerator keys, denominator key)
+    RATE_PARTS = {
+        "Swing%": (("Swing",), "Pitches"),
+        "O-Swing%": (("O-Swing",), "O-Pitch"),
+        "Z-Swing%": (("Z-Swing",), "Z-Pitch"),
+        "Contact%": (("Contact",), "Swing"),
+        "O-Contact%": (("O-Contact",), "O-Swing"),
+        "Z-Contact%": (("Z-Contact",), "Z-Swing"),
+        "Zone%": (("Z-Pitch",), "Pitches"),
+        "F-Strike%": (("FirstStrike",), "FirstPitch"),
+        "Whiff%": (("SwingingStrike",), "Swing"),
+        "Put Away%": (("Strikeouts",), "TwoStrikePitches"),
+        "SwStr%": (("SwingingStrike",), "Pitches"),
+        "CStr%": (("CalledStrike",), "Pitches"),
+        "CSW%": (("SwingingStrike", "CalledStrike"), "Pitches")
+    }
+
+    # Cap on the prior's weight (in pseudo-trials) when players vary no more than chance would
+    MAX_PRIOR_STRENGTH = 1000.0
+
+    def _rate_columns(self, counters):
+        """{stat: (players, successes, trials)}: one column per rate stat over all players."""
+        names = list(counters)
+        cols = {}
+        for stat, (num_keys, den_key) in self.RATE_PARTS.items():
+            x = [sum(counters[n][k] for k in num_keys) for n in names]
+            t = [counters[n][den_key] for n in names]
+            cols[stat] = (names, x, t)
+        return cols
+
+    def _rate_priors(self, role, season_filter, filters=None):
+        """
+        Empirical-Bayes beta prior (alpha, beta) per rate stat, by the method of moments:
+        the league rate, and the spread of player rates beyond what binomial noise explains.
+        Cached per role / season.
+        """
+        def compute():
+            priors = {}
+            for stat, (_names, x, t) in self._rate_columns(self._aggregate_counters(role, season_filter, filters)).items():
+                pairs = [(xi, ti) for xi, ti in zip(x, t) if ti > 0]
+                total = sum(ti for _xi, ti in pairs)
+                if not total:
+                    priors[stat] = (0.0, 0.0)
+                    continue
+                m = sum(xi for xi, _ti in pairs) / total
+                if len(pairs) < 2 or m <= 0 or m >= 1:
+                    strength = self.MAX_PRIOR_STRENGTH
                 else:
-                    targets.append(p["batter"])
-                    targets.append(p["pitcher"])
-
-                for player in targets:
-                    if player not in stats:
-                        stats[player] = {
-                            "PA": 0,
-                            "Pitches": 0,
-                            "Swing": 0, "Contact": 0,
-                            "O-Swing": 0, "O-Pitch": 0,
-                            "Z-Swing": 0, "Z-Pitch": 0,
-                            "Z-Contact": 0, "O-Contact": 0,
-                            "FirstPitch": 0, "FirstStrike": 0,
-                            "SwingingStrike": 0, "CalledStrike": 0,
-                            "TwoStrikePitches": 0, "Strikeouts": 0
-                        }
-                    
-                    s = stats[player]
-                    s["Pitches"] += 1
-                    
-                    is_in_zone = (p["zone"] == "In")
-                    result = p["result"]
-                    
-                    # Swing Definition
-                    is_swing = result in ["Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)"]
-                    is_contact = result in ["Foul", "In Play (Safe)", "In Play (Out)"]
-                    
-                    if is_swing: s["Swing"] += 1
-                    if is_contact: s["Contact"] += 1
-                    
-                    if is_in_zone:
-                        s["Z-Pitch"] += 1
-                        if is_swing:
-                            s["Z-Swing"] += 1
-                            if is_contact: s["Z-Contact"] += 1
-                    else:
-                        s["O-Pitch"] += 1
-                        if is_swing:
-                            s["O-Swing"] += 1
-                            if is_contact: s["O-Contact"] += 1
-
-                    # First Pitch Strike
-                    if p.get("is_first_pitch", False):
-                        s["FirstPitch"] += 1
-                        if result != "Ball":
-                            s["FirstStrike"] += 1
-                    
-                    # Whiff, CSW components
-                    if result == "Swinging Strike":
-                        s["SwingingStrike"] += 1
-                    if result == "Called Strike":
-                        s["CalledStrike"] += 1
-                        
-                    # PA Calculation & PutAway
-                    # Use 'strikes_before', 'balls_before' if available (v6.0+)
-                    strikes_before = p.get("strikes_before", 0)
-                    balls_before = p.get("balls_before", 0)
-                    
-                    is_pa = False
-                    if "In Play" in result:
-                        is_pa = True
-                    elif result == "Dead Ball":
-                        is_pa = True # HBP
-                    elif result == "Ball" and balls_before == 3:
-                        is_pa = True # Walk
-                    elif (result == "Called Strike" or result == "Swinging Strike") and strikes_before == 2:
-                        is_pa = True # Strikeout
-                        
-                    if is_pa:
-                        s["PA"] += 1
-
-                    # PutAway (Strikeout on 2 strikes)
-                    if strikes_before == 2:
-                        s["TwoStrikePitches"] += 1
-                        if result in ["Swinging Strike", "Called Strike"]:
-                            s["Strikeouts"] += 1
+                    rates = [xi / ti for xi, ti in pairs]
+                    mean_rate = sum(rates) / len(rates)
+                    observed = sum((r - mean_rate) ** 2 for r in rates) / (len(rates) - 1)
+                    noise = m * (1 - m) * sum(1 / ti for _xi, ti in pairs) / len(pairs)
+                    true_var = observed - noise
+                    strength = m * (1 - m) / true_var - 1 if true_var > 0 else self.MAX_PRIOR_STRENGTH
+                    strength = min(max(strength, 0.0), self.MAX_PRIOR_STRENGTH)
+                priors[stat] = (m * strength, (1 - m) * strength)
+            return priors
+
+        return self._cached(("priors", role, self._filter_key(season_filter, filters)), compute)
+
+    @timed
+    def get_interval_stats(self, role="batter", season_filter=None, z=1.96, filters=None):
+        """
+        Small-sample views of every rate stat for one role and season (percent, None without data):
+          'low' / 'high': {player: {stat: Wilson score interval bounds}} (z=1.96 -> 95%)
+          'shrunk':       {player: {stat: empirical-Bayes rate, pulled toward the league by the prior}}
+          'prior':        {stat: (alpha, beta)} (see _rate_priors)
+        Computed column by column over all players at once and cached.
+        """
+        if role not in ("batter", "pitcher"):
+            raise ValueError(f"Unknown role: {role}")
+
+        def compute():
+            counters = self._aggregate_counters(role, season_filter, filters)
+            priors = self._rate_priors(role, season_filter, filters)
+            low = {n: {} for n in counters}
+            high = {n: {} for n in counters}
+            shrunk = {n: {} for n in counters}
+            z2 = z * z
+            for stat, (names, x, t) in self._rate_columns(counters).items():
+                a, b = priors[stat]
+                shrunk_col = [(xi + a) / (ti + a + b) * 100 if ti + a + b > 0 else None for xi, ti in zip(x, t)]
+                for n, xi, ti, sv in zip(names, x, t, shrunk_col):
+                    shrunk[n][stat] = sv
+                    if ti == 0:
+                        low[n][stat] = high[n][stat] = None
+                        continue
+                    p = xi / ti
+                    denom = 1 + z2 / ti
+                    center = (p + z2 / (2 * ti)) / denom
+                    half = z * math.sqrt(p * (1 - p) / ti + z2 / (4 * ti * ti)) / denom
+                    low[n][stat] = max(0.0, center - half) * 100
+                    high[n][stat] = min(1.0, center + half) * 100
+            return {"low": low, "high": high, "shrunk": shrunk, "prior": priors}
+
+        return self._cached(("intervals", role, self._filter_key(season_filter, filters), z), compute)
+
+    def _count_pitches(self, pitches, role_filter, stats):
+        """Add raw counters for `pitches` into `stats` (player -> counter dict)."""
+        for p in pitches:
+            # Determine targets
+            targets = []
+            if role_filter == "batter":
+                targets.append(p["batter"])
+            elif role_filter == "pitcher":
+                targets.append(p["pitcher"])
+            else:
+                targets.append(p["batter"])
+                targets.append(p["pitcher"])
+
+            for player in targets:
+                if player not in stats:
+                    stats[player] = dict.fromkeys(self.COUNTER_KEYS, 0)
+                self._add_pitch(stats[player], p)
+        return stats
+
+    @staticmethod
+    def _ends_pa(p):
+        """True if this pitch ended the plate appearance (in play, HBP, walk, strikeout)."""
+        result = p["result"]
+        if "In Play" in result:
+            return True
+        if result == "Dead Ball":
+            return True # HBP
+        if result == "Ball" and p["balls_before"] == 3:
+            return True # Walk
+        if (result == "Called Strike" or result == "Swinging Strike") and p["strikes_before"] == 2:
+            return True # Strikeout
+        return False
+
+    def _add_pitch(self, s, p, n=1):
+        """Add one pitch to a counter dict (n=-1 takes it back out)."""
+        s["Pitches"] += n
+        
+        is_in_zone = (p["zone"] == "In")
+        result = p["result"]
+        
+        # Swing Definition
+        is_swing = result in ["Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)"]
+        is_contact = result in ["Foul", "In Play (Safe)", "In Play (Out)"]
+        
+        if is_swing: s["Swing"] += n
+        if is_contact: s["Contact"] += n
+        
+        if is_in_zone:
+            s["Z-Pitch"] += n
+            if is_swing:
+                s["Z-Swing"] += n
+                if is_contact: s["Z-Contact"] += n
+        else:
+            s["O-Pitch"] += n
+            if is_swing:
+                s["O-Swing"] += n
+                if is_contact: s["O-Contact"] += n
+
+        # First Pitch Strike
+        if p["is_first_pitch"]:
+            s["FirstPitch"] += n
+            if result != "Ball":
+                s["FirstStrike"] += n
+        
+        # Whiff, CSW components
+        if result == "Swinging Strike":
+            s["SwingingStrike"] += n
+        if result == "Called Strike":
+            s["CalledStrike"] += n
+            
+        # PA Calculation & PutAway
+        if self._ends_pa(p):
+            s["PA"] += n
 
+        # PutAway (Strikeout on 2 strikes)
+        if p["strikes_before"] == 2:
+            s["TwoStrikePitches"] += n
+            if result in ["Swinging Strike", "Called Strike"]:
+                s["Strikeouts"] += n
+
+    def _final_stats(self, stats):
+        """Turn raw counters (player -> counter dict) into the rate stats shown on the dashboard."""
         final_stats = {}
         def pct(n, d): return (n / d * 100) if d > 0 else 0.0
 
@@ -490,3 +1148,1297 @@ class PlateDisciplineCalculator:
             }
             
         return final_stats
+
+    # --- Dashboard Filters ---
+    # Game-level filters (season, dates, teams) narrow the games through the indexes and the
+    # game summaries; inside a game, counters are pre-split by the player's side, inning and
+    # starter/reliever, so any combination is a sum of buckets rather than a pitch loop.
+
+    STAT_FILTERS = (
+        "season",       # season string
+        "date_from",    # 'YYYY-MM-DD' (inclusive)
+        "date_to",      # 'YYYY-MM-DD' (inclusive)
+        "team",         # the player's team
+        "opponent",     # the other team
+        "inning_from",  # int (inclusive)
+        "inning_to",    # int (inclusive)
+        "home_away",    # 'home' / 'away': the player's side
+        "pitcher_role"  # 'starter' / 'reliever': the pitcher on the mound
+    )
+
+    def _filter_key(self, season_filter=None, filters=None):
+        """Hashable form of the active filters (empty values dropped), used in cache keys."""
+        active = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+        unknown = set(active) - set(self.STAT_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter: {', '.join(sorted(unknown))}")
+        if season_filter:
+            active["season"] = season_filter
+        return tuple(sorted(active.items()))
+
+    @staticmethod
+    def _starters(g):
+        """{side: starting pitcher} of a game ({} if it was recorded before 'start' was kept)."""
+        try:
+            start = g["start"] # g[...] rather than g.get: a LazyGame loads its shard on item access
+        except KeyError:
+            return {}
+        return {side: start[side]["pitcher"] for side in ("home", "away")} if start else {}
+
+    def _game_buckets_for(self, g):
+        """
+        Counters of one game split for filtering, cached until the game is saved again:
+          'side': {role: {side: {player: counters}}}
+          'fine': {role: {(side, inning, by_starter): {player: counters}}}
+        side is the player's side; by_starter says whether the pitcher was his side's starter.
+        """
+        rev = self._game_revs.get(g["id"], 0)
+        cache = self._game_buckets
+        hit = cache.get(g["id"])
+        if hit is not None and hit[0] == rev and hit[1] is g:
+            return hit[2]
+
+        starters = self._starters(g)
+        side_buckets = {"batter": {"home": {}, "away": {}}, "pitcher": {"home": {}, "away": {}}}
+        fine = {"batter": {}, "pitcher": {}}
+        for p in g["pitches"]:
+            bat, pit = ("away", "home") if p["is_top"] else ("home", "away")
+            if pit not in starters:
+                starters[pit] = p["pitcher"] # Recorded before start existed: first pitcher seen
+            by_starter = p["pitcher"] == starters[pit]
+            inning = p["inning"]
+            for role, side, player in (("batter", bat, p["batter"]), ("pitcher", pit, p["pitcher"])):
+                for by_player in (side_buckets[role][side], fine[role].setdefault((side, inning, by_starter), {})):
+                    c = by_player.get(player)
+                    if c is None:
+                        c = by_player[player] = dict.fromkeys(self.COUNTER_KEYS, 0)
+                    self._add_pitch(c, p)
+
+        buckets = {"side": side_buckets, "fine": fine}
+        # rev was read before the pitches: a save during the loop leaves this entry already stale
+        cache[g["id"]] = (rev, g, buckets)
+        return buckets
+
+    def _archived_games(self, season):
+        """Full games of an archived season, kept in memory (archives never change)."""
+        archive = self.data["archives"][season]
+        key = (season, archive["file"], archive["created"])
+        cache = self._archive_games # a merge meanwhile replaces it: a stale result then lands in the old dict
+        if key not in cache:
+            cache[key] = self.load_archived_games(season)
+        return cache[key]
+
+    def _filter_candidates(self, f):
+        """Games (live and archived) the season / team / opponent indexes allow for filters `f`."""
+        season = f.get("season")
+        team = (f.get("team") or "").strip()
+        opponent = (f.get("opponent") or "").strip()
+        if season is not None or team or opponent:
+            games = self.get_games(season, team or opponent or None)
+        else:
+            games = list(self._games_by_id.values())
+        for s in list(self.data.get("archives", {})):
+            if season is None or s == season:
+                games = games + self._archived_games(s)
+        return games
+
+    @staticmethod
+    def _filter_sides(g, f):
+        """The sides of game `g` whose players the date / team / opponent / home_away filters keep."""
+        summary = game_summary(g)
+        date = summary["date"][:10]
+        date_from, date_to = f.get("date_from"), f.get("date_to")
+        if (date_from and date < date_from) or (date_to and date > date_to):
+            return []
+        team = (f.get("team") or "").strip()
+        opponent = (f.get("opponent") or "").strip()
+        home_away = f.get("home_away")
+        sides = []
+        for side, other in (("home", "away"), ("away", "home")):
+            if team and summary[side].strip() != team:
+                continue
+            if opponent and summary[other].strip() != opponent:
+                continue
+            if home_away and side != home_away:
+                continue
+            sides.append(side)
+        return sides
+
+    def _filtered_counters(self, role_filter, f, step=None):
+        """Player -> counters for the filters in `f` (see STAT_FILTERS)."""
+        roles = [role_filter] if role_filter in ("batter", "pitcher") else ["batter", "pitcher"]
+        inning_from, inning_to = f.get("inning_from"), f.get("inning_to")
+        pitcher_role = f.get("pitcher_role")
+        fine = inning_from is not None or inning_to is not None or pitcher_role is not None
+
+        stats = {}
+        for g in self._filter_candidates(f):
+            if step:
+                step()
+            sides = self._filter_sides(g, f)
+            if not sides:
+                continue
+
+            buckets = self._game_buckets_for(g)
+            for role in roles:
+                if not fine:
+                    parts = [buckets["side"][role][side] for side in sides]
+                else:
+                    parts = []
+                    for (side, inning, by_starter), by_player in buckets["fine"][role].items():
+                        if side not in sides:
+                            continue
+                        if (inning_from is not None and inning < inning_from) or (inning_to is not None and inning > inning_to):
+                            continue
+                        if pitcher_role and by_starter != (pitcher_role == "starter"):
+                            continue
+                        parts.append(by_player)
+                for by_player in parts:
+                    for player, c in by_player.items():
+                        dst = stats.get(player)
+                        if dst is None:
+                            dst = stats[player] = dict.fromkeys(self.COUNTER_KEYS, 0)
+                        for k in self.COUNTER_KEYS:
+                            dst[k] += c[k]
+        return stats
+
+    # --- Custom Metrics ---
+    # User-defined ratios (see metrics.py), stored in data["custom_metrics"]. Each game's pitches
+    # are counted once per pitch class, split like the filter buckets; every metric of every
+    # player is then evaluated from those class counts in one pass, and editing the definitions
+    # never re-reads pitches.
+
+    def get_custom_metrics(self):
+        return copy.deepcopy(self.data.get("custom_metrics", []))
+
+    def set_custom_metrics(self, definitions):
+        """Replace the metric definitions (validated first; raises ValueError)."""
+        metrics.validate(definitions)
+        self.data["custom_metrics"] = copy.deepcopy(definitions)
+        self.save_data([])
+
+    def _compiled_metrics(self):
+        definitions = self.data.get("custom_metrics", [])
+        key = metrics.definitions_key(definitions)
+        hit = self._compiled
+        if hit is None or hit[0] != key:
+            hit = self._compiled = (key, metrics.CompiledMetrics(definitions))
+        return hit[1]
+
+    def _game_class_counts(self, g):
+        """{role: {(side, inning, by_starter): {player: {pitch class: pitches}}}} for one game, cached per revision."""
+        rev = self._game_revs.get(g["id"], 0)
+        cache = self._game_classes
+        hit = cache.get(g["id"])
+        if hit is not None and hit[0] == rev and hit[1] is g:
+            return hit[2]
+
+        starters = self._starters(g)
+        out = {"batter": {}, "pitcher": {}}
+        for p in g["pitches"]:
+            bat, pit = ("away", "home") if p["is_top"] else ("home", "away")
+            if pit not in starters:
+                starters[pit] = p["pitcher"]
+            by_starter = p["pitcher"] == starters[pit]
+            inning = p["inning"]
+            c = metrics.pitch_class(p["zone"], p["result"], p["balls_before"], p["strikes_before"], inning)
+            for role, side, player in (("batter", bat, p["batter"]), ("pitcher", pit, p["pitcher"])):
+                by_player = out[role].setdefault((side, inning, by_starter), {})
+                h = by_player.get(player)
+                if h is None:
+                    h = by_player[player] = {}
+                h[c] = h.get(c, 0) + 1
+
+        cache[g["id"]] = (rev, g, out)
+        return out
+
+    def _class_counts(self, role, f):
+        """Player -> {pitch class: pitches} for one role under the filters in `f`."""
+        inning_from, inning_to = f.get("inning_from"), f.get("inning_to")
+        pitcher_role = f.get("pitcher_role")
+        totals = {}
+        for g in self._filter_candidates(f):
+            sides = self._filter_sides(g, f)
+            if not sides:
+                continue
+            for (side, inning, by_starter), by_player in self._game_class_counts(g)[role].items():
+                if side not in sides:
+                    continue
+                if (inning_from is not None and inning < inning_from) or (inning_to is not None and inning > inning_to):
+                    continue
+                if pitcher_role and by_starter != (pitcher_role == "starter"):
+                    continue
+                for player, h in by_player.items():
+                    dst = totals.get(player)
+                    if dst is None:
+                        dst = totals[player] = {}
+                    for c, n in h.items():
+                        dst[c] = dst.get(c, 0) + n
+        return totals
+
+    @timed
+    def get_custom_stats(self, role="batter", season_filter=None, filters=None):
+        """{player: {metric name: value or None}} for the custom metrics, honouring the dashboard filters."""
+        if role not in ("batter", "pitcher"):
+            raise ValueError(f"Unknown role: {role}")
+        compiled = self._compiled_metrics()
+        if not compiled.names:
+            return {}
+        fkey = self._filter_key(season_filter, filters)
+        counts = self._cached(("class_counts", role, fkey), lambda: self._class_counts(role, dict(fkey)))
+        return self._cached(("custom", role, fkey, self._compiled[0]),
+                            lambda: {player: compiled.evaluate(h) for player, h in counts.items()})
+
+    # --- Replay ---
+
+    def _get_replay(self, game):
+        r = self._replays.get(game["id"])
+        if r is None or r.game is not game:
+            r = self._replays[game["id"]] = replay.GameReplay(game)
+        return r
+
+    def get_state_at(self, k, game_id=None):
+        """
+        Game state just before pitch k (0-based) of a game (default: current game), rebuilt
+        from pitches and events. Returns the same dict shape as the stored `state`, plus 'teams'.
+        """
+        game = self._games_by_id.get(game_id) if game_id else self.current_game
+        if not game:
+            return None
+        state, teams = self._get_replay(game).state_at(k)
+        state["score"] = copy.deepcopy(game["state"]["score"])
+        state["teams"] = teams
+        return state
+
+    @timed
+    def rebuild_state(self, game_id=None):
+        """
+        Replace a game's stored state and lineups with the result of replaying it.
+        Returns the list of fields that had drifted (empty if the stored state was already right).
+        """
+        game = self._games_by_id.get(game_id) if game_id else self.current_game
+        if not game:
+            return []
+        state, teams = self._get_replay(game).rebuild()
+
+        drift = [k for k in state if game["state"].get(k) != state[k]]
+        for side in ("home", "away"):
+            for k in ("lineup", "pitcher"):
+                if game["teams"][side][k] != teams[side][k]:
+                    drift.append(f"{side}.{k}")
+                    game["teams"][side][k] = teams[side][k]
+        if drift:
+            game["state"] = state
+            self.save_data([game])
+        return drift
+
+    # --- Pitch Editing ---
+    # Editing pitch k replays from the nearest checkpoint before k and rewrites derived fields
+    # (count, inning, batter, slot...) only until the game lines up with its old course again.
+    # Cached season counters are patched by the removed/added records instead of recomputed.
+
+    def _ensure_replayable(self, game):
+        """Give a game recorded before start/events existed its reconstructed start and events."""
+        if "start" in game:
+            return
+        rebuilt = replay.reconstruct_start_events(game)
+        if rebuilt is None:
+            raise ValueError("This game's pitch records are not consistent enough to edit")
+        game["start"], game["events"] = rebuilt
+        replay.backfill_pitch_fields(game)
+        self._get_replay(game).invalidate_from(0)
+        self.save_data([game])
+
+    @staticmethod
+    def _check_pitch(zone, result):
+        """Reject a zone / result outside the pitch vocabulary (None: not being changed)."""
+        if zone is not None and zone not in ZONES:
+            raise ValueError(f"Unknown zone: {zone}")
+        if result is not None and result not in RESULTS:
+            raise ValueError(f"Unknown result: {result}")
+
+    def _edit_game(self, game_id):
+        game = self._games_by_id.get(game_id) if game_id else self.current_game
+        if not game:
+            raise ValueError("No active game")
+        if isinstance(game, LazyGame):
+            game.load()
+        self._ensure_replayable(game)
+        return game
+
+    @timed
+    def edit_pitch(self, k, zone=None, result=None, game_id=None):
+        """Change the zone and/or result of pitch k (0-based)."""
+        self._check_pitch(zone, result)
+        game = self._edit_game(game_id)
+        if not 0 <= k < len(game["pitches"]):
+            raise IndexError(k)
+        changes = {}
+        if zone is not None:
+            changes["zone"] = zone
+        if result is not None:
+            changes["result"] = result
+        return self._apply_pitch_edit(game, k, 0, lambda pitches: pitches[k].update(changes))
+
+    @timed
+    def insert_pitch(self, k, zone, result, game_id=None):
+        """Insert a pitch before pitch k (k = len(pitches) appends). Events logged at k stay before it."""
+        if zone is None or result is None:
+            raise ValueError("An inserted pitch needs a zone and a result")
+        self._check_pitch(zone, result)
+        game = self._edit_game(game_id)
+        if not 0 <= k <= len(game["pitches"]):
+            raise IndexError(k)
+        state, teams = self._get_replay(game).state_at(k)
+        pitch = Pitch(replay.derive_pitch_fields(state, teams), zone=zone, result=result)
+
+        def mutate(pitches):
+            pitches.insert(k, pitch)
+            for ev in game.get("events", []):
+                if ev["at"] > k:
+                    ev["at"] += 1
+        return self._apply_pitch_edit(game, k, 1, mutate, added=[pitch])
+
+    @timed
+    def delete_pitch(self, k, game_id=None):
+        """Remove pitch k; events logged after it move back by one pitch."""
+        game = self._edit_game(game_id)
+        if not 0 <= k < len(game["pitches"]):
+            raise IndexError(k)
+        removed = dict(game["pitches"][k])
+
+        def mutate(pitches):
+            del pitches[k]
+            for ev in game.get("events", []):
+                if ev["at"] > k:
+                    ev["at"] -= 1
+        return self._apply_pitch_edit(game, k, -1, mutate, removed=[removed])
+
+    def _apply_pitch_edit(self, game, k, offset, mutate, added=(), removed=()):
+        """
+        Run `mutate(pitches)` on `game`, then resync the pitches after k, the game state and
+        the cached counters. Returns the number of pitch records rewritten (besides the edit itself).
+        """
+        session = self.sessions.get(game["id"])
+        if session and session.game is game:
+            self._save_state(game)
+
+        rp = self._get_replay(game)
+        base = max(i for i in rp.checkpoints if i <= k)
+        checkpoint = (base, rp.checkpoints[base])
+        old_pitches = list(game["pitches"])
+        old_events = copy.deepcopy(game.get("events", []))
+        before_k = None
+        if offset == 0:
+            # The edit changes this record in place
+            before_k = old_pitches[k] = dict(old_pitches[k])
+
+        # Counters cached before the edit, patched below instead of being thrown away
+        season = game.get("season", "")
+        cached = None
+        if self._cache_version == self._data_version:
+            cached = self._cache.get(("rollup_counters", season))
+
+        mutate(game["pitches"])
+        changes, final = replay.resync_pitches(game, k, old_pitches, old_events, offset, checkpoint)
+        rp.invalidate_from(k)
+
+        if final is not None:
+            state, teams = final
+            state["score"] = game["state"]["score"]
+            game["state"] = state
+            for side in ("home", "away"):
+                game["teams"][side]["lineup"] = teams[side]["lineup"]
+                game["teams"][side]["pitcher"] = teams[side]["pitcher"]
+
+        removed, added = list(removed), list(added)
+        if offset == 0:
+            removed.append(before_k)
+            added.append(game["pitches"][k])
+        for i, old, new in changes:
+            if i != k or offset < 0: # pitch k itself is already counted above
+                removed.append(old)
+                added.append(new)
+
+        self.save_data([game])
+        if cached is not None:
+            # Patch a copy: a stats job on the worker thread may be reading the cached one
+            cached = {role: dict(by_key) for role, by_key in cached.items()}
+            self._patch_rollup_counters(cached, game, removed, added)
+            self._cached(("rollup_counters", season), lambda: cached)
+        return len(changes)
+
+    def _patch_rollup_counters(self, counters, game, removed, added):
+        """Apply a pitch-level delta to one season's rollup counters."""
+        teams = {True: (game["teams"]["away"]["name"], game["teams"]["home"]["name"]),
+                 False: (game["teams"]["home"]["name"], game["teams"]["away"]["name"])}
+        for sign, records in ((-1, removed), (1, added)):
+            for p in records:
+                slot = p["lineup_slot"]
+                bat_team, pit_team = teams[p["is_top"]]
+                for role, key in (("batter", (bat_team, p["batter"], slot)), ("pitcher", (pit_team, p["pitcher"], slot))):
+                    c = counters[role].get(key)
+                    c = dict(c) if c is not None else dict.fromkeys(self.COUNTER_KEYS, 0) # never change a shared counter
+                    self._add_pitch(c, p, sign)
+                    if c["Pitches"] == 0:
+                        counters[role].pop(key, None)
+                    else:
+                        counters[role][key] = c
+
+    # --- Hierarchical Rollups ---
+    # league > season > team > player, plus team > batting-order slot.
+    # One pass per season builds the finest counters (team, player, slot); every level is a sum of those.
+
+    ROLLUP_LEVELS = {
+        "league": (),
+        "season": ("season",),
+        "team": ("season", "team"),
+        "player": ("season", "team", "player"),
+        "slot": ("season", "team", "slot")
+    }
+
+    def _compute_rollup_counters(self, games, step=None):
+        counters = {"batter": {}, "pitcher": {}}
+        for g in games:
+            if step:
+                step()
+            home = g["teams"]["home"]["name"]
+            away = g["teams"]["away"]["name"]
+            for p in g["pitches"]:
+                is_top = p["is_top"]
+                slot = p["lineup_slot"]
+                keys = (
+                    ("batter", (away if is_top else home, p["batter"], slot)),
+                    ("pitcher", (home if is_top else away, p["pitcher"], slot))
+                )
+                for role, key in keys:
+                    c = counters[role].get(key)
+                    if c is None:
+                        c = counters[role][key] = dict.fromkeys(self.COUNTER_KEYS, 0)
+                    self._add_pitch(c, p)
+        return counters
+
+    def _live_rollup_counters(self, season, step=None):
+        return self._cached(("rollup_counters", season), lambda: self._compute_rollup_counters(self.get_games(season), step))
+
+    def _season_rollup_counters(self, season, step=None):
+        """{role: {(team, player, slot): counters}} for one season (live or archived)."""
+        archive = self.data.get("archives", {}).get(season)
+        if archive is None:
+            return self._live_rollup_counters(season, step)
+
+        # Archives are immutable, so this survives data changes (other than merges, see _archived_games)
+        key = (season, archive["file"], archive["created"])
+        cache = self._archive_rollups
+        if key not in cache:
+            cache[key] = self._compute_rollup_counters(self.load_archived_games(season), step)
+        return cache[key]
+
+    @timed
+    def get_rollup_stats(self, level, role="batter", season_filter=None, team_filter=None):
+        """
+        Stats grouped by a level of ROLLUP_LEVELS, keyed by tuples of that level's fields
+        (e.g. 'team' -> (season, team); 'slot' -> (season, team, slot 1-9)).
+        role: 'batter' (team = batting team) or 'pitcher' (team = fielding team, slot = slot faced).
+        Results are cached per level/role/season, so switching levels does not re-read pitches.
+        """
+        if role not in ("batter", "pitcher"):
+            raise ValueError(f"Unknown role: {role}")
+        fields = self.ROLLUP_LEVELS[level]
+
+        def compute():
+            if season_filter:
+                seasons = [season_filter]
+            else:
+                seasons = list(self._games_by_season) + [s for s in list(self.data.get("archives", {})) if s not in self._games_by_season]
+
+            totals = {}
+            for season in seasons:
+                for (team, player, slot), c in self._season_rollup_counters(season)[role].items():
+                    parts = {"season": season, "team": team, "player": player, "slot": slot + 1}
+                    key = tuple(parts[f] for f in fields)
+                    dst = totals.get(key)
+                    if dst is None:
+                        dst = totals[key] = dict.fromkeys(self.COUNTER_KEYS, 0)
+                    for k in self.COUNTER_KEYS:
+                        dst[k] += c[k]
+            return self._final_stats(totals)
+
+        stats = self._cached(("rollup", level, role, season_filter or None), compute)
+        if team_filter and "team" in fields:
+            i = fields.index("team")
+            stats = {k: v for k, v in stats.items() if k[i] == team_filter}
+        return stats
+
+    @timed
+    def warm_stats(self, season_filter=None, filters=None, progress=None):
+        """
+        Build the counters behind the dashboard (player stats for both roles and the season
+        rollups) so the get_*_stats calls that follow are cache hits.
+        progress(done, total) is called once per game read and may raise to stop early
+        (jobs.Job.progress does once the job is cancelled). Only reads data, which is what
+        lets the dashboard run it on a worker thread while the UI thread keeps changing games:
+        whatever is cached from data that changes meanwhile is keyed by the old data version or
+        game revision and never served again, and the caller compares data_version before and
+        after to tell whether its results mix both states.
+        """
+        archives = dict(self.data.get("archives", {}))
+        if season_filter:
+            seasons = [season_filter]
+        else:
+            seasons = list(self._games_by_season) + [s for s in archives if s not in self._games_by_season]
+        fkey = self._filter_key(season_filter, filters)
+        filtered = any(k != "season" for k, _v in fkey)
+
+        def is_cached(key):
+            return self._cache_version == self._data_version and key in self._cache
+
+        # Count the games still to be read, so progress has a total
+        todo = []
+        total = 0
+        for season in seasons:
+            if season in archives:
+                archive = archives[season]
+                if (season, archive["file"], archive["created"]) in self._archive_rollups:
+                    continue
+                total += len(archive["games"])
+            elif season in self._games_by_season:
+                if is_cached(("rollup_counters", season)):
+                    continue
+                total += len(self._games_by_season[season])
+            else:
+                continue
+            todo.append(season)
+        candidates = None
+        if filtered and not is_cached(("filtered_counters", "batter", fkey)):
+            candidates = self._filter_candidates(dict(fkey))
+            total += len(candidates)
+
+        done = 0
+        def step():
+            nonlocal done
+            done += 1
+            if progress:
+                progress(done, total)
+
+        for season in todo:
+            self._season_rollup_counters(season, step)
+        if candidates is not None:
+            self._cached(("filtered_counters", "batter", fkey), lambda: self._filtered_counters("batter", dict(fkey), step))
+        # Everything else (the pitcher side of a filter reuses the per-game buckets just built)
+        for role in ("batter", "pitcher"):
+            self._aggregate_counters(role, season_filter, filters)
+        if progress:
+            progress(total, total)
+
+    # --- Sequence Analytics ---
+    # Transitions between consecutive pitches of a plate appearance and n-gram frequencies,
+    # per batter and pitcher (see sequences.py). Tables are built per season in one pass and
+    # kept until a game of that season changes; archived seasons never change.
+
+    SEQUENCE_MAX_N = sequences.MAX_N
+
+    def _season_sequences(self, season, step=None):
+        """{role: {player: tables}} for one season (live or archived)."""
+        archive = self.data.get("archives", {}).get(season)
+        if archive is not None:
+            key = (season, archive["file"], archive["created"])
+            cache = self._archive_sequences
+            if key not in cache:
+                cache[key] = sequences.build(self.load_archived_games(season), step)
+            return cache[key]
+
+        # A copy: games may be added to the season while a worker thread builds the tables
+        games = list(self._games_by_season.get(season, {}).values())
+        fingerprint = tuple((g["id"], self._game_revs.get(g["id"], 0)) for g in games)
+        hit = self._sequence_cache.get(season)
+        if hit is None or hit[0] != fingerprint:
+            hit = self._sequence_cache[season] = (fingerprint, sequences.build(games, step))
+        return hit[1]
+
+    def _sequence_tables(self, role, player=None, season_filter=None):
+        """Tables of one player (None: every player of the role) summed over the seasons."""
+        if role not in ("batter", "pitcher"):
+            raise ValueError(f"Unknown role: {role}")
+
+        def compute():
+            if season_filter:
+                seasons = [season_filter]
+            else:
+                seasons = list(self._games_by_season) + [s for s in list(self.data.get("archives", {})) if s not in self._games_by_season]
+            total = sequences.new_tables()
+            for season in seasons:
+                by_player = self._season_sequences(season)[role]
+                if player is None:
+                    for tables in by_player.values():
+                        sequences.add_tables(total, tables)
+                elif player in by_player:
+                    sequences.add_tables(total, by_player[player])
+            return total
+
+        return self._cached(("sequences", role, player, season_filter or None), compute)
+
+    @timed
+    def get_transition_matrix(self, role="batter", player=None, season_filter=None, count=None):
+        """
+        {(zone, result) of pitch n: {(zone, result) of pitch n+1: pitches}} within plate appearances.
+        player: one batter / pitcher (None: everyone in that role).
+        count: (balls, strikes) to only count pitch n thrown in that count.
+        """
+        matrix = {}
+        for key, n in self._sequence_tables(role, player, season_filter)["transitions"].items():
+            state, nxt = divmod(key, sequences.N_CODES)
+            balls, strikes, zone, result = sequences.decode_state(state)
+            if count is not None and (balls, strikes) != tuple(count):
+                continue
+            row = matrix.setdefault((zone, result), {})
+            cell = sequences.decode_pitch(nxt)
+            row[cell] = row.get(cell, 0) + n
+        return matrix
+
+    @timed
+    def get_transition_stats(self, role="batter", player=None, season_filter=None, by_count=False):
+        """
+        Swing decisions on the pitch after each kind of pitch: {(zone, result): {
+        "Next", "Zone%", "Swing%", "Z-Swing%", "O-Swing%"}} where the rates describe pitch n+1.
+        by_count: key rows by (balls, strikes, zone, result) of pitch n instead.
+        """
+        rows = {}
+        for key, n in self._sequence_tables(role, player, season_filter)["transitions"].items():
+            state, nxt = divmod(key, sequences.N_CODES)
+            decoded = sequences.decode_state(state)
+            row_key = decoded if by_count else decoded[2:]
+            r = rows.get(row_key)
+            if r is None:
+                r = rows[row_key] = {"Next": 0, "Z-Pitch": 0, "Z-Swing": 0, "O-Swing": 0}
+            r["Next"] += n
+            swing = sequences.is_swing(nxt)
+            if sequences.in_zone(nxt):
+                r["Z-Pitch"] += n
+                if swing: r["Z-Swing"] += n
+            elif swing:
+                r["O-Swing"] += n
+
+        def pct(n, d): return (n / d * 100) if d > 0 else 0.0
+        return {
+            k: {
+                "Next": r["Next"],
+                "Zone%": pct(r["Z-Pitch"], r["Next"]),
+                "Swing%": pct(r["Z-Swing"] + r["O-Swing"], r["Next"]),
+                "Z-Swing%": pct(r["Z-Swing"], r["Z-Pitch"]),
+                "O-Swing%": pct(r["O-Swing"], r["Next"] - r["Z-Pitch"])
+            }
+            for k, r in rows.items()
+        }
+
+    @timed
+    def get_sequence_frequencies(self, role="batter", player=None, season_filter=None, n=2, top=None):
+        """
+        Most common runs of `n` consecutive pitches (1..sequences.MAX_N) within plate appearances:
+        [{"sequence": ((zone, result), ...), "count", "share%"}], most frequent first.
+        share% is the run's share of all runs of that length.
+        """
+        if not 1 <= n <= sequences.MAX_N:
+            raise ValueError(f"Sequence length must be 1-{sequences.MAX_N}")
+        runs = [(key, c) for key, c in self._sequence_tables(role, player, season_filter)["ngrams"].items()
+                if sequences.ngram_length(key) == n]
+        total = sum(c for _key, c in runs)
+        runs.sort(key=lambda kc: -kc[1])
+        if top is not None:
+            runs = runs[:top]
+        return [
+            {
+                "sequence": tuple(sequences.decode_pitch(code) for code in sequences.decode_ngram(key)),
+                "count": c,
+                "share%": c / total * 100
+            }
+            for key, c in runs
+        ]
+
+    # --- Season Reports ---
+
+    def get_zone_result_splits(self, role="batter", season_filter=None):
+        """{(team, player): {(zone, result): pitches}}, from the per-game class counts of custom metrics."""
+        if role not in ("batter", "pitcher"):
+            raise ValueError(f"Unknown role: {role}")
+
+        def compute():
+            splits = {}
+            for g in self._filter_candidates({"season": season_filter} if season_filter else {}):
+                for (side, _inning, _by_starter), by_player in self._game_class_counts(g)[role].items():
+                    team = g["teams"][side]["name"]
+                    for player, h in by_player.items():
+                        dst = splits.get((team, player))
+                        if dst is None:
+                            dst = splits[(team, player)] = {}
+                        for c, n in h.items():
+                            cell = metrics.zone_result(c)
+                            dst[cell] = dst.get(cell, 0) + n
+            return splits
+
+        return self._cached(("zone_result", role, season_filter or None), compute)
+
+    @timed
+    def export_report(self, out_dir, season, force=False, workers=None, progress=None):
+        """
+        Write a static HTML report of one season to out_dir: an index, one page per team and one
+        per player (both roles), with zone/result charts. Pages whose numbers did not change
+        since the last export to out_dir are left alone (force=True rewrites all of them).
+        Returns report.write_report's counts plus "pages".
+        """
+        import report # rendering and its worker pool are only needed here; keep them off the startup path
+        if season not in self.get_season_list():
+            raise ValueError(f"Unknown season: {season}")
+        cols = ["PA", "Pitches"] + self.RATE_STATS
+
+        def split_list(cells):
+            return sorted([zone, result, n] for (zone, result), n in cells.items())
+
+        index = {"kind": "index", "season": season, "columns": cols, "teams": {}, "players": {}}
+        teams = {}
+        players = {}
+        for role in ("batter", "pitcher"):
+            team_stats = {team: d for (_season, team), d in self.get_rollup_stats("team", role, season).items()}
+            totals = self.get_aggregate_stats(role, season)
+            index["teams"][role] = team_stats
+            index["players"][role] = totals
+
+            team_splits = {}
+            player_splits = {}
+            for (team, player), cells in self.get_zone_result_splits(role, season).items():
+                for dst in (team_splits.setdefault(team, {}), player_splits.setdefault(player, {})):
+                    for cell, n in cells.items():
+                        dst[cell] = dst.get(cell, 0) + n
+
+            for team, d in team_stats.items():
+                page = teams.setdefault(team, {"kind": "team", "season": season, "name": team, "columns": cols, "roles": {}})
+                page["roles"][role] = {"total": d, "split": split_list(team_splits.get(team, {})), "players": {}}
+            for (_season, team, player), d in self.get_rollup_stats("player", role, season).items():
+                teams[team]["roles"][role]["players"][player] = d
+                page = players.setdefault(player, {"kind": "player", "season": season, "name": player, "columns": cols, "roles": {}})
+                entry = page["roles"].setdefault(role, {"total": totals[player], "split": split_list(player_splits.get(player, {})), "by_team": {}})
+                entry["by_team"][team] = d
+
+        pages = {report.page_path("index"): index}
+        for kind, by_name in (("team", teams), ("player", players)):
+            for name, page in by_name.items():
+                pages[report.page_path(kind, name)] = page
+        result = report.write_report(pages, out_dir, force=force, workers=workers, progress=progress)
+        result["pages"] = len(pages)
+        return result
+
+    # --- Changeset Sync ---
+    # Games scored on different machines are merged through changeset files (see sync.py).
+    # data["sync"]: "unexported" = ids of games changed since the last export,
+    # "deleted" = {game id: version vector when deleted} (tombstones).
+
+    def _sync_state(self):
+        return self.data.setdefault("sync", {"unexported": [], "deleted": {}})
+
+    @staticmethod
+    def _game_versions(g):
+        if isinstance(g, LazyGame):
+            g.load()
+        return g.get("versions") or {}
+
+    def _track_change(self, g):
+        sync.bump(g.setdefault("versions", {}), self._session)
+        if g["id"] not in self._unexported:
+            self._unexported.add(g["id"])
+            self._sync_state()["unexported"].append(g["id"])
+
+    def get_unexported_count(self):
+        return sum(1 for gid in self._unexported if gid in self._games_by_id)
+
+    def _replace_game(self, old, new):
+        """Put `new` where `old` was (same id) in the game list and indexes."""
+        self._unindex_game(old)
+        games = self.data["games"]
+        for i, g in enumerate(games):
+            if g is old:
+                games[i] = new
+                break
+        self._index_game(new)
+        self._replays.pop(new["id"], None)
+        self.sessions.replace(old, new) # Undo snapshots belong to the replaced copy
+
+    @timed
+    def export_changeset(self, path, all_games=False):
+        """
+        Write the games changed since the last export (all_games: every live game), the
+        deletion tombstones and the player registry to a changeset file for import_changeset
+        on another machine. Returns the number of games written.
+        """
+        self.flush()
+        st = self._sync_state()
+        if all_games:
+            games = list(self.data["games"])
+        else:
+            games = [self._games_by_id[gid] for gid in st["unexported"] if gid in self._games_by_id]
+        bodies = []
+        for g in games:
+            if isinstance(g, LazyGame):
+                g.load()
+            bodies.append(dict(g))
+
+        write_changeset(path, {
+            "format": "changeset",
+            "format_version": sync.CHANGESET_FORMAT_VERSION,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "schema_version": self.data.get("schema_version", 0),
+            "games": bodies,
+            "deleted": st["deleted"],
+            "players": self.data.get("players", []),
+            "player_aliases": self.data.get("player_aliases", {}),
+            "player_readings": self.data.get("player_readings", {})
+        })
+        st["unexported"] = []
+        self._unexported.clear()
+        self.save_data([])
+        return len(bodies)
+
+    @timed
+    def import_changeset(self, path, resolve=None):
+        """
+        Merge a changeset written by export_changeset. Only the games it contains are compared
+        (by version vector), and only games that actually change are written.
+        A game edited both here and there since they last matched is a conflict; resolve=None
+        leaves it alone, "theirs" takes the incoming copy, "mine" keeps the local one (either
+        way the result supersedes both copies at the next sync).
+        Returns {"added", "updated", "deleted", "unchanged": counts, "conflicts": [{"id", "game", "reason"}]}.
+        """
+        cs = read_changeset(path)
+        if cs.get("format") != "changeset":
+            raise ValueError("Not a changeset file")
+        if cs.get("format_version", 0) > sync.CHANGESET_FORMAT_VERSION:
+            raise ValueError("This changeset was written by a newer version of the app")
+        if resolve not in (None, "theirs", "mine"):
+            raise ValueError(f"Unknown resolution: {resolve}")
+
+        st = self._sync_state()
+        archived = set()
+        for archive in self.data.get("archives", {}).values():
+            archived.update(s["id"] for s in archive["games"])
+        report = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "conflicts": []}
+        untracked = [] # written as they arrived
+        tracked = []   # settled conflicts: a local change that supersedes both copies
+
+        def conflict(g, reason):
+            report["conflicts"].append({"id": g["id"], "game": game_summary(g), "reason": reason})
+
+        from_version = cs.get("schema_version", 0)
+        incoming_ids = set()
+        for theirs in cs.get("games", []):
+            gid = theirs["id"]
+            incoming_ids.add(gid)
+            migrations.migrate_game(theirs, from_version)
+            their_v = theirs.get("versions") or {}
+            mine = self._games_by_id.get(gid)
+
+            if mine is None:
+                if gid in archived:
+                    conflict(theirs, "Its season is archived here")
+                    continue
+                tomb = st["deleted"].get(gid)
+                if tomb is not None:
+                    relation = sync.compare(their_v, tomb)
+                    if relation in (sync.EQUAL, sync.OLDER):
+                        report["unchanged"] += 1 # Deleted here after the version they sent
+                        continue
+                    if relation == sync.CONCURRENT and resolve is None:
+                        conflict(theirs, "Deleted here, edited there")
+                        continue
+                    if relation == sync.CONCURRENT and resolve == "mine":
+                        st["deleted"][gid] = sync.merged(tomb, their_v)
+                        sync.bump(st["deleted"][gid], self._session)
+                        continue
+                    del st["deleted"][gid] # Restored there after seeing the deletion, or settled
+                self.data["games"].append(theirs)
+                self._index_game(theirs)
+                untracked.append(theirs)
+                report["added"] += 1
+                continue
+
+            my_v = self._game_versions(mine)
+            relation = sync.compare(their_v, my_v)
+            if relation == sync.NEWER:
+                self._replace_game(mine, theirs)
+                untracked.append(theirs)
+                report["updated"] += 1
+            elif relation in (sync.EQUAL, sync.OLDER):
+                report["unchanged"] += 1
+            elif sync.same_content(theirs, mine):
+                # Same edits made on both sides: just remember both histories
+                mine["versions"] = sync.merged(my_v, their_v)
+                untracked.append(mine)
+                report["unchanged"] += 1
+            elif resolve is None:
+                conflict(mine, "Edited on both machines")
+            elif resolve == "theirs":
+                theirs["versions"] = sync.merged(my_v, their_v)
+                self._replace_game(mine, theirs)
+                tracked.append(theirs)
+                report["updated"] += 1
+            else:
+                mine["versions"] = sync.merged(my_v, their_v)
+                tracked.append(mine)
+
+        for gid, tomb in cs.get("deleted", {}).items():
+            if gid in incoming_ids:
+                continue
+            mine = self._games_by_id.get(gid)
+            if mine is None:
+                st["deleted"][gid] = sync.merged(st["deleted"].get(gid, {}), tomb)
+                continue
+            my_v = self._game_versions(mine)
+            relation = sync.compare(my_v, tomb)
+            if relation == sync.NEWER:
+                continue # Restored here after seeing the deletion
+            if relation != sync.CONCURRENT or resolve == "theirs":
+                st["deleted"][gid] = sync.merged(tomb, my_v)
+                self._remove_game(mine)
+                report["deleted"] += 1
+            elif resolve is None:
+                conflict(mine, "Deleted there, edited here")
+            else:
+                mine["versions"] = sync.merged(my_v, tomb)
+                tracked.append(mine)
+
+        # Player registry: union (an incoming name never replaces a local one)
+        for name in cs.get("players", []):
+            if self.resolve_player(name) not in self.data["players"]:
+                self.data["players"].append(name)
+                self.players.add(name)
+        for alias, target in cs.get("player_aliases", {}).items():
+            if alias not in self.players.aliases and alias not in self.data["players"]:
+                self.players.add_alias(alias, target)
+        for name, reading in cs.get("player_readings", {}).items():
+            if name not in self.players.readings:
+                self.players.set_reading(name, reading)
+        if self.players.aliases:
+            self.data["player_aliases"] = self.players.aliases
+        if self.players.readings:
+            self.data["player_readings"] = self.players.readings
+
+        self.save_data(untracked, track=False)
+        if tracked:
+            self.save_data(tracked)
+        return report
+
+    # --- Player Identity ---
+    # A player's id is its registered spelling; see players.py for how spellings are folded.
+
+    def find_duplicate_players(self):
+        """Groups of player names that normalize to the same key, most pitches first in each group."""
+        names = set(self.data.get("players", []))
+        stats = self.get_aggregate_stats()
+        names.update(stats)
+        groups = self.players.duplicates(sorted(names))
+        return [sorted(g, key=lambda n: -stats.get(n, {}).get("Pitches", 0)) for g in groups]
+
+    @staticmethod
+    def _flatten_merge(mapping):
+        """Follow chains (a -> b, b -> c) so every name maps straight to its final target."""
+        flat = {}
+        for old, new in mapping.items():
+            seen = {old}
+            while new in mapping and mapping[new] != new:
+                if new in seen:
+                    raise ValueError(f"Circular merge involving '{new}'")
+                seen.add(new)
+                new = mapping[new]
+            if old != new:
+                flat[old] = new
+        return flat
+
+    @staticmethod
+    def _rename_in_game(g, mapping):
+        """Apply a name mapping to one game's pitches, lineups and events; True if anything changed."""
+        changed = False
+        for p in g["pitches"]:
+            for f in ("batter", "pitcher"):
+                new = mapping.get(p[f])
+                if new is not None:
+                    p[f] = new
+                    changed = True
+        for teams in (g["teams"], g.get("start")):
+            for side in (teams or {}).values():
+                lineup = side["lineup"]
+                for i, name in enumerate(lineup):
+                    if name in mapping:
+                        lineup[i] = mapping[name]
+                        changed = True
+                if side["pitcher"] in mapping:
+                    side["pitcher"] = mapping[side["pitcher"]]
+                    changed = True
+        for ev in g.get("events", []):
+            if ev.get("name") in mapping:
+                ev["name"] = mapping[ev["name"]]
+                changed = True
+        return changed
+
+    def _merge_counters(self, counters, rekey):
+        """Re-key a {key: counter dict} mapping, summing counters that end up under the same key."""
+        merged = {}
+        for key, c in counters.items():
+            new_key = rekey(key)
+            dst = merged.get(new_key)
+            if dst is None:
+                merged[new_key] = dict(c)
+            else:
+                for k in self.COUNTER_KEYS:
+                    dst[k] = dst.get(k, 0) + c.get(k, 0)
+        return merged
+
+    def _drop_merged_caches(self):
+        """
+        Forget everything built from names a merge just replaced: archived games are renamed as
+        they are loaded (see load_archived_games), so the copies in memory and all that was
+        derived from them are stale, as are the per-game caches of archived games.
+        """
+        self._archive_games = {}
+        self._archive_rollups = {}
+        self._archive_sequences = {}
+        self._game_buckets = {}
+        self._game_classes = {}
+        self._integrity = {}
+
+    @timed
+    def merge_players(self, mapping):
+        """
+        Merge players: `mapping` is {name: name to merge it into}.
+        Rewrites every live game, saved lineups and archive counters in one pass, keeps the old
+        spellings as aliases (so typing them again resolves to the merged player), and re-keys
+        the cached stats instead of recomputing them. Returns the number of games changed.
+        """
+        mapping = self._flatten_merge(mapping)
+        if not mapping:
+            return 0
+
+        # Counters cached before the merge, re-keyed below instead of being thrown away
+        cached = {}
+        if self._cache_version == self._data_version:
+            cached = {k: v for k, v in self._cache.items() if k[0] == "rollup_counters"}
+
+        changed = []
+        for g in self.data["games"]:
+            if isinstance(g, LazyGame):
+                g.load()
+            if self._rename_in_game(g, mapping):
+                changed.append(g)
+                self._get_replay(g).invalidate_from(0)
+        for session in self.sessions:
+            for snapshot in session.history:
+                self._rename_in_game(snapshot, mapping)
+
+        for lineup in self.data.get("saved_lineups", {}).values():
+            players = lineup if isinstance(lineup, list) else lineup["players"]
+            players[:] = [mapping.get(p, p) for p in players]
+            if isinstance(lineup, dict) and lineup.get("pitcher") in mapping:
+                lineup["pitcher"] = mapping[lineup["pitcher"]]
+
+        for archive in self.data.get("archives", {}).values():
+            for role, by_player in archive["aggregates"].items():
+                archive["aggregates"][role] = self._merge_counters(by_player, lambda p: mapping.get(p, p))
+
+        players = []
+        for p in self.data.get("players", []):
+            p = mapping.get(p, p)
+            if p not in players:
+                players.append(p)
+        for p in mapping.values():
+            if p not in players:
+                players.append(p)
+        self.data["players"] = players
+
+        for old, new in mapping.items():
+            self.players.add_alias(old, new)
+        self.data["player_aliases"] = self.players.aliases
+        if self.players.readings:
+            self.data["player_readings"] = self.players.readings
+        self.data["player_recent"] = self.players.recent
+
+        # After the aliases: archives a worker loads from here on already come out renamed
+        self._drop_merged_caches()
+        self.save_data(changed)
+
+        rekey = lambda key: (key[0], mapping.get(key[1], key[1]), key[2])
+        for key, counters in cached.items():
+            merged = {role: self._merge_counters(c, rekey) for role, c in counters.items()}
+            self._cached(key, lambda merged=merged: merged)
+        return len(changed)
+
+    # --- Season Archives ---
+
+    def get_archived_seasons(self):
+        return sorted(self.data.get("archives", {}).keys())
+
+    def is_archived_game(self, game_id):
+        for archive in self.data.get("archives", {}).values():
+            for summary in archive["games"]:
+                if summary["id"] == game_id:
+                    return True
+        return False
+
+    def _archive_path(self, rel_path):
+        return os.path.join(self.storage.base_dir(), *rel_path.split("/"))
+
+    @timed
+    def archive_season(self, season):
+        """
+        Freeze all games of `season` into a compressed, read-only archive file.
+        Per-player counters are stored alongside, so stats never need to open the archive.
+        The games leave the live game list; use load_archived_games / unarchive_season to get them back.
+        """
+        archives = self.data.setdefault("archives", {})
+        if season in archives:
+            raise ValueError(f"Season '{season}' is already archived")
+        games = self.get_games(season)
+        if not games:
+            raise ValueError(f"No games found for season '{season}'")
+
+        for session in self.sessions:
+            if session.game.get("season", "") == season:
+                self.sessions.close(session.game["id"])
+
+        bodies = []
+        aggregates = {"batter": {}, "pitcher": {}}
+        for g in games:
+            if isinstance(g, LazyGame):
+                g.load()
+            bodies.append(dict(g))
+            self._count_pitches(g["pitches"], "batter", aggregates["batter"])
+            self._count_pitches(g["pitches"], "pitcher", aggregates["pitcher"])
+
+        rel_path = "archives/" + season_slug(season) + ".json.gz"
+        write_season_archive(self._archive_path(rel_path), season, bodies, aggregates)
+
+        archives[season] = {
+            "file": rel_path,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "games": [game_summary(g) for g in games],
+            "aggregates": aggregates
+        }
+
+        archived_ids = set(g["id"] for g in games)
+        for g in games:
+            self._unindex_game(g)
+        self.data["games"] = [g for g in self.data["games"] if g["id"] not in archived_ids]
+        self.save_data([])
+        return len(games)
+
+    def load_archived_games(self, season):
+        """Decompress and return the full games of an archived season (read-only drill-down)."""
+        archive = self.data.get("archives", {}).get(season)
+        if not archive:
+            return []
+        games = read_season_archive(self._archive_path(archive["file"]))["games"]
+        aliases = self.data.get("player_aliases")
+        if aliases:
+            # The archive file is read-only; apply merges made after it was written
+            for g in games:
+                self._rename_in_game(g, aliases)
+        return games
+
+    @timed
+    def unarchive_season(self, season):
+        """Move an archived season's games back into the live game list and delete the archive."""
+        archive = self.data.get("archives", {}).get(season)
+        if not archive:
+            return 0
+        games = self.load_archived_games(season)
+        for g in games:
+            self.data["games"].append(g)
+            self._index_game(g)
+
+        del self.data["archives"][season]
+        self.save_data(games, track=False)
+        remove_season_archive(self._archive_path(archive["file"]))
+        return len(games)
+
+    # --- Raw Pitch Export ---
+
+    PITCH_EXPORT_FIELDS = [
+        "game_id", "season", "date", "home_team", "away_team",
+        "inning", "is_top", "batting_team", "pitching_team",
+        "balls_before", "strikes_before",
+        "batter", "pitcher", "zone", "result", "is_first_pitch"
+    ]
+
+    def iter_pitch_rows(self, season_filter=None, team_filter=None, player_filter=None):
+        """
+        Yield one flat dict per pitch, in game/pitch order.
+        season_filter: only games with this season string.
+        team_filter: only games where this team played (home or away).
+        player_filter: only pitches where this player was batter or pitcher.
+        Rows are produced lazily so callers can stream them to disk.
+        Archived seasons are decompressed one at a time, only when they match the season filter.
+        """
+        for g in self._iter_all_games(season_filter or None, team_filter or None):
+            season = g.get("season", "")
+            home = g["teams"]["home"]["name"]
+            away = g["teams"]["away"]["name"]
+
+            for p in g["pitches"]:
+                if player_filter and player_filter not in (p["batter"], p["pitcher"]):
+                    continue
+
+                is_top = p["is_top"]
+                yield {
+                    "game_id": g["id"],
+                    "season": season,
+                    "date": g["date"],
+                    "home_team": home,
+                    "away_team": away,
+                    "inning": p["inning"],
+                    "is_top": is_top,
+                    "batting_team": away if is_top else home,
+                    "pitching_team": home if is_top else away,
+                    "balls_before": p["balls_before"],
+                    "strikes_before": p["strikes_before"],
+                    "batter": p["batter"],
+                    "pitcher": p["pitcher"],
+                    "zone": p["zone"],
+                    "result": p["result"],
+                    "is_first_pitch": p["is_first_pitch"]
+                }
+
+    def _iter_all_games(self, season_filter=None, team_filter=None):
+        """Live games, then games of archived seasons (loaded on demand)."""
+        for g in self.get_games(season_filter, team_filter):
+            yield g
+        for season in self.get_archived_seasons():
+            if season_filter is not None and season != season_filter:
+                continue
+            for g in self.load_archived_games(season):
+                if team_filter is None or team_filter in (g["teams"]["home"]["name"], g["teams"]["away"]["name"]):
+                    yield g
+
+    @timed
+    def export_pitches(self, path, fmt="csv", season_filter=None, team_filter=None, player_filter=None):
+        """
+        Write raw pitch rows to `path` as CSV ('csv') or JSON Lines ('jsonl').
+        Rows are written one at a time, so memory use does not grow with the data size.
+        Returns the number of rows written.
+        """
+        rows = self.iter_pitch_rows(season_filter, team_filter, player_filter)
+        count = 0
+
+        if fmt == "csv":
+            # utf-8-sig so Excel opens Japanese names correctly
+            with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=self.PITCH_EXPORT_FIELDS)
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+        elif fmt == "jsonl":
+            with open(path, 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False))
+                    f.write("\n")
+                    count += 1
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        return count
@@ -0,0 +1,147 @@
+import bisect
+import re
+import unicodedata
+
+# Player identity.
+# Names are typed by hand, so "石川 昂弥", "石川昂弥" and "石川　昂弥" (full-width space) must be
+# one player. The registered spelling of a name is its id; `name_key` folds everything that
+# should not tell two players apart, and aliases map merged-away spellings to the id.
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(name):
+    """Display form: NFKC (full/half-width unified), whitespace collapsed and trimmed."""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", name)).strip()
+
+
+def name_key(name):
+    """Lookup key: the display form without any whitespace, case-folded."""
+    return _SPACES.sub("", unicodedata.normalize("NFKC", name)).casefold()
+
+
+def _hiragana(s):
+    return "".join(chr(ord(c) - 0x60) if "\u30a1" <= c <= "\u30f6" else c for c in s)
+
+
+def search_key(text):
+    """Autocomplete key: name_key with katakana folded to hiragana, so either kana matches."""
+    return _hiragana(name_key(text))
+
+
+class PlayerIndex:
+    """
+    Maps any spelling of a player to the registered name.
+    players: registered names (data["players"]); aliases: {spelling: registered name}.
+    """
+
+    def __init__(self, players=(), aliases=None, readings=None, recent=None):
+        self.aliases = aliases if aliases is not None else {}
+        self.readings = readings if readings is not None else {}   # name -> kana reading
+        self.recent = recent if recent is not None else {}         # name -> {"date", "team"} of last appearance
+        self._names = list(players)
+        self._by_key = {}
+        for name in players:
+            self._by_key.setdefault(name_key(name), name)
+        for alias, target in self.aliases.items():
+            self._by_key.setdefault(name_key(alias), target)
+        self._prefix = None # sorted [(search key, name)], built on first completion
+
+    def resolve(self, name):
+        """Registered name for `name`, or its normalized form if the player is new."""
+        if name in self.aliases:
+            return self.aliases[name]
+        return self._by_key.get(name_key(name), normalize_name(name))
+
+    def add(self, name):
+        if name_key(name) in self._by_key:
+            return
+        self._by_key[name_key(name)] = name
+        self._names.append(name)
+        if self._prefix is not None:
+            for entry in self._prefix_entries(name, name):
+                bisect.insort(self._prefix, entry)
+
+    def add_alias(self, alias, target):
+        """Point `alias` (and anything already aliased to it) at `target`."""
+        for k, v in self.aliases.items():
+            if v == alias:
+                self.aliases[k] = target
+        self.aliases[alias] = target
+        self._by_key[name_key(alias)] = target
+        self._by_key[name_key(target)] = target
+        if target not in self._names:
+            self._names.append(target)
+        if alias in self._names:
+            self._names.remove(alias)
+        if alias in self.readings:
+            self.readings.setdefault(target, self.readings.pop(alias))
+        if alias in self.recent:
+            seen = self.recent.pop(alias)
+            if seen["date"] > self.recent.get(target, {}).get("date", ""):
+                self.recent[target] = seen
+        self._prefix = None
+
+    def duplicates(self, names):
+        """Groups (lists) of `names` that share a lookup key, for cleaning up old data."""
+        groups = {}
+        for name in names:
+            groups.setdefault(name_key(name), []).append(name)
+        return [g for g in groups.values() if len(g) > 1]
+
+    # --- Autocomplete ---
+
+    def set_reading(self, name, reading):
+        if reading:
+            self.readings[name] = reading
+        else:
+            self.readings.pop(name, None)
+        self._prefix = None
+
+    def touch(self, name, date, team):
+        """Remember that `name` appeared for `team` on `date` (used to rank completions)."""
+        seen = self.recent.get(name)
+        if seen is None or date >= seen["date"]:
+            self.recent[name] = {"date": date, "team": team}
+
+    def _prefix_entries(self, text, name):
+        """Keys under which `name` is found: the whole name, each word of it, and its reading."""
+        keys = {search_key(text)}
+        keys.update(search_key(w) for w in normalize_name(text).split(" "))
+        reading = self.readings.get(name)
+        if reading and text == name:
+            keys.add(search_key(reading))
+        return [(k, name) for k in keys if k]
+
+    def _build_prefix(self):
+        entries = []
+        for name in self._names:
+            entries.extend(self._prefix_entries(name, name))
+        for alias, target in self.aliases.items():
+            entries.extend(self._prefix_entries(alias, target))
+        entries.sort()
+        self._prefix = entries
+
+    def complete(self, text, team=None, limit=10):
+        """
+        Registered names matching the typed prefix (name, any word of it, or kana reading),
+        players last seen for `team` first, then most recently seen.
+        """
+        if self._prefix is None:
+            self._build_prefix()
+        key = search_key(text)
+        lo = bisect.bisect_left(self._prefix, (key, ""))
+        found = set()
+        prefix = self._prefix
+        for i in range(lo, len(prefix)):
+            k, name = prefix[i]
+            if not k.startswith(key):
+                break
+            found.add(name)
+
+        empty = {"date": "", "team": None}
+        ranked = sorted(found)
+        ranked.sort(key=lambda n: self.recent.get(n, empty)["date"], reverse=True)
+        if team:
+            ranked.sort(key=lambda n: self.recent.get(n, empty)["team"] != team)
+        return ranked[:limit]
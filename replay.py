@@ -0,0 +1,426 @@
+import copy
+
+# Game rules as pure functions over a `state` dict, shared by live scoring
+# (PlateDisciplineCalculator) and by replaying a game from its pitches.
+#
+# A game replays from:
+#   game["start"]   lineups and pitchers when the game began
+#   game["pitches"] the pitch list
+#   game["events"]  non-pitch actions, each {"type", "at", ...} where `at` is the number of
+#                   pitches logged before it: "sub_batter" (team, slot, name),
+#                   "change_pitcher" (team, name), "runner_out", "batter_out", "batter_safe"
+# Games recorded before start/events existed replay from their current lineups, and the
+# inning / half recorded on each pitch is used to resync (runner outs were not logged then).
+
+CHECKPOINT_EVERY = 50
+
+
+def new_state():
+    return {
+        "inning": 1,
+        "is_top": True, # True = Top (Away bats), False = Bottom (Home bats)
+        "outs": 0,
+        "balls": 0,
+        "strikes": 0,
+        "current_batter_idx": {"home": 0, "away": 0},
+        "score": {"home": 0, "away": 0}
+    }
+
+
+def batting_key(s):
+    return "away" if s["is_top"] else "home"
+
+
+def next_batter(s):
+    """Reset count and move to next batter in lineup."""
+    s["balls"] = 0
+    s["strikes"] = 0
+    s["current_batter_idx"][batting_key(s)] += 1
+
+
+def switch_sides(s):
+    s["outs"] = 0
+    s["balls"] = 0
+    s["strikes"] = 0
+
+    if s["is_top"]:
+        s["is_top"] = False # Go to Bottom
+    else:
+        s["is_top"] = True # Go to Top of Next Inning
+        s["inning"] += 1
+
+
+def record_out(s):
+    """Batter out: increment outs, next batter, switch sides on 3 outs."""
+    s["outs"] += 1
+    s["balls"] = 0
+    s["strikes"] = 0
+
+    # Batter index increments even on an out
+    s["current_batter_idx"][batting_key(s)] += 1
+
+    if s["outs"] >= 3:
+        switch_sides(s)
+
+
+def runner_out(s):
+    """Out not made by the batter; does not advance the batter even on the 3rd out."""
+    s["outs"] += 1
+    if s["outs"] >= 3:
+        switch_sides(s)
+
+
+def apply_result(s, result):
+    """Update balls, strikes, outs, innings for one pitch result."""
+    if result == "Ball":
+        s["balls"] += 1
+        if s["balls"] >= 4:
+            next_batter(s) # Walk
+
+    elif result in ["Called Strike", "Swinging Strike"]:
+        if s["strikes"] < 2:
+            s["strikes"] += 1
+        else:
+            record_out(s) # Strikeout
+
+    elif result == "Foul":
+        if s["strikes"] < 2:
+            s["strikes"] += 1
+        # Foul with 2 strikes stays at 2 strikes
+
+    elif result == "Dead Ball":
+        next_batter(s)
+
+    elif "In Play" in result:
+        if "(Out)" in result:
+            record_out(s)
+        else:
+            next_batter(s) # Assume Safe/Hit/Error if not explicitly Out
+
+
+def apply_event(s, teams, ev):
+    """Apply one non-pitch event to state and teams."""
+    t = ev["type"]
+    if t == "sub_batter":
+        teams[ev["team"]]["lineup"][ev["slot"]] = ev["name"]
+    elif t == "change_pitcher":
+        teams[ev["team"]]["pitcher"] = ev["name"]
+    elif t == "runner_out":
+        runner_out(s)
+    elif t == "batter_out":
+        record_out(s)
+    elif t == "batter_safe":
+        next_batter(s)
+
+
+def start_teams(game):
+    """Lineups/pitchers at the first pitch (current ones for games recorded without a start snapshot)."""
+    src = game.get("start") or game["teams"]
+    teams = {}
+    for side in ("home", "away"):
+        teams[side] = {
+            "name": game["teams"][side]["name"],
+            "lineup": list(src[side]["lineup"]),
+            "pitcher": src[side]["pitcher"]
+        }
+    return teams
+
+
+class GameReplay:
+    """
+    Rebuilds a game's state from its pitches and events, keeping checkpoints every
+    `checkpoint_every` pitches so `state_at(k)` only replays from the nearest one.
+    Call `invalidate_from(k)` after changing pitch k or any event at/after k.
+    """
+
+    def __init__(self, game, checkpoint_every=CHECKPOINT_EVERY):
+        self.game = game
+        self.checkpoint_every = checkpoint_every
+        self.legacy = "start" not in game
+        # pitch index -> (state, teams) before that pitch's events
+        self.checkpoints = {0: (new_state(), start_teams(game))}
+
+    def invalidate_from(self, k):
+        """Drop checkpoints that depend on pitches/events at index >= k."""
+        for idx in [i for i in self.checkpoints if i > k]:
+            del self.checkpoints[idx]
+        if k <= 0:
+            self.checkpoints = {0: (new_state(), start_teams(self.game))}
+            self.legacy = "start" not in self.game
+
+    def _events_by_index(self):
+        return _events_by_index(self.game.get("events", []))
+
+    def state_at(self, k):
+        """
+        Return (state, teams) just before pitch k is thrown (after any events logged at k).
+        k = len(pitches) gives the current state.
+        """
+        pitches = self.game["pitches"]
+        k = max(0, min(k, len(pitches)))
+        events = self._events_by_index()
+
+        base = max(i for i in self.checkpoints if i <= k)
+        state, teams = copy.deepcopy(self.checkpoints[base])
+
+        for i in range(base, k):
+            for ev in events.get(i, ()):
+                apply_event(state, teams, ev)
+            self._apply_pitch(state, pitches[i])
+            nxt = i + 1
+            if nxt % self.checkpoint_every == 0 and nxt not in self.checkpoints:
+                self.checkpoints[nxt] = copy.deepcopy((state, teams))
+
+        for ev in events.get(k, ()):
+            apply_event(state, teams, ev)
+        return state, teams
+
+    def _apply_pitch(self, state, p):
+        if self.legacy:
+            # Resync half-inning from the pitch record (runner outs were not logged)
+            _resync_half(state, p)
+        apply_result(state, p["result"])
+
+    def rebuild(self):
+        """Return (state, teams) after every pitch and event, keeping the game's score."""
+        state, teams = self.state_at(len(self.game["pitches"]))
+        state["score"] = copy.deepcopy(self.game["state"]["score"])
+        return state, teams
+
+
+def _walk(pitches, events, state, teams, start, legacy):
+    """
+    Yield (i, state, teams) positioned just before pitch i (after events at i), from `start`
+    until len(pitches). The pitch is applied when the generator resumes, so the caller may
+    rewrite pitch i's record in between. `state`/`teams` are mutated in place.
+    """
+    i = start
+    while True:
+        for ev in events.get(i, ()):
+            apply_event(state, teams, ev)
+        yield i, state, teams
+        if i >= len(pitches):
+            return
+        p = pitches[i]
+        if legacy:
+            _resync_half(state, p)
+        apply_result(state, p["result"])
+        i += 1
+
+
+def _resync_half(state, p):
+    inning = p.get("inning", state["inning"])
+    is_top = p.get("is_top", state["is_top"])
+    if inning != state["inning"] or is_top != state["is_top"]:
+        state["inning"] = inning
+        state["is_top"] = is_top
+        state["outs"] = 0
+        state["balls"] = 0
+        state["strikes"] = 0
+
+
+def _events_by_index(events):
+    by_idx = {}
+    for ev in events:
+        by_idx.setdefault(ev["at"], []).append(ev)
+    return by_idx
+
+
+def derive_pitch_fields(state, teams):
+    """Fields of a pitch record that follow from the state it was thrown in."""
+    bat = batting_key(state)
+    pit = "home" if state["is_top"] else "away"
+    lineup = teams[bat]["lineup"]
+    slot = state["current_batter_idx"][bat] % len(lineup)
+    return {
+        "batter": lineup[slot],
+        "pitcher": teams[pit]["pitcher"],
+        "is_first_pitch": state["balls"] == 0 and state["strikes"] == 0,
+        "inning": state["inning"],
+        "is_top": state["is_top"],
+        "balls_before": state["balls"],
+        "strikes_before": state["strikes"],
+        "lineup_slot": slot
+    }
+
+
+def reconstruct_start_events(game):
+    """
+    Build `start` lineups and `events` for a game recorded before they existed, from what
+    each pitch recorded (batter, pitcher, inning, half). Runner outs that ended a half-inning
+    are recovered from the half changes. Returns (start, events), or None if the result does
+    not replay to the game's stored state and lineups.
+    """
+    pitches = game["pitches"]
+    state = new_state()
+    teams = start_teams(game)
+
+    # Starting lineup: first batter seen in each slot; starting pitcher: first one seen
+    seen_slot = {"home": set(), "away": set()}
+    seen_pitcher = set()
+    for p in pitches:
+        _resync_half(state, p)
+        bat = batting_key(state)
+        pit = "home" if state["is_top"] else "away"
+        slot = state["current_batter_idx"][bat] % len(teams[bat]["lineup"])
+        if slot not in seen_slot[bat]:
+            seen_slot[bat].add(slot)
+            teams[bat]["lineup"][slot] = p["batter"]
+        if pit not in seen_pitcher:
+            seen_pitcher.add(pit)
+            teams[pit]["pitcher"] = p["pitcher"]
+        apply_result(state, p["result"])
+
+    start = {side: {"lineup": list(teams[side]["lineup"]), "pitcher": teams[side]["pitcher"]} for side in ("home", "away")}
+
+    # Second pass: replay strictly, emitting events where the records disagree with the replay
+    events = []
+    state = new_state()
+    teams = {side: {"name": game["teams"][side]["name"], "lineup": list(start[side]["lineup"]), "pitcher": start[side]["pitcher"]}
+             for side in ("home", "away")}
+
+    def emit(ev):
+        events.append(ev)
+        apply_event(state, teams, ev)
+
+    for i, p in enumerate(pitches):
+        target = (p.get("inning", state["inning"]), p.get("is_top", state["is_top"]))
+        if target != (state["inning"], state["is_top"]):
+            nxt = (state["inning"], False) if state["is_top"] else (state["inning"] + 1, True)
+            if target != nxt:
+                return None # Skipped half-inning: cannot be expressed as events
+            for _ in range(3 - state["outs"]):
+                emit({"type": "runner_out", "at": i})
+
+        bat = batting_key(state)
+        pit = "home" if state["is_top"] else "away"
+        slot = state["current_batter_idx"][bat] % len(teams[bat]["lineup"])
+        if teams[bat]["lineup"][slot] != p["batter"]:
+            emit({"type": "sub_batter", "at": i, "team": bat, "slot": slot, "name": p["batter"]})
+        if teams[pit]["pitcher"] != p["pitcher"]:
+            emit({"type": "change_pitcher", "at": i, "team": pit, "name": p["pitcher"]})
+        apply_result(state, p["result"])
+
+    # Actions after the last pitch
+    end = len(pitches)
+    for side in ("home", "away"):
+        for slot, name in enumerate(game["teams"][side]["lineup"]):
+            if teams[side]["lineup"][slot] != name:
+                emit({"type": "sub_batter", "at": end, "team": side, "slot": slot, "name": name})
+        if teams[side]["pitcher"] != game["teams"][side]["pitcher"]:
+            emit({"type": "change_pitcher", "at": end, "team": side, "name": game["teams"][side]["pitcher"]})
+    stored = game["state"]
+    if (stored["inning"], stored["is_top"]) != (state["inning"], state["is_top"]):
+        nxt = (state["inning"], False) if state["is_top"] else (state["inning"] + 1, True)
+        if (stored["inning"], stored["is_top"]) == nxt:
+            for _ in range(3 - state["outs"]):
+                emit({"type": "runner_out", "at": end})
+    while state["outs"] < stored["outs"] and (stored["inning"], stored["is_top"]) == (state["inning"], state["is_top"]):
+        emit({"type": "runner_out", "at": end})
+
+    # Verify
+    check = GameReplay({"start": start, "events": events, "pitches": pitches,
+                        "teams": game["teams"], "state": stored})
+    final_state, final_teams = check.rebuild()
+    if final_state != stored:
+        return None
+    for side in ("home", "away"):
+        if final_teams[side]["lineup"] != game["teams"][side]["lineup"] or final_teams[side]["pitcher"] != game["teams"][side]["pitcher"]:
+            return None
+    return start, events
+
+
+def resync_pitches(game, k, old_pitches, old_events, offset, checkpoint=None):
+    """
+    Rewrite the derived fields of `game`'s pitches after a change at index k, walking the new
+    and the old pitch sequences side by side and stopping once their states line up again.
+    offset: +1 if a pitch was inserted at k, -1 if pitch k was deleted, 0 if it was edited.
+    checkpoint: optional (index <= k, (state, teams)) to start from instead of pitch 0.
+    Returns (changes, final) where changes is a list of (index, old_record, new_record) for
+    rewritten pitches and final is (state, teams) after the last pitch, or None if the walk
+    converged (the final state is then unchanged).
+    """
+    legacy = "start" not in game
+    if checkpoint is None:
+        base, snap = 0, (new_state(), start_teams(game))
+    else:
+        base, snap = checkpoint
+
+    new_pitches = game["pitches"]
+    new_it = _walk(new_pitches, _events_by_index(game.get("events", [])), *copy.deepcopy(snap), base, legacy)
+    old_it = _walk(old_pitches, _events_by_index(old_events), *copy.deepcopy(snap), base, legacy)
+
+    # First index where the new sequence may line up with the old one
+    first_cmp = k if offset < 0 else k + 1
+
+    old_pos, old_state, old_teams = next(old_it)
+    changes = []
+    for i, state, teams in new_it:
+        if i >= len(new_pitches):
+            return changes, (copy.deepcopy(state), copy.deepcopy(teams))
+        if i < k:
+            continue
+
+        old_i = i - offset
+        while old_pos < old_i:
+            old_pos, old_state, old_teams = next(old_it)
+        if i >= first_cmp and old_pos == old_i and state == old_state and teams == old_teams:
+            return changes, None
+
+        p = new_pitches[i]
+        fields = derive_pitch_fields(state, teams)
+        if any(p.get(f) != v for f, v in fields.items()):
+            old = dict(p)
+            p.update(fields)
+            changes.append((i, old, dict(p)))
+    return changes, None
+
+
+def iter_pitch_states(game):
+    """
+    Yield (pitch, state, teams) with the state each pitch was thrown in, then once more
+    (None, state, teams) with the state after the last pitch. `state`/`teams` are reused.
+    """
+    pitches = game["pitches"]
+    legacy = "start" not in game
+    walk = _walk(pitches, _events_by_index(game.get("events", [])), new_state(), start_teams(game), 0, legacy)
+    for i, state, teams in walk:
+        if i >= len(pitches):
+            yield None, state, teams
+            return
+        p = pitches[i]
+        if legacy:
+            _resync_half(state, p) # The walk only does this when it applies the pitch
+        yield p, state, teams
+
+
+def fill_pitch_fields(game):
+    """
+    Give pitch records the derived fields they lack (data from older versions), from a replay
+    of the game. Recorded values are left alone; returns how many records changed.
+    """
+    changed = 0
+    for p, state, teams in iter_pitch_states(game):
+        if p is None:
+            break
+        missing = {f: v for f, v in derive_pitch_fields(state, teams).items() if f not in p}
+        if missing:
+            p.update(missing)
+            changed += 1
+    return changed
+
+
+def backfill_pitch_fields(game):
+    """Set every pitch's derived fields from a replay of the game; returns how many records changed."""
+    changed = 0
+    pitches = game["pitches"]
+    walk = _walk(pitches, _events_by_index(game.get("events", [])), new_state(), start_teams(game), 0, "start" not in game)
+    for i, state, teams in walk:
+        if i >= len(pitches):
+            break
+        p = pitches[i]
+        fields = derive_pitch_fields(state, teams)
+        if any(p.get(f) != v for f, v in fields.items()):
+            p.update(fields)
+            changed += 1
+    return changed
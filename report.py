@@ -0,0 +1,223 @@
+import hashlib
+import html
+import json
+import math
+import os
+
+from pitch import ZONES, RESULTS
+from storage import season_slug
+
+# Static HTML season reports.
+# The calculator collects every page's input in one aggregation pass (see
+# PlateDisciplineCalculator.export_report); this module only turns those inputs into HTML.
+# A page's input is plain JSON-able data, so its digest tells whether the page would come out
+# the same as last time: the digests are kept in a manifest next to the pages, and a re-run
+# after one new game only renders and writes the pages whose numbers changed. Rendering is a
+# pure function of the input, which lets large batches run in worker processes.
+
+REPORT_VERSION = 1 # bump when the page layout changes, so every page is rendered again
+MANIFEST = "report-manifest.json"
+PARALLEL_MIN = 24  # fewer changed pages than this render in-process (worker start-up costs more)
+
+_ZONE_COLORS = {"In": "#1971c2", "Out": "#e03131"}
+
+_CSS = """
+body { font-family: "Segoe UI", "Hiragino Sans", "Meiryo", sans-serif; margin: 24px; color: #212529; }
+h1 { font-size: 22px; } h2 { font-size: 17px; margin-top: 28px; }
+table { border-collapse: collapse; font-size: 13px; }
+th, td { border: 1px solid #dee2e6; padding: 3px 8px; text-align: right; }
+th { background: #f1f3f5; } td:first-child, th:first-child { text-align: left; }
+a { color: #1971c2; text-decoration: none; }
+.nav { font-size: 13px; margin-bottom: 12px; }
+"""
+
+
+def page_path(kind, name=None):
+    """Relative path of a page ('index', 'team' or 'player')."""
+    if kind == "index":
+        return "index.html"
+    return f"{kind}s/{season_slug(name)}.html"
+
+
+def digest(page):
+    raw = json.dumps([REPORT_VERSION, page], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# --- Rendering ---
+
+def _link(from_path, kind, name):
+    target = page_path(kind, name)
+    if "/" in from_path:
+        target = "../" + target
+    return f'<a href="{html.escape(target)}">{html.escape(name)}</a>'
+
+
+def _fmt(col, v):
+    if col in ("PA", "Pitches"):
+        return str(v)
+    return f"{v:.1f}%"
+
+
+def _table(cols, rows, label):
+    """rows: [(first cell html, stats dict)]."""
+    out = ["<table><tr>", f"<th>{html.escape(label)}</th>"]
+    out += [f"<th>{html.escape(c)}</th>" for c in cols]
+    out.append("</tr>")
+    for first, stats in rows:
+        out.append(f"<tr><td>{first}</td>" + "".join(f"<td>{_fmt(c, stats[c])}</td>" for c in cols) + "</tr>")
+    out.append("</table>")
+    return "".join(out)
+
+
+def split_svg(split):
+    """Zone x result bubble chart: one circle per cell, area proportional to its share of pitches."""
+    counts = {(z, r): n for z, r, n in split}
+    total = sum(counts.values())
+    cell_w, cell_h, left, top = 90, 34, 120, 26
+    width = left + cell_w * len(ZONES) + 10
+    height = top + cell_h * len(RESULTS) + 10
+    max_r = cell_h / 2 - 2
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-size="11" font-family="sans-serif">']
+    for j, zone in enumerate(ZONES):
+        x = left + cell_w * j + cell_w / 2
+        out.append(f'<text x="{x:.0f}" y="16" text-anchor="middle" font-weight="bold">{zone} Zone</text>')
+    for i, result in enumerate(RESULTS):
+        y = top + cell_h * i + cell_h / 2
+        out.append(f'<text x="4" y="{y + 4:.0f}">{html.escape(result)}</text>')
+        for j, zone in enumerate(ZONES):
+            n = counts.get((zone, result), 0)
+            if not n:
+                continue
+            share = n / total
+            x = left + cell_w * j + cell_w / 2
+            r = max(2.0, max_r * math.sqrt(min(share, 0.25) / 0.25)) # a quarter of all pitches fills the cell
+            out.append(f'<circle cx="{x - 18:.1f}" cy="{y:.1f}" r="{r:.1f}" fill="{_ZONE_COLORS[zone]}" fill-opacity="0.6">'
+                       f'<title>{zone} / {html.escape(result)}: {n}</title></circle>')
+            out.append(f'<text x="{x + 2:.0f}" y="{y + 4:.0f}">{share * 100:.1f}%</text>')
+    out.append("</svg>")
+    return "".join(out)
+
+
+def _document(title, nav, body):
+    return (
+        "<!DOCTYPE html>\n<html lang=\"ja\"><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title><style>{_CSS}</style></head><body>"
+        f"<div class=\"nav\">{nav}</div><h1>{html.escape(title)}</h1>{body}</body></html>\n"
+    )
+
+
+_ROLE_TITLES = {"batter": "Batting", "pitcher": "Pitching"}
+
+
+def _render_index(page):
+    path = page_path("index")
+    cols = page["columns"]
+    body = []
+    for role in ("batter", "pitcher"):
+        teams = page["teams"][role]
+        body.append(f"<h2>Teams: {_ROLE_TITLES[role]}</h2>")
+        body.append(_table(cols, [(_link(path, "team", t), teams[t]) for t in sorted(teams)], "Team"))
+    for role in ("batter", "pitcher"):
+        players = page["players"][role]
+        body.append(f"<h2>Players: {_ROLE_TITLES[role]}</h2>")
+        body.append(_table(cols, [(_link(path, "player", p), players[p]) for p in sorted(players)], "Player"))
+    return _document(f"{page['season']} Plate Discipline", "", "".join(body))
+
+
+def _render_team(page):
+    path = page_path("team", page["name"])
+    cols = page["columns"]
+    body = []
+    for role, d in page["roles"].items():
+        body.append(f"<h2>{_ROLE_TITLES[role]}</h2>")
+        body.append(_table(cols, [("Team", d["total"])], ""))
+        body.append(split_svg(d["split"]))
+        players = d["players"]
+        body.append(_table(cols, [(_link(path, "player", p), players[p]) for p in sorted(players)], "Player"))
+    nav = f'<a href="../index.html">{html.escape(page["season"])}</a>'
+    return _document(f"{page['name']} ({page['season']})", nav, "".join(body))
+
+
+def _render_player(page):
+    path = page_path("player", page["name"])
+    cols = page["columns"]
+    body = []
+    for role, d in page["roles"].items():
+        body.append(f"<h2>{_ROLE_TITLES[role]}</h2>")
+        rows = [("Total", d["total"])]
+        rows += [(_link(path, "team", t), d["by_team"][t]) for t in sorted(d["by_team"])]
+        body.append(_table(cols, rows, ""))
+        body.append(split_svg(d["split"]))
+    nav = f'<a href="../index.html">{html.escape(page["season"])}</a>'
+    return _document(f"{page['name']} ({page['season']})", nav, "".join(body))
+
+
+_RENDERERS = {"index": _render_index, "team": _render_team, "player": _render_player}
+
+
+def render_page(page):
+    return _RENDERERS[page["kind"]](page)
+
+
+# --- Writing ---
+
+def _rendered(pages, workers):
+    """HTML of `pages`, in order, rendered in worker processes when there are enough of them."""
+    if workers == 1 or len(pages) < PARALLEL_MIN:
+        for page in pages:
+            yield render_page(page)
+        return
+    from concurrent.futures import ProcessPoolExecutor # pulls in multiprocessing: only import it when a pool is used
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError):
+        # No worker processes available here
+        for page in pages:
+            yield render_page(page)
+        return
+    with pool:
+        yield from pool.map(render_page, pages, chunksize=8)
+
+
+def write_report(pages, out_dir, force=False, workers=None, progress=None):
+    """
+    Write `pages` ({relative path: page input}) under out_dir, skipping pages whose input is
+    unchanged since the last run, and delete pages that are no longer part of the report.
+    progress(done, total) is called as pages are written.
+    Returns {"written", "unchanged", "removed"} counts.
+    """
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    old = {}
+    if not force and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                old = json.load(f).get("pages", {})
+        except (OSError, ValueError):
+            old = {} # Unreadable manifest: render everything
+
+    digests = {path: digest(page) for path, page in pages.items()}
+    todo = [path for path in pages
+            if old.get(path) != digests[path] or not os.path.exists(os.path.join(out_dir, path))]
+
+    done = 0
+    for path, text in zip(todo, _rendered([pages[p] for p in todo], workers)):
+        full = os.path.join(out_dir, path)
+        os.makedirs(os.path.dirname(full) or out_dir, exist_ok=True)
+        with open(full, "w", encoding="utf-8") as f:
+            f.write(text)
+        done += 1
+        if progress:
+            progress(done, len(todo))
+
+    removed = 0
+    for path in set(old) - set(pages):
+        try:
+            os.remove(os.path.join(out_dir, path))
+            removed += 1
+        except OSError:
+            pass
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"version": REPORT_VERSION, "pages": digests}, f, ensure_ascii=False, indent=1)
+    return {"written": len(todo), "unchanged": len(pages) - len(todo), "removed": removed}
@@ -0,0 +1,124 @@
+from pitch import ZONES, RESULTS
+
+# Pitch-sequence analytics.
+# Every pitch is coded as a small integer so one pass over the games can count transitions
+# and n-grams in flat dicts of ints instead of nested tuples:
+#   pitch code  = zone * len(RESULTS) + result            (0..13)
+#   count code  = balls_before * 3 + strikes_before       (0..11)
+#   state code  = count code * N_CODES + pitch code       (what was thrown in which count)
+# Sequences never cross a plate appearance: the window restarts on each first pitch, and
+# whenever the batter, pitcher or half-inning changes.
+#
+# Tables per player (one per role):
+#   "transitions": {state code of pitch n * N_CODES + pitch code of pitch n+1: count}
+#   "ngrams":      {packed run of 1..MAX_N pitch codes: count}
+# A run is packed as base-(N_CODES + 1) digits holding code + 1, so its length is implicit
+# and runs of different lengths never collide.
+
+N_CODES = len(ZONES) * len(RESULTS)
+N_COUNTS = 12
+MAX_N = 4
+
+_ZONE_CODE = {z: i for i, z in enumerate(ZONES)}
+_RESULT_CODE = {r: i for i, r in enumerate(RESULTS)}
+_SWINGS = frozenset(("Swinging Strike", "Foul", "In Play (Safe)", "In Play (Out)"))
+_BASE = N_CODES + 1
+
+
+def pitch_code(zone, result):
+    return _ZONE_CODE[zone] * len(RESULTS) + _RESULT_CODE[result]
+
+
+def decode_pitch(code):
+    """(zone, result) of a pitch code."""
+    return ZONES[code // len(RESULTS)], RESULTS[code % len(RESULTS)]
+
+
+def decode_state(state):
+    """(balls, strikes, zone, result) of a state code."""
+    count, code = divmod(state, N_CODES)
+    return (count // 3, count % 3) + decode_pitch(code)
+
+
+def is_swing(code):
+    return RESULTS[code % len(RESULTS)] in _SWINGS
+
+
+def in_zone(code):
+    return ZONES[code // len(RESULTS)] == "In"
+
+
+def decode_ngram(key):
+    """Tuple of pitch codes of a packed run, first pitch first."""
+    codes = []
+    while key:
+        key, digit = divmod(key, _BASE)
+        codes.append(digit - 1)
+    return tuple(reversed(codes))
+
+
+def ngram_length(key):
+    n = 0
+    while key:
+        key //= _BASE
+        n += 1
+    return n
+
+
+def new_tables():
+    return {"transitions": {}, "ngrams": {}}
+
+
+def build(games, step=None):
+    """{role: {player: tables}} for `games`, in one pass over their pitches."""
+    out = {"batter": {}, "pitcher": {}}
+    batters, pitchers = out["batter"], out["pitcher"]
+    modulus = _BASE ** MAX_N
+    for g in games:
+        if step:
+            step()
+        prev_state = None   # state code of the previous pitch in this PA
+        run = 0             # packed codes of the last MAX_N pitches in this PA
+        last = None
+        for p in g["pitches"]:
+            code = pitch_code(p["zone"], p["result"])
+            batter, pitcher = p["batter"], p["pitcher"]
+            where = (batter, pitcher, p["inning"], p["is_top"])
+            if p["is_first_pitch"] or where != last:
+                prev_state = None
+                run = 0
+            last = where
+
+            b = batters.get(batter)
+            if b is None:
+                b = batters[batter] = new_tables()
+            pt = pitchers.get(pitcher)
+            if pt is None:
+                pt = pitchers[pitcher] = new_tables()
+
+            if prev_state is not None:
+                key = prev_state * N_CODES + code
+                for t in (b["transitions"], pt["transitions"]):
+                    t[key] = t.get(key, 0) + 1
+
+            # Every run ending at this pitch: the last 1, 2, ... MAX_N codes
+            run = (run * _BASE + code + 1) % modulus
+            width = _BASE
+            for _n in range(MAX_N):
+                key = run % width
+                for t in (b["ngrams"], pt["ngrams"]):
+                    t[key] = t.get(key, 0) + 1
+                if key == run:
+                    break
+                width *= _BASE
+
+            prev_state = (p["balls_before"] * 3 + p["strikes_before"]) * N_CODES + code
+    return out
+
+
+def add_tables(dst, src):
+    """Add the counts of `src` into `dst`."""
+    for part in ("transitions", "ngrams"):
+        d = dst[part]
+        for key, n in src[part].items():
+            d[key] = d.get(key, 0) + n
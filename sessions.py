@@ -0,0 +1,61 @@
+# Live game sessions.
+# Several games can be open for input at once (a doubleheader, the farm team alongside the
+# top team). Each open game keeps its own undo history, and one of them is active: the one
+# the input screen and the calculator's current_game refer to. Switching only changes which
+# session is active, so it costs nothing and keeps every undo stack intact.
+# Saves are shared: every session writes through the calculator's save_data, so inputs to
+# different games inside one deferred_saves() block reach the disk in a single write.
+
+
+class GameSession:
+    """One game open for input, with its undo history (deep copies of the game, oldest first)."""
+    __slots__ = ("game", "history")
+
+    def __init__(self, game):
+        self.game = game
+        self.history = []
+
+
+class SessionManager:
+    def __init__(self):
+        self._sessions = {} # game id -> GameSession, in the order they were opened
+        self._active = None
+
+    @property
+    def active(self):
+        return self._sessions.get(self._active)
+
+    def get(self, game_id):
+        return self._sessions.get(game_id)
+
+    def open(self, game):
+        """Open `game` (or switch to it if it is already open) and make it active."""
+        session = self._sessions.get(game["id"])
+        if session is None:
+            session = self._sessions[game["id"]] = GameSession(game)
+        elif session.game is not game:
+            # A different copy of the game (reloaded or replaced): old snapshots no longer apply
+            session.game = game
+            session.history = []
+        self._active = game["id"]
+        return session
+
+    def close(self, game_id):
+        """Drop a session; if it was active, the most recently opened remaining one becomes active."""
+        if self._sessions.pop(game_id, None) is None:
+            return
+        if self._active == game_id:
+            self._active = next(reversed(self._sessions), None)
+
+    def replace(self, old, new):
+        """Point the session of `old` at `new` (same game id), dropping its undo history."""
+        session = self._sessions.get(old["id"])
+        if session is not None and session.game is old:
+            session.game = new
+            session.history = []
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,678 @@
+import copy
+import gzip
+import hashlib
+import json
+import os
+import re
+import stat
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+from pitch import compact_pitches, to_json
+
+MANIFEST_NAME = "manifest.json"
+# Sharded storage keeps everything but the games in side files next to the manifest, so a
+# save rewrites (and re-encodes) only the parts that changed
+SIDE_FILES = {
+    "players.json": ("players", "player_aliases", "player_readings", "player_recent"),
+    "archives.json": ("archives",),
+    "sync.json": ("sync",),
+}
+SETTINGS_NAME = "settings.json" # every other top-level key (saved lineups, custom metrics, schema version)
+CHECKSUMS_NAME = "checksums.json"
+BACKUP_DIR = "backups"
+SHARD_FORMAT_VERSION = 1
+ARCHIVE_FORMAT_VERSION = 1
+
+
+class CorruptDataError(ValueError):
+    """A data file failed its checksum or could not be parsed, and no backup could replace it."""
+
+
+def season_slug(season):
+    """File-system safe name for a season (Japanese is kept; reserved characters are replaced)."""
+    name = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", season.strip())
+    return name or "_"
+
+
+def game_summary(g):
+    """Return the listing fields of a game (id, season, date, teams, score) without loading a lazy shard."""
+    if isinstance(g, LazyGame) and not g.loaded:
+        return g.summary
+    return {
+        "id": g["id"],
+        "season": g.get("season", ""),
+        "date": g.get("date", ""),
+        "home": g["teams"]["home"]["name"],
+        "away": g["teams"]["away"]["name"],
+        "score_home": g["state"]["score"]["home"],
+        "score_away": g["state"]["score"]["away"]
+    }
+
+
+def _encode_json(obj, indent=None, compress=False):
+    """The bytes a file holding `obj` is written with (gzip-compressed for .gz files)."""
+    raw = json.dumps(obj, indent=indent, ensure_ascii=False, default=to_json).encode("utf-8")
+    return gzip.compress(raw) if compress else raw
+
+
+def _decode_json(raw, compressed=False):
+    if compressed:
+        raw = gzip.decompress(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def _write_bytes_atomic(path, raw):
+    """Write to a temp file, flush it to disk and rename over `path`, so a crash never leaves a half-written file."""
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _write_json_atomic(path, obj, indent=None, compress=False):
+    _write_bytes_atomic(path, _encode_json(obj, indent, compress))
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _read_json(path):
+    return _decode_json(_read_bytes(path), path.endswith(".gz"))
+
+
+def _move_aside(path):
+    """Rename a damaged file out of the way (kept for inspection); returns its new path."""
+    dst = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    os.replace(path, dst)
+    return dst
+
+
+# --- Checksums and backups ---
+
+def _digest(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+class Checksums:
+    """
+    SHA-256 of every file a storage writes, kept in one small JSON index beside them.
+    Each file keeps its last KEEP digests: the index is written before the files it
+    describes, so after a crash between the two writes the file still matches.
+    Files the index does not know (written before checksums existed) are accepted.
+    """
+
+    KEEP = 2
+
+    def __init__(self, path=None):
+        self.path = path
+        self.files = {} # name -> [digest, ...], newest first
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                self.files = _read_json(path)["files"]
+            except (OSError, ValueError, KeyError):
+                self.files = {} # A damaged index only costs verification, never data
+
+    def update(self, name, raw):
+        """Record the bytes about to be written as `name`; returns True if the index changed."""
+        digest = _digest(raw)
+        with self._lock:
+            known = self.files.get(name, [])
+            if known and known[0] == digest:
+                return False
+            self.files[name] = [digest] + known[:self.KEEP - 1]
+            return True
+
+    def remove(self, name):
+        with self._lock:
+            return self.files.pop(name, None) is not None
+
+    def verify(self, name, raw):
+        known = self.files.get(name)
+        return not known or _digest(raw) in known
+
+    def save(self):
+        with self._lock:
+            _write_json_atomic(self.path, {"algorithm": "sha256", "files": self.files}, indent=1)
+
+
+class Backups:
+    """
+    Timestamped zip copies of a storage's files in a `backups` folder beside the data.
+    A storage takes one before a save overwrites its files, at most every INTERVAL seconds;
+    the oldest are dropped beyond MAX_COUNT backups or MAX_BYTES in total.
+    """
+
+    INTERVAL = 15 * 60
+    MAX_COUNT = 10
+    MAX_BYTES = 200 * 1024 * 1024
+
+    def __init__(self, directory, prefix, index_name):
+        self.directory = directory
+        self.prefix = prefix
+        self.index_name = index_name # name of the checksum index inside each backup
+        self._pattern = re.compile(re.escape(prefix) + r"-\d{8}-\d{6}\.zip")
+        self._last = None
+
+    def list(self):
+        """Backup paths, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted((n for n in os.listdir(self.directory) if self._pattern.fullmatch(n)), reverse=True)
+        return [os.path.join(self.directory, n) for n in names]
+
+    def due(self):
+        if self._last is None:
+            existing = self.list()
+            self._last = os.path.getmtime(existing[0]) if existing else 0
+        return time.time() - self._last >= self.INTERVAL
+
+    def create(self, files):
+        """Zip `files` ({name in the backup: path}); returns the backup's path."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.prefix}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip")
+        tmp = path + ".tmp"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as z:
+            for name, src in files.items():
+                z.write(src, name)
+        os.replace(tmp, path)
+        self._last = time.time()
+        self.prune()
+        return path
+
+    def prune(self):
+        total = 0
+        for i, path in enumerate(self.list()):
+            total += os.path.getsize(path)
+            if i >= self.MAX_COUNT or (i > 0 and total > self.MAX_BYTES):
+                os.remove(path)
+
+    def find(self, name):
+        """
+        The newest backed-up copy of `name` that passes the checksum stored with it and parses:
+        (backup path, raw bytes, parsed object), or None.
+        """
+        for path in self.list():
+            try:
+                with zipfile.ZipFile(path) as z:
+                    if name not in z.namelist():
+                        continue
+                    raw = z.read(name)
+                    index = Checksums()
+                    if self.index_name in z.namelist():
+                        index.files = _decode_json(z.read(self.index_name)).get("files", {})
+                obj = _decode_json(raw, name.endswith(".gz"))
+            except (OSError, ValueError, zipfile.BadZipFile):
+                continue
+            if index.verify(name, raw):
+                return path, raw, obj
+        return None
+
+    def extract(self, path, directory):
+        with zipfile.ZipFile(path) as z:
+            z.extractall(directory)
+
+
+class LazyGame(dict):
+    """
+    Game dict whose body (teams, state, pitches) is read from its shard on first access.
+    Only `id`, `season` and `date` are present until then; use `g[key]` (not `g.get` / `in`)
+    for body keys so the load is triggered.
+    """
+
+    def __init__(self, storage, summary):
+        super().__init__(id=summary["id"], season=summary.get("season", ""), date=summary.get("date", ""))
+        self.storage = storage
+        self.summary = summary
+        self.loaded = False
+
+    def __missing__(self, key):
+        if not self.loaded:
+            self.load()
+            if key in self:
+                return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def load(self):
+        if not self.loaded:
+            self.update(self.storage.read_shard(self.summary["file"]))
+            self.loaded = True
+
+    def __deepcopy__(self, memo):
+        self.load()
+        return copy.deepcopy(dict(self), memo)
+
+
+class JsonStorage:
+    """
+    Single `data.json` file holding everything (original layout), with its checksum in
+    `data.checksums.json` and periodic backups in `backups/data-<timestamp>.zip`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        stem = os.path.splitext(self.name)[0]
+        index_name = stem + ".checksums.json"
+        self.checksums = Checksums(os.path.join(self.base_dir(), index_name))
+        self.backups = Backups(os.path.join(self.base_dir(), BACKUP_DIR), stem, index_name)
+        self.recovered = [] # Notes on files replaced from backups (see recover)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {"games": [], "players": []}
+        try:
+            raw = _read_bytes(self.path)
+            if not self.checksums.verify(self.name, raw):
+                raise CorruptDataError(f"{self.name}: checksum mismatch")
+            data = _decode_json(raw)
+        except ValueError as e:
+            data = self.recover(e)
+        for g in data.get("games", []):
+            compact_pitches(g)
+        return data
+
+    def recover(self, error):
+        """
+        Replace the damaged file with the newest valid backup (or, without one, start empty).
+        The damaged file is kept next to the original as `<name>.corrupt-<timestamp>`.
+        """
+        found = self.backups.find(self.name)
+        note = {"file": self.path, "error": str(error), "moved_to": _move_aside(self.path), "backup": None}
+        if found:
+            note["backup"], raw, data = found
+            self.checksums.update(self.name, raw)
+            self.checksums.save()
+            _write_bytes_atomic(self.path, raw)
+        else:
+            data = {"games": [], "players": []}
+        self.recovered.append(note)
+        return data
+
+    def save(self, data, games=None):
+        """Rewrite the whole file (`games` is ignored; everything is always written)."""
+        raw = _encode_json(data, indent=4)
+        if self.backups.due() and os.path.exists(self.path):
+            self.backup()
+        if self.checksums.update(self.name, raw):
+            self.checksums.save()
+        _write_bytes_atomic(self.path, raw)
+
+    def backup(self):
+        """Zip the current file into the backups folder, unless it fails its checksum. Returns the path or None."""
+        if not self.checksums.verify(self.name, _read_bytes(self.path)):
+            return None
+        files = {self.name: self.path}
+        if os.path.exists(self.checksums.path):
+            files[self.backups.index_name] = self.checksums.path
+        return self.backups.create(files)
+
+    def base_dir(self):
+        return os.path.dirname(os.path.abspath(self.path))
+
+    def size_bytes(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+
+class ShardedStorage:
+    """
+    Directory layout:
+        manifest.json                  one summary per game (the game index)
+        players.json, archives.json,   players and aliases, season archive counters,
+        sync.json, settings.json       sync state, everything else (lineups, metrics, ...)
+        seasons/<season>/<game_id>.json  full game (teams, state, pitches)
+    Saving a game rewrites only its shard; the manifest and side files are rewritten only when
+    their content changes (manifests written before the side files existed still load).
+    Shards may also be gzip-compressed (`.json.gz`), so a season directory can be compressed on its own.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._parts = {} # file name -> content last written (or read) for the manifest and side files
+        self._files = {}
+        self.checksums = Checksums(os.path.join(directory, CHECKSUMS_NAME))
+        parent, base = os.path.split(os.path.normpath(os.path.abspath(directory)))
+        self.backups = Backups(os.path.join(parent, BACKUP_DIR), base + "-shards", CHECKSUMS_NAME)
+        self.recovered = [] # Notes on files replaced from backups (see read_shard / load)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def shard_file(self, g):
+        """Relative shard path for a game (keeps an existing path, e.g. a compressed one)."""
+        f = self._files.get(g["id"])
+        if f:
+            return f
+        return "/".join(["seasons", season_slug(g.get("season", "")), g["id"] + ".json"])
+
+    def _path(self, rel_path):
+        return os.path.join(self.directory, *rel_path.split("/"))
+
+    def _read_verified(self, rel_path):
+        raw = _read_bytes(self._path(rel_path))
+        if not self.checksums.verify(rel_path, raw):
+            raise CorruptDataError(f"{rel_path}: checksum mismatch")
+        return _decode_json(raw, rel_path.endswith(".gz"))
+
+    def read_shard(self, rel_path):
+        return compact_pitches(self._read_recovering(rel_path))
+
+    def _read_recovering(self, rel_path):
+        """Read a shard or side file; a damaged one is replaced by its newest valid backup (or CorruptDataError)."""
+        try:
+            return self._read_verified(rel_path)
+        except ValueError as e:
+            found = self.backups.find(rel_path)
+            if not found:
+                raise CorruptDataError(f"{rel_path} is damaged and no backup has a valid copy ({e})") from e
+            path = self._path(rel_path)
+            note = {"file": path, "error": str(e), "moved_to": _move_aside(path), "backup": found[0]}
+            self.checksums.update(rel_path, found[1])
+            self.checksums.save()
+            _write_bytes_atomic(path, found[1])
+            self.recovered.append(note)
+            return found[2]
+
+    def load(self):
+        if not os.path.exists(self.manifest_path):
+            return {"games": [], "players": []}
+
+        try:
+            manifest = self._read_verified(MANIFEST_NAME)
+        except ValueError as e:
+            manifest = self._recover_manifest(e)
+        # Older manifests carry every top-level key themselves; side files are newer where both exist
+        data = {k: v for k, v in manifest.items() if k not in ("format", "format_version", "games")}
+        for name in list(SIDE_FILES) + [SETTINGS_NAME]:
+            if os.path.exists(self._path(name)):
+                part = self._read_recovering(name)
+                data.update(part)
+                self._parts[name] = copy.deepcopy(part)
+        data.setdefault("players", [])
+        data["games"] = []
+        for summary in manifest.get("games", []):
+            self._files[summary["id"]] = summary["file"]
+            data["games"].append(LazyGame(self, summary))
+
+        self._parts[MANIFEST_NAME] = copy.deepcopy(manifest) # LazyGame summaries change (compress_season)
+        return data
+
+    def _recover_manifest(self, error):
+        """
+        Restore the whole directory from the newest backup whose manifest is valid (shards
+        and manifest together, so they agree), or start with no games if there is none.
+        Shards are left in place either way; the damaged manifest is renamed aside.
+        """
+        found = self.backups.find(MANIFEST_NAME)
+        note = {"file": self.manifest_path, "error": str(error), "moved_to": _move_aside(self.manifest_path), "backup": None}
+        self.recovered.append(note)
+        if not found:
+            return {"games": []}
+        note["backup"] = found[0]
+        self.backups.extract(found[0], self.directory)
+        self.checksums = Checksums(self.checksums.path)
+        return found[2]
+
+    def _split(self, data):
+        """{file name: content} of the side files and the manifest (last, so it is written after them)."""
+        owner = {k: name for name, keys in SIDE_FILES.items() for k in keys}
+        parts = {name: {} for name in list(SIDE_FILES) + [SETTINGS_NAME]}
+        for k, v in data.items():
+            if k != "games":
+                parts[owner.get(k, SETTINGS_NAME)][k] = v
+        parts[MANIFEST_NAME] = self._build_manifest(data)
+        return parts
+
+    def _build_manifest(self, data):
+        manifest = {"format": "sharded", "format_version": SHARD_FORMAT_VERSION}
+        summaries = []
+        for g in data["games"]:
+            summary = dict(game_summary(g))
+            summary["file"] = self.shard_file(g)
+            summaries.append(summary)
+        manifest["games"] = summaries
+        return manifest
+
+    def _write_files(self, files):
+        """Write [(relative path, raw bytes)], recording their checksums first."""
+        if not files:
+            return
+        changed = False
+        for rel, raw in files:
+            changed = self.checksums.update(rel, raw) or changed
+        if changed:
+            self.checksums.save()
+        for rel, raw in files:
+            path = self._path(rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_bytes_atomic(path, raw)
+
+    def _encode_shard(self, g):
+        rel = self.shard_file(g)
+        return rel, _encode_json(dict(g), compress=rel.endswith(".gz"))
+
+    def write_shard(self, g):
+        self._write_files([self._encode_shard(g)])
+        self._files[g["id"]] = self.shard_file(g)
+
+    def save(self, data, games=None):
+        """Write the shards of `games` (loaded ones only), then the side files and manifest that changed."""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        written = []
+        for g in games or []:
+            if g is None or (isinstance(g, LazyGame) and not g.loaded):
+                continue
+            files.append(self._encode_shard(g))
+            written.append(g)
+
+        # Compared, not encoded: archive counters and sync state are only serialized when they change
+        parts = self._split(data)
+        changed = [name for name, part in parts.items() if self._parts.get(name) != part]
+        for name in changed:
+            files.append((name, _encode_json(parts[name], indent=1)))
+
+        if files and self.backups.due() and os.path.exists(self.manifest_path):
+            self.backup()
+        self._write_files(files)
+        for g in written:
+            self._files[g["id"]] = self.shard_file(g)
+        for name in changed:
+            self._parts[name] = copy.deepcopy(parts[name]) # `data` may be the live data, changed after this
+        if MANIFEST_NAME not in changed:
+            return
+
+        # Drop shards of deleted games
+        live_ids = set(s["id"] for s in parts[MANIFEST_NAME]["games"])
+        removed = False
+        for gid in [gid for gid in self._files if gid not in live_ids]:
+            rel = self._files.pop(gid)
+            removed = self.checksums.remove(rel) or removed
+            path = self._path(rel)
+            if os.path.exists(path):
+                os.remove(path)
+        if removed:
+            self.checksums.save()
+
+    def backup(self):
+        """
+        Zip the manifest, side files and every shard (not season archives) into the backups folder.
+        Files failing their checksum are left out, so a backup never replaces good data with bad.
+        """
+        files = {}
+        for root, dirs, names in os.walk(self.directory):
+            rel_root = os.path.relpath(root, self.directory).replace(os.sep, "/")
+            if rel_root == ".":
+                dirs[:] = [d for d in dirs if d != "archives"]
+                rel_root = ""
+            for name in names:
+                if name.endswith(".tmp") or ".corrupt-" in name:
+                    continue
+                rel = rel_root + "/" + name if rel_root else name
+                path = os.path.join(root, name)
+                if rel == CHECKSUMS_NAME or self.checksums.verify(rel, _read_bytes(path)):
+                    files[rel] = path
+        if MANIFEST_NAME not in files:
+            return None
+        return self.backups.create(files)
+
+    def compress_season(self, data, season):
+        """Gzip every shard of `season` in place; returns the number of shards compressed."""
+        count = 0
+        for g in data["games"]:
+            if g.get("season", "") != season:
+                continue
+            rel = self.shard_file(g)
+            if rel.endswith(".gz"):
+                continue
+            src = self._path(rel)
+            if not os.path.exists(src):
+                self.write_shard(g)
+            body = self._read_verified(rel)
+            self._write_files([(rel + ".gz", _encode_json(body, compress=True))])
+            self._files[g["id"]] = rel + ".gz"
+            if isinstance(g, LazyGame):
+                g.summary["file"] = rel + ".gz"
+            os.remove(src)
+            if self.checksums.remove(rel):
+                self.checksums.save()
+            count += 1
+        if count:
+            self.save(data)
+        return count
+
+    def base_dir(self):
+        return self.directory
+
+    def size_bytes(self):
+        total = 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                total += os.path.getsize(os.path.join(root, name))
+        return total
+
+
+def write_season_archive(path, season, games, aggregates):
+    """Write a gzip season archive (counters first, then full games) and mark it read-only."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+    archive = {
+        "format": "season_archive",
+        "format_version": ARCHIVE_FORMAT_VERSION,
+        "season": season,
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "aggregates": aggregates,
+        "games": games
+    }
+    _write_json_atomic(path, archive, compress=True)
+    os.chmod(path, stat.S_IREAD)
+
+
+def read_season_archive(path):
+    archive = _read_json(path)
+    for g in archive.get("games", []):
+        compact_pitches(g)
+    return archive
+
+
+def write_changeset(path, changeset):
+    """Write a sync changeset (gzip-compressed if `path` ends in .gz)."""
+    _write_json_atomic(path, changeset, compress=path.endswith(".gz"))
+
+
+def read_changeset(path):
+    changeset = _read_json(path)
+    for g in changeset.get("games", []):
+        compact_pitches(g)
+    return changeset
+
+
+def remove_season_archive(path):
+    if os.path.exists(path):
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+
+class BackgroundSaver:
+    """
+    Single worker thread that runs `save_fn(data, games)` off the UI thread.
+    Jobs submitted while a save is running are coalesced: only the newest data snapshot
+    is written, together with every game that was dirty in any of the merged jobs.
+    """
+
+    IDLE_TIMEOUT = 5 # seconds without jobs before the thread ends (submit starts a new one)
+
+    def __init__(self, save_fn):
+        self.save_fn = save_fn
+        self.error = None
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._thread = None
+
+    def submit(self, data, games):
+        with self._cond:
+            merged = dict(self._pending[1]) if self._pending else {}
+            for g in games:
+                merged[g["id"]] = g
+            self._pending = (data, merged)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="BackgroundSaver", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    if not self._cond.wait(timeout=self.IDLE_TIMEOUT):
+                        # Idle: let the thread end. Cleared under the lock, so a submit() from
+                        # here on starts a new thread instead of counting on this exiting one
+                        if self._pending is None:
+                            self._thread = None
+                            return
+                data, games = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                self.save_fn(data, list(games.values()))
+            except Exception as e:
+                self.error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def is_idle(self):
+        with self._cond:
+            return self._pending is None and not self._busy
+
+    def wait(self):
+        """Block until every submitted job has been written."""
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+
+
+def open_storage(path):
+    """
+    Pick a backend for `path`:
+    - a directory (or a path without extension) -> ShardedStorage
+    - `name.json` with a sibling `name/manifest.json` -> ShardedStorage in that directory
+    - otherwise -> JsonStorage
+    """
+    root, ext = os.path.splitext(path)
+    if os.path.isdir(path) or not ext:
+        return ShardedStorage(path)
+    if os.path.exists(os.path.join(root, MANIFEST_NAME)):
+        return ShardedStorage(root)
+    return JsonStorage(path)
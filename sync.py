@@ -0,0 +1,48 @@
+# Changeset sync between scoring machines.
+# Every game carries a version vector, game["versions"] = {session id: changes}: each app
+# session counts the saves it made to the game under its own random id. Comparing two vectors
+# tells whether one copy of a game already contains every change of the other, or whether
+# both were edited independently (a conflict). Session ids (not machine ids) are used so two
+# laptops that started from a copy of the same data file still count separately.
+
+import uuid
+
+CHANGESET_FORMAT_VERSION = 1
+
+EQUAL, NEWER, OLDER, CONCURRENT = "equal", "newer", "older", "concurrent"
+
+
+def new_session_id():
+    return uuid.uuid4().hex[:16]
+
+
+def bump(versions, session):
+    versions[session] = versions.get(session, 0) + 1
+
+
+def merged(a, b):
+    """Element-wise maximum: a vector that contains both histories."""
+    out = dict(a)
+    for k, n in b.items():
+        if n > out.get(k, 0):
+            out[k] = n
+    return out
+
+
+def compare(a, b):
+    """How version vector `a` relates to `b`: EQUAL, NEWER (a contains b), OLDER or CONCURRENT."""
+    a_ahead = any(n > b.get(k, 0) for k, n in a.items())
+    b_ahead = any(n > a.get(k, 0) for k, n in b.items())
+    if a_ahead and b_ahead:
+        return CONCURRENT
+    if a_ahead:
+        return NEWER
+    if b_ahead:
+        return OLDER
+    return EQUAL
+
+
+def same_content(a, b):
+    """True if two copies of a game differ only in their version vectors."""
+    keys = (set(a) | set(b)) - {"versions"}
+    return all(a.get(k) == b.get(k) for k in keys)
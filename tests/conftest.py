@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plate_discipline import PlateDisciplineCalculator
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    return str(tmp_path / "data.json")
+
+
+@pytest.fixture
+def calc(data_file):
+    c = PlateDisciplineCalculator(data_file)
+    yield c
+    c.close()
@@ -0,0 +1,22 @@
+def lineup(team):
+    return [f"{team}{i}" for i in range(1, 10)]
+
+
+def start_game(calc, home="Home", away="Away", season="2024", date=None):
+    """Start a game with lineups Home1..Home9 / Away1..Away9 and pitchers HomeP / AwayP."""
+    game = calc.start_new_game(home, away, lineup(home), lineup(away), f"{home}P", f"{away}P", season)
+    if date:
+        game["date"] = date
+        calc.save_data([game])
+    return game
+
+
+def pitch(calc, zone="In", result="Called Strike"):
+    """Log one pitch, marking it as a first pitch when the count is 0-0."""
+    s = calc.get_game_state()
+    calc.log_pitch(zone, result, s["balls"] == 0 and s["strikes"] == 0)
+
+
+def strikeout(calc):
+    for _ in range(3):
+        pitch(calc, "In", "Called Strike")
@@ -0,0 +1,67 @@
+import pytest
+
+from helpers import start_game, pitch, strikeout
+from plate_discipline import PlateDisciplineCalculator
+
+
+def record_season(calc, season):
+    start_game(calc, season=season)
+    strikeout(calc)
+    pitch(calc, "Out", "Ball")
+    pitch(calc, "In", "In Play (Safe)")
+
+
+@pytest.mark.parametrize("target", ["shards", "moved/data.json"])
+def test_converted_storage_keeps_archived_seasons(calc, tmp_path, target):
+    record_season(calc, "2023")
+    calc.archive_season("2023")
+    stats = calc.get_aggregate_stats("batter", "2023")
+    pitches = [p.to_dict() for p in calc.load_archived_games("2023")[0]["pitches"]]
+
+    path = tmp_path / target
+    path.parent.mkdir(exist_ok=True)
+    calc.convert_storage(str(path))
+    calc._archive_games.clear() # Read the copied file, not the one kept in memory
+    assert [p.to_dict() for p in calc.load_archived_games("2023")[0]["pitches"]] == pitches
+    out = str(tmp_path / "pitches.csv")
+    assert calc.export_pitches(out, season_filter="2023") == len(pitches)
+
+    reopened = PlateDisciplineCalculator(str(path))
+    assert reopened.get_aggregate_stats("batter", "2023", filters={"inning_from": 1}) == stats
+    reopened.close()
+
+
+def all_stats(calc):
+    return {role: calc.get_aggregate_stats(role) for role in ("batter", "pitcher")}, \
+        calc.get_aggregate_stats("batter", "2023"), calc.get_rollup_stats("team", season_filter="2023")
+
+
+def test_archive_and_restore_keep_stats_identical(calc):
+    record_season(calc, "2023")
+    record_season(calc, "2024")
+    before = all_stats(calc)
+    ids = sorted(g["id"] for g in calc.get_games("2023"))
+
+    calc.archive_season("2023")
+    assert calc.get_games("2023") == [] and all_stats(calc) == before
+    assert calc.unarchive_season("2023") == 1
+    assert sorted(g["id"] for g in calc.get_games("2023")) == ids
+    assert "2023" not in calc.data["archives"] and all_stats(calc) == before
+
+
+def test_compressed_season_reads_back_identically(calc, tmp_path):
+    record_season(calc, "2023")
+    record_season(calc, "2024")
+    path = str(tmp_path / "shards")
+    calc.convert_storage(path)
+    before = all_stats(calc)
+
+    assert calc.compress_season("2023") == 1
+    assert calc.compress_season("2023") == 0 # Already compressed
+    files = {g["season"]: calc.storage.shard_file(g) for g in calc.data["games"]}
+    assert files["2023"].endswith(".json.gz") and files["2024"].endswith(".json")
+    calc.close()
+
+    reopened = PlateDisciplineCalculator(path)
+    assert all_stats(reopened) == before
+    reopened.close()
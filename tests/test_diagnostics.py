@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+import diagnostics
+from diagnostics import Diagnostics, BUCKETS_MS
+
+
+@pytest.fixture
+def diag(monkeypatch):
+    """A fresh DIAGNOSTICS for @timed to record into."""
+    d = Diagnostics()
+    monkeypatch.setattr(diagnostics, "DIAGNOSTICS", d)
+    return d
+
+
+@pytest.mark.parametrize("ms, bucket", [
+    (0, 0), (0.999, 0), (1, 1), (4.9, 2), (10, 4), (999, 9), (1000, 10), (60000, 10)
+])
+def test_latencies_fall_into_their_buckets(ms, bucket):
+    d = Diagnostics()
+    d.record("f", ms / 1000)
+    expected = [0] * (len(BUCKETS_MS) + 1)
+    expected[bucket] = 1
+    assert d.timings["f"]["buckets"] == expected
+    assert len(d.bucket_labels()) == len(expected)
+    assert d.bucket_labels()[bucket] == (f"<{BUCKETS_MS[bucket]}ms" if bucket < len(BUCKETS_MS) else ">=1000ms")
+
+
+def test_summary_counts_calls_and_sorts_by_total():
+    d = Diagnostics()
+    for s in (0.001, 0.003, 0.002):
+        d.record("fast", s)
+    d.record("slow", 0.5)
+    slow, fast = d.get_summary()
+    assert slow["name"] == "slow" and slow["calls"] == 1
+    assert fast["calls"] == 3
+    assert fast["total_ms"] == pytest.approx(6.0)
+    assert fast["avg_ms"] == pytest.approx(2.0)
+    assert fast["max_ms"] == pytest.approx(3.0)
+    assert fast["buckets"][:4] == [0, 1, 2, 0]
+    d.reset()
+    assert d.get_summary() == []
+
+
+def test_timed_records_every_call_under_the_qualified_name(diag):
+    class Screen:
+        @diagnostics.timed
+        def refresh(self, fail=False):
+            if fail:
+                raise RuntimeError("refresh failed")
+            return "done"
+
+    assert Screen().refresh() == "done"
+    assert Screen.refresh.__name__ == "refresh"
+    with pytest.raises(RuntimeError):
+        Screen().refresh(fail=True) # Failed calls are timed too
+    name = "test_timed_records_every_call_under_the_qualified_name.<locals>.Screen.refresh"
+    assert list(diag.timings) == [name]
+    assert diag.timings[name]["calls"] == 2
+    assert sum(diag.timings[name]["buckets"]) == 2
+
+
+def test_dump_writes_the_summary(diag, tmp_path):
+    diag.record("f", 0.004)
+    path = tmp_path / "diag.json"
+    diag.dump(str(path), {"games": 3})
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["timings"] == diag.get_summary()
+    assert report["bucket_labels"] == diag.bucket_labels()
+    assert report["info"] == {"games": 3}
+    assert "profile" not in report
+
+
+def test_profiler_session(diag):
+    assert diag.stop_profiler() == ""
+    diag.start_profiler()
+    assert diag.is_profiling()
+    sum(range(1000))
+    text = diag.stop_profiler()
+    assert not diag.is_profiling() and "function calls" in text
@@ -0,0 +1,10 @@
+import pytest
+
+import differential
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_every_engine_matches_the_recount(seed):
+    diffs = differential.run(games=8, seed=seed, rounds=1, verbose=False)
+    assert diffs.checks > 0
+    assert diffs.items == []
@@ -0,0 +1,92 @@
+import pytest
+
+from helpers import start_game, pitch
+from plate_discipline import PlateDisciplineCalculator
+
+# The first batter walks, the second strikes out looking, the home pitcher is replaced,
+# then the third batter fouls off a pitch and puts the ball in play
+SCRIPT = [
+    ("Out", "Ball"), ("Out", "Ball"), ("In", "Called Strike"), ("Out", "Ball"), ("Out", "Ball"),
+    ("In", "Called Strike"), ("In", "Called Strike"), ("In", "Swinging Strike"),
+    "HomeR",
+    ("In", "Foul"), ("In", "In Play (Out)"),
+]
+PITCH_AT = [i for i, step in enumerate(SCRIPT) if not isinstance(step, str)] # script position of each pitch
+
+
+def play(calc, script):
+    game = start_game(calc)
+    for step in script:
+        if isinstance(step, str):
+            calc.change_pitcher(step)
+        else:
+            pitch(calc, *step)
+    return game
+
+
+def recorded(game):
+    """What an edit must reproduce: pitch records, stored state, lineups and event positions."""
+    return ([p.to_dict() for p in game["pitches"]], game["state"],
+            {side: (t["pitcher"], t["lineup"]) for side, t in game["teams"].items()},
+            [(ev["type"], ev["at"]) for ev in game["events"]])
+
+
+def same_as_recorded(game, script, tmp_path):
+    (tmp_path / "direct").mkdir(exist_ok=True)
+    direct = PlateDisciplineCalculator(str(tmp_path / "direct" / "data.json"))
+    expected = recorded(play(direct, script))
+    direct.close()
+    return recorded(game) == expected
+
+
+@pytest.mark.parametrize("k", [0, 3, 7, 8, 9, len(PITCH_AT)])
+def test_insert_matches_a_game_recorded_that_way(calc, tmp_path, k):
+    game = play(calc, SCRIPT)
+    calc.insert_pitch(k, "In", "Called Strike")
+    edited = list(SCRIPT)
+    edited.insert(PITCH_AT[k] if k < len(PITCH_AT) else len(SCRIPT), ("In", "Called Strike"))
+    assert same_as_recorded(game, edited, tmp_path)
+
+
+@pytest.mark.parametrize("k", [0, 2, 7, 8])
+def test_delete_matches_a_game_recorded_that_way(calc, tmp_path, k):
+    game = play(calc, SCRIPT)
+    calc.delete_pitch(k)
+    edited = list(SCRIPT)
+    del edited[PITCH_AT[k]]
+    assert same_as_recorded(game, edited, tmp_path)
+
+
+def test_edit_resyncs_the_count_and_outs_after_it(calc, tmp_path):
+    game = play(calc, SCRIPT)
+    # Ball four becomes a strike: the first batter now strikes out on the next pitch,
+    # so everything after belongs to the next batters
+    calc.edit_pitch(4, result="Called Strike")
+    assert game["pitches"][5]["batter"] == "Away1" and game["pitches"][6]["batter"] == "Away2"
+    edited = list(SCRIPT)
+    edited[4] = ("Out", "Called Strike")
+    assert same_as_recorded(game, edited, tmp_path)
+
+
+def test_unknown_zone_or_result_is_rejected(calc):
+    game = play(calc, SCRIPT)
+    before = recorded(game)
+    with pytest.raises(ValueError):
+        calc.edit_pitch(0, zone="Middle")
+    with pytest.raises(ValueError):
+        calc.edit_pitch(0, result="Balk")
+    with pytest.raises(ValueError):
+        calc.insert_pitch(0, "In", "Strike")
+    with pytest.raises(ValueError):
+        calc.insert_pitch(0, None, "Ball")
+    with pytest.raises(IndexError):
+        calc.delete_pitch(len(game["pitches"]))
+    assert recorded(game) == before
+
+
+def test_undo_reverts_an_edit(calc):
+    game = play(calc, SCRIPT)
+    before = recorded(game)
+    calc.delete_pitch(0)
+    assert calc.undo()
+    assert recorded(game) == before
@@ -0,0 +1,68 @@
+import csv
+import json
+
+import pytest
+
+from helpers import start_game, pitch, strikeout
+
+
+@pytest.fixture
+def games(calc):
+    """Three games: 2023 Home-Away (archived), 2024 Home-Away and 2024 村田-Others."""
+    for home, away, season in (("Home", "Away", "2023"), ("Home", "Away", "2024"), ("村田", "Others", "2024")):
+        start_game(calc, home, away, season, date=f"{season}-05-01")
+        strikeout(calc)
+        pitch(calc, "Out", "Ball")
+    calc.archive_season("2023")
+    return calc
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_csv_and_jsonl_hold_the_same_rows(games, tmp_path):
+    csv_path, jsonl_path = str(tmp_path / "p.csv"), str(tmp_path / "p.jsonl")
+    assert games.export_pitches(csv_path) == games.export_pitches(jsonl_path, "jsonl") == 12
+
+    rows = read_jsonl(jsonl_path)
+    assert list(rows[0]) == games.PITCH_EXPORT_FIELDS
+    assert rows == list(games.iter_pitch_rows())
+    # CSV keeps the same columns and values, as text
+    assert read_csv(csv_path) == [{k: str(v) for k, v in row.items()} for row in rows]
+    assert rows[0]["batter"] == "Away1" and rows[0]["batting_team"] == "Away" and rows[0]["pitching_team"] == "Home"
+    assert rows[3] == dict(rows[3], balls_before=0, strikes_before=0, batter="Away2", is_first_pitch=True)
+
+
+def test_filters_by_season_team_and_player(games, tmp_path):
+    rows = list(games.iter_pitch_rows())
+    by = lambda **f: list(games.iter_pitch_rows(**f))
+    assert by(season_filter="2024") == [r for r in rows if r["season"] == "2024"]
+    assert by(team_filter="村田") == [r for r in rows if "村田" in (r["home_team"], r["away_team"])]
+    assert by(player_filter="Away2") == [r for r in rows if "Away2" in (r["batter"], r["pitcher"])]
+    assert by(season_filter="2024", team_filter="Home", player_filter="HomeP") == \
+        [r for r in rows if r["season"] == "2024" and r["home_team"] == "Home"]
+    assert by(season_filter="1999") == []
+
+    path = str(tmp_path / "p.csv")
+    assert games.export_pitches(path, season_filter="2024", team_filter="Away") == 4
+    assert {r["season"] for r in read_csv(path)} == {"2024"}
+
+
+def test_archived_seasons_are_exported(games, tmp_path):
+    archived = list(games.iter_pitch_rows(season_filter="2023"))
+    assert len(archived) == 4 and {r["home_team"] for r in archived} == {"Home"}
+    path = str(tmp_path / "p.jsonl")
+    assert games.export_pitches(path, "jsonl", team_filter="Away") == 8
+    assert [r["season"] for r in read_jsonl(path)] == ["2024"] * 4 + ["2023"] * 4 # Live games first
+
+
+def test_unknown_format_is_rejected(games, tmp_path):
+    with pytest.raises(ValueError):
+        games.export_pitches(str(tmp_path / "p.xml"), "xml")
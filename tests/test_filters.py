@@ -0,0 +1,57 @@
+from helpers import start_game, pitch
+
+
+def relieved_before_first_pitch(calc):
+    """A game whose home starter was replaced before throwing a pitch."""
+    start_game(calc)
+    calc.change_pitcher("Relief")
+    for _ in range(4):
+        pitch(calc, "Out", "Ball")
+    calc.close_game()
+    calc.flush()
+
+
+def test_pitcher_role_on_sharded_storage(calc, tmp_path):
+    relieved_before_first_pitch(calc)
+    reliever = {"pitcher_role": "reliever"}
+    assert sorted(calc.get_aggregate_stats("pitcher", None, reliever)) == ["Relief"]
+
+    calc.convert_storage(str(tmp_path / "shards"))
+    calc.close()
+
+    from plate_discipline import PlateDisciplineCalculator
+    sharded = PlateDisciplineCalculator(str(tmp_path / "shards"))
+    try:
+        # The shards are not loaded yet: the starter must still come from the game's start
+        assert sorted(sharded.get_aggregate_stats("pitcher", None, reliever)) == ["Relief"]
+        assert sharded.get_aggregate_stats("pitcher", None, {"pitcher_role": "starter"}) == {}
+    finally:
+        sharded.close()
+
+
+def test_filters_by_side_and_inning(calc):
+    start_game(calc)
+    pitch(calc, "In", "Swinging Strike")
+    calc.close_game()
+    batters = calc.get_aggregate_stats("batter", None, {"home_away": "away", "inning_from": 1, "inning_to": 1})
+    assert list(batters) == ["Away1"]
+    assert calc.get_aggregate_stats("batter", None, {"home_away": "home"}) == {}
+    assert calc.get_aggregate_stats("batter", None, {"inning_from": 2}) == {}
+
+
+def test_merge_renames_filtered_stats_of_archived_seasons(calc):
+    start_game(calc, season="2024")
+    pitch(calc, "In", "Foul")
+    calc.close_game()
+    start_game(calc, season="2025")
+    pitch(calc, "In", "Foul")
+    calc.close_game()
+    calc.archive_season("2024")
+    # Warm the caches built from the archived games
+    assert "Away1" in calc.get_aggregate_stats("batter", None, {"home_away": "away"})
+
+    calc.merge_players({"Away1": "Merged"})
+    for filters in (None, {"home_away": "away"}, {"season": "2024", "inning_from": 1}):
+        stats = calc.get_aggregate_stats("batter", None, filters)
+        assert "Away1" not in stats
+        assert stats["Merged"]["Pitches"] == (1 if filters and filters.get("season") else 2)
@@ -0,0 +1,59 @@
+import copy
+
+import integrity
+from helpers import start_game, pitch, strikeout
+
+
+def messages(problems):
+    return [(p["pitch"], p["message"]) for p in problems]
+
+
+def test_recorded_games_are_clean(calc):
+    start_game(calc)
+    strikeout(calc)
+    pitch(calc, "Out", "Ball")
+    pitch(calc, "In", "In Play (Safe)")
+    assert calc.check_integrity() == []
+
+
+def test_pitch_fields_and_state_are_checked_against_a_replay(calc):
+    game = start_game(calc)
+    strikeout(calc)
+    pitch(calc, "Out", "Ball")
+    game["pitches"][1]["balls_before"] = 2
+    game["pitches"][2]["zone"] = "Middle"
+    game["state"]["outs"] = 2
+    calc.save_data([game])
+
+    found = messages(calc.check_integrity())
+    assert (1, "Recorded balls_before=2 but the replay gives balls_before=0") in found
+    assert (2, "Unknown zone 'Middle'") in found
+    assert any(i is None and msg.startswith("Stored state outs=2") for i, msg in found)
+
+
+def test_cross_game_checks(calc):
+    game = start_game(calc)
+    calc.data["games"].append(copy.deepcopy(game))
+    calc.data["players"].remove("Home3")
+    calc.data["player_aliases"] = {"Old": "Gone"}
+    found = [p["message"] for p in calc.check_integrity()]
+    assert "Game id used 2 times" in found
+    assert "Player 'Home3' is not in the player list" in found
+    assert "Alias 'Old' points to unknown player 'Gone'" in found
+
+
+def test_only_changed_games_are_rechecked(calc, monkeypatch):
+    first = start_game(calc)
+    strikeout(calc)
+    start_game(calc, "Second", "Foes")
+    checked = []
+    check_game = integrity.check_game
+    monkeypatch.setattr(integrity, "check_game", lambda g: checked.append(g["id"]) or check_game(g))
+
+    calc.check_integrity()
+    assert len(checked) == 2
+    pitch(calc)
+    calc.check_integrity()
+    assert checked[2:] == [calc.current_game["id"]]
+    calc.check_integrity()
+    assert len(checked) == 3 and first["id"] in checked
@@ -0,0 +1,78 @@
+import pytest
+
+from helpers import start_game, pitch
+
+
+def use_counters(calc, monkeypatch, by_player):
+    """Make the stats see {player: {counter: n}} (unset counters are 0)."""
+    counters = {}
+    for name, values in by_player.items():
+        counters[name] = dict.fromkeys(calc.COUNTER_KEYS, 0)
+        counters[name].update(values)
+    monkeypatch.setattr(calc, "_aggregate_counters", lambda role, season=None, filters=None: counters)
+
+
+def test_wilson_bounds_match_reference_values(calc, monkeypatch):
+    # Reference Wilson score intervals (z = 1.96): 5/10 -> 23.66-76.34%, 0/10 -> 0-27.75%, 10/10 -> 72.25-100%
+    use_counters(calc, monkeypatch, {
+        "Half": {"Swing": 5, "Pitches": 10},
+        "None": {"Swing": 0, "Pitches": 10},
+        "All": {"Swing": 10, "Pitches": 10},
+        "Unseen": {}
+    })
+    iv = calc.get_interval_stats("batter")
+    for name, low, high in (("Half", 23.66, 76.34), ("None", 0.0, 27.75), ("All", 72.25, 100.0)):
+        assert iv["low"][name]["Swing%"] == pytest.approx(low, abs=0.005)
+        assert iv["high"][name]["Swing%"] == pytest.approx(high, abs=0.005)
+    assert iv["low"]["Unseen"]["Swing%"] is None and iv["high"]["Unseen"]["Swing%"] is None
+    # A wider z widens the interval
+    assert calc.get_interval_stats("batter", z=2.58)["low"]["Half"]["Swing%"] < iv["low"]["Half"]["Swing%"]
+
+
+def test_prior_by_the_method_of_moments(calc, monkeypatch):
+    use_counters(calc, monkeypatch, {
+        "A": {"Swing": 10, "Pitches": 100},
+        "B": {"Swing": 50, "Pitches": 100},
+        "C": {"Swing": 90, "Pitches": 100}
+    })
+    iv = calc.get_interval_stats("batter")
+    # m = 0.5; observed variance of 0.1 / 0.5 / 0.9 = 0.16; binomial noise 0.25 / 100
+    strength = 0.25 / (0.16 - 0.0025) - 1
+    a, b = iv["prior"]["Swing%"]
+    assert a == pytest.approx(0.5 * strength) and b == pytest.approx(0.5 * strength)
+    assert iv["shrunk"]["A"]["Swing%"] == pytest.approx((10 + a) / (100 + a + b) * 100)
+    assert 10 < iv["shrunk"]["A"]["Swing%"] < 50 < iv["shrunk"]["C"]["Swing%"] < 90
+
+
+@pytest.mark.parametrize("by_player, expected", [
+    # m = 0: every player 0 of n; the prior holds everyone at 0
+    ({"A": {"Pitches": 10}, "B": {"Pitches": 30}}, (0.0, 1000.0)),
+    # A single player: no spread to measure, so the prior is the capped strength at its rate
+    ({"A": {"Swing": 3, "Pitches": 10}}, (300.0, 700.0)),
+    # Players vary less than chance would: capped strength
+    ({"A": {"Swing": 5, "Pitches": 10}, "B": {"Swing": 5, "Pitches": 10}}, (500.0, 500.0)),
+    # No pitches at all
+    ({"A": {}, "B": {}}, (0.0, 0.0)),
+])
+def test_prior_with_degenerate_input(calc, monkeypatch, by_player, expected):
+    use_counters(calc, monkeypatch, by_player)
+    iv = calc.get_interval_stats("pitcher")
+    assert iv["prior"]["Swing%"] == pytest.approx(expected)
+    for name, values in by_player.items():
+        shrunk = iv["shrunk"][name]["Swing%"]
+        if expected == (0.0, 0.0):
+            assert shrunk is None
+        else:
+            a, b = expected
+            assert shrunk == pytest.approx((values.get("Swing", 0) + a) / (values.get("Pitches", 0) + a + b) * 100)
+
+
+def test_recorded_games_and_unknown_role(calc):
+    start_game(calc)
+    for _ in range(3):
+        pitch(calc, "In", "Swinging Strike")
+    iv = calc.get_interval_stats("batter", "2024")
+    assert iv["low"]["Away1"]["Whiff%"] == pytest.approx(43.85, abs=0.01) # Wilson 3/3
+    assert iv["high"]["Away1"]["Whiff%"] == 100.0
+    with pytest.raises(ValueError):
+        calc.get_interval_stats("fielder")
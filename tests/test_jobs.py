@@ -0,0 +1,181 @@
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+from jobs import JobRunner, JobCancelled
+from plate_discipline import PlateDisciplineCalculator
+from helpers import start_game, pitch
+
+
+class ManualSchedule:
+    """Stands in for Tk's root.after: callbacks run when run_pending() is called."""
+
+    def __init__(self):
+        self.pending = []
+
+    def __call__(self, ms, fn):
+        self.pending.append(fn)
+
+    def run_until(self, condition, timeout=10):
+        end = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < end, "job did not finish"
+            time.sleep(0.005)
+            pending, self.pending = self.pending, []
+            for fn in pending:
+                fn()
+
+
+def test_newer_job_supersedes_older_one():
+    schedule = ManualSchedule()
+    runner = JobRunner(schedule)
+    started = threading.Event()
+    results = []
+
+    def slow(job):
+        started.set()
+        while True:
+            job.check()
+            time.sleep(0.001)
+
+    runner.submit(slow, results.append)
+    started.wait(5)
+    runner.submit(lambda job: "second", results.append)
+    schedule.run_until(lambda: results)
+    assert results == ["second"]
+
+
+def test_cancelled_progress_raises():
+    runner = JobRunner(ManualSchedule())
+    job = runner.submit(lambda job: None, lambda r: None)
+    job.cancel()
+    try:
+        job.progress(1, 2)
+    except JobCancelled:
+        pass
+    else:
+        raise AssertionError("progress() should raise once cancelled")
+
+
+def stats_of(calc):
+    out = {}
+    for role in ("batter", "pitcher"):
+        out[role] = calc.get_aggregate_stats(role)
+        out[role, "away"] = calc.get_aggregate_stats(role, None, {"home_away": "away", "pitcher_role": "starter"})
+        out[role, "seq"] = calc.get_transition_stats(role)
+        out[role, "team"] = calc.get_rollup_stats("team", role)
+    return out
+
+
+@pytest.fixture
+def fast_switching():
+    """Switch threads very often, so the worker gets interrupted inside its loops."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_stats_on_worker_while_games_change(calc, data_file, fast_switching):
+    rng = random.Random(7)
+    for season in ("2024", "2025"):
+        start_game(calc, season=season)
+        for _ in range(60):
+            pitch(calc, rng.choice(("In", "Out")), rng.choice(("Ball", "Foul", "Swinging Strike")))
+        calc.close_game()
+
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                calc.warm_stats()
+                calc.warm_stats(None, {"home_away": "home", "inning_from": 2})
+                stats_of(calc)
+            except Exception as e: # any error here is the bug under test
+                errors.append(e)
+                return
+
+    worker = threading.Thread(target=reader)
+    worker.start()
+    try:
+        game = start_game(calc, season="2025")
+        for i in range(150):
+            x = rng.random()
+            if x < 0.1 and game["pitches"]:
+                calc.edit_pitch(rng.randrange(len(game["pitches"])), zone="In", result="Foul", game_id=game["id"])
+            elif x < 0.12:
+                calc.merge_players({f"Away{rng.randint(1, 9)}": "Merged"})
+            elif x < 0.14:
+                game = start_game(calc, season="2025", home=f"Team{i}")
+            else:
+                pitch(calc, rng.choice(("In", "Out")), rng.choice(("Ball", "Foul", "In Play (Out)")))
+            if i == 75:
+                calc.close_game(game["id"])
+                calc.archive_season("2024")
+                game = start_game(calc, season="2025", home="Late")
+    finally:
+        stop.set()
+        worker.join(30)
+    assert not errors, errors
+
+    # Nothing the worker cached from data that changed under it may be served now
+    calc.flush()
+    fresh = PlateDisciplineCalculator(data_file)
+    try:
+        assert stats_of(calc) == stats_of(fresh)
+    finally:
+        fresh.close()
+
+
+# The UI thread acting in the middle of a worker's computation, made deterministic by
+# running the UI action from a hook the computation calls.
+
+def test_merge_during_archive_load_does_not_poison_rollups(calc):
+    start_game(calc, season="2024")
+    pitch(calc)
+    calc.close_game()
+    calc.archive_season("2024")
+
+    load = calc.load_archived_games
+    def load_then_merge(season):
+        games = load(season) # read under the old names...
+        calc.load_archived_games = load
+        calc.merge_players({"Away1": "Merged"}) # ...then the UI thread merges
+        return games
+    calc.load_archived_games = load_then_merge
+
+    calc.get_rollup_stats("player", "batter", "2024")
+    players = {player for (_season, _team, player) in calc.get_rollup_stats("player", "batter", "2024")}
+    assert "Merged" in players and "Away1" not in players
+
+
+def test_pitch_edit_leaves_counters_a_reader_holds_untouched(calc):
+    start_game(calc)
+    for _ in range(3):
+        pitch(calc, "Out", "Ball")
+    held = calc._live_rollup_counters("2024")
+    before = {role: {k: dict(c) for k, c in by_key.items()} for role, by_key in held.items()}
+
+    calc.edit_pitch(0, zone="In", result="Swinging Strike")
+    assert held == before
+    assert calc.get_aggregate_stats("batter")["Away1"]["Swing%"] > 0
+
+
+def test_game_started_while_sequences_are_built(calc):
+    start_game(calc)
+    pitch(calc)
+    calc.close_game()
+
+    def ui_starts_a_game():
+        if len(calc.get_games("2024")) < 3:
+            start_game(calc, home="Other")
+            calc.close_game()
+
+    calc._season_sequences("2024", step=ui_starts_a_game)
+    (row,) = calc.get_sequence_frequencies("batter", "Away1", "2024", n=1)
+    assert row["count"] == 1
@@ -0,0 +1,69 @@
+import pytest
+
+import metrics
+from helpers import start_game, pitch
+
+
+def test_validate_rejects_bad_definitions():
+    with pytest.raises(ValueError, match="numerator"):
+        metrics.validate([{"name": "X"}])
+    with pytest.raises(ValueError, match="defined twice"):
+        metrics.validate([{"name": "X", "numerator": {}}, {"name": "X", "numerator": {}}])
+    with pytest.raises(ValueError, match="unknown condition"):
+        metrics.validate([{"name": "X", "numerator": {"speed": 150}}])
+    with pytest.raises(ValueError, match="strikes"):
+        metrics.validate([{"name": "X", "numerator": {"strikes": 3}}])
+
+
+@pytest.mark.parametrize("bound", [{"inning_from": 11}, {"inning_to": 12}, {"inning_from": 0}, {"inning_to": True}])
+def test_inning_bounds_stay_within_the_inning_classes(bound):
+    with pytest.raises(ValueError, match="1-10"):
+        metrics.validate([{"name": "X", "numerator": bound}])
+
+
+def test_last_inning_class_covers_every_extra_inning():
+    compiled = metrics.CompiledMetrics([
+        {"name": "Extra", "numerator": {"inning_from": 10}},
+        {"name": "Regular", "numerator": {"inning_to": 9}},
+        {"name": "All", "numerator": {"inning_to": 10}}
+    ])
+    # The 10th and 12th innings share a class
+    assert metrics.pitch_class("In", "Ball", 0, 0, 12) == metrics.pitch_class("In", "Ball", 0, 0, 10)
+    counts = {metrics.pitch_class("In", "Ball", 0, 0, 9): 1, metrics.pitch_class("In", "Ball", 0, 0, 12): 2}
+    values = compiled.evaluate(counts)
+    assert values == {"Extra": pytest.approx(200 / 3), "Regular": pytest.approx(100 / 3), "All": pytest.approx(100.0)}
+
+
+def test_compiled_metrics_only_count_numerator_inside_denominator():
+    compiled = metrics.CompiledMetrics([
+        {"name": "O-Swing%", "denominator": {"zone": "Out"}, "numerator": {"swing": True}},
+        {"name": "Pitches", "numerator": {}, "percent": False}
+    ])
+    counts = {
+        metrics.pitch_class("Out", "Foul", 0, 0, 1): 1,
+        metrics.pitch_class("Out", "Ball", 1, 0, 1): 3,
+        metrics.pitch_class("In", "Foul", 0, 0, 1): 4
+    }
+    values = compiled.evaluate(counts)
+    assert values["O-Swing%"] == pytest.approx(25.0)
+    assert values["Pitches"] == 1.0
+    assert compiled.evaluate({}) == {"O-Swing%": None, "Pitches": None}
+
+
+def test_custom_stats_follow_pitcher_role_on_sharded_storage(calc, tmp_path):
+    calc.set_custom_metrics([{"name": "Zone%", "numerator": {"zone": "In"}}])
+    start_game(calc)
+    calc.change_pitcher("Relief")
+    pitch(calc, "In", "Ball")
+    pitch(calc, "Out", "Ball")
+    calc.close_game()
+    calc.convert_storage(str(tmp_path / "shards"))
+    calc.close()
+
+    from plate_discipline import PlateDisciplineCalculator
+    sharded = PlateDisciplineCalculator(str(tmp_path / "shards"))
+    try:
+        stats = sharded.get_custom_stats("pitcher", None, {"pitcher_role": "reliever"})
+        assert stats == {"Relief": {"Zone%": pytest.approx(50.0)}}
+    finally:
+        sharded.close()
@@ -0,0 +1,65 @@
+import json
+import os
+
+import migrations
+from helpers import start_game, pitch, strikeout
+from plate_discipline import PlateDisciplineCalculator
+
+DERIVED = ("balls_before", "strikes_before", "is_first_pitch", "inning", "is_top", "lineup_slot")
+
+
+def record_games(calc):
+    start_game(calc)
+    strikeout(calc)
+    pitch(calc, "Out", "Ball")
+    pitch(calc, "In", "In Play (Out)")
+    pitch(calc, "Out", "Ball")
+    calc.close()
+    with open(calc.data_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_old_file(path, data):
+    """Write `data` as a pre-schema_version file: no version, pitches without the derived fields."""
+    data = json.loads(json.dumps(data))
+    data.pop("schema_version", None)
+    for g in data["games"]:
+        for p in g["pitches"]:
+            for f in DERIVED:
+                p.pop(f, None)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_old_data_is_upgraded_once_and_saved(calc, tmp_path):
+    current = record_games(calc)
+    path = str(tmp_path / "old" / "data.json")
+    os.makedirs(os.path.dirname(path))
+    write_old_file(path, current)
+
+    upgraded = PlateDisciplineCalculator(path)
+    assert upgraded.data["schema_version"] == migrations.SCHEMA_VERSION
+    assert [p.to_dict() for p in upgraded.data["games"][0]["pitches"]] == current["games"][0]["pitches"]
+    upgraded.close()
+
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["schema_version"] == migrations.SCHEMA_VERSION
+    assert saved["games"][0]["pitches"] == current["games"][0]["pitches"]
+    assert not migrations.needs_migration(saved)
+
+
+def test_migrate_game_only_runs_later_steps(calc):
+    game = record_games(calc)["games"][0]
+    for p in game["pitches"]:
+        p.pop("lineup_slot")
+    assert migrations.migrate_game(game, migrations.SCHEMA_VERSION) == 0
+    assert all("lineup_slot" not in p for p in game["pitches"])
+    assert migrations.migrate_game(game, 0) == len(game["pitches"])
+
+
+def test_migration_keeps_recorded_values(calc):
+    game = record_games(calc)["games"][0]
+    game["pitches"][0]["inning"] = 7
+    migrations.migrate_game(game, 0)
+    assert game["pitches"][0]["inning"] == 7
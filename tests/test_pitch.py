@@ -0,0 +1,88 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from helpers import start_game, pitch, strikeout
+from pitch import Pitch, FIELDS, compact_pitches, to_json
+from plate_discipline import PlateDisciplineCalculator
+
+RECORD = {
+    "batter": "Away1", "pitcher": "HomeP", "zone": "Out", "result": "Ball", "is_first_pitch": True,
+    "inning": 1, "is_top": True, "balls_before": 0, "strikes_before": 0, "lineup_slot": 1
+}
+
+
+def test_round_trip_keeps_fields_order_and_extra_keys():
+    d = dict(RECORD, note="check swing", speed=141)
+    p = Pitch.from_dict(d)
+    assert p.to_dict() == d and list(p.to_dict()) == list(d)
+    assert p.extra == {"note": "check swing", "speed": 141}
+    assert Pitch.from_dict(p) is p
+    assert p == d and p == Pitch(d) and p != dict(d, speed=140)
+
+
+def test_missing_fields_stay_unset():
+    p = Pitch({"batter": "Away1", "zone": "In", "result": "Foul"})
+    assert "balls_before" not in p and p.get("balls_before", 0) == 0
+    with pytest.raises(KeyError):
+        p["inning"]
+    assert list(p) == ["batter", "zone", "result"] and len(p) == 3
+    assert p.to_dict() == {"batter": "Away1", "zone": "In", "result": "Foul"}
+
+    p["inning"] = 2
+    del p["zone"]
+    p["note"] = "x"
+    del p["note"]
+    assert p.to_dict() == {"batter": "Away1", "result": "Foul", "inning": 2}
+    with pytest.raises(KeyError):
+        del p["zone"]
+
+
+def test_strings_are_interned():
+    # json.loads makes a fresh string for every value
+    a, b = json.loads(json.dumps([RECORD, RECORD]))
+    assert a["batter"] is not b["batter"]
+    assert Pitch(a)["batter"] is Pitch(b)["batter"]
+    p = Pitch()
+    p["result"] = "".join(["Called", " Strike"])
+    assert p["result"] is Pitch(RECORD | {"result": "Called Strike"})["result"]
+
+
+def test_serializes_like_the_dict_it_replaces():
+    d = dict(RECORD, note="見逃し")
+    game = compact_pitches({"pitches": [dict(d), dict(RECORD)]})
+    assert all(isinstance(p, Pitch) for p in game["pitches"])
+    assert json.dumps(game, default=to_json, ensure_ascii=False) == \
+        json.dumps({"pitches": [d, RECORD]}, ensure_ascii=False)
+    with pytest.raises(TypeError):
+        json.dumps({1, 2}, default=to_json)
+
+
+def test_copies_are_independent():
+    p = Pitch(RECORD, note="x")
+    for c in (p.copy(), copy.copy(p), copy.deepcopy(p), pickle.loads(pickle.dumps(p))):
+        assert c == p and c is not p
+        c["balls_before"] = 3
+        c["note"] = "y"
+        assert p["balls_before"] == 0 and p["note"] == "x"
+
+
+def test_saved_games_load_back_as_pitch_records(calc, data_file):
+    game_id = start_game(calc)["id"]
+    strikeout(calc)
+    pitch(calc, "Out", "Ball")
+    recorded = [p.to_dict() for p in calc.current_game["pitches"]]
+    assert set(recorded[0]) == set(FIELDS)
+    calc.close()
+
+    with open(data_file, encoding="utf-8") as f:
+        assert json.load(f)["games"][0]["pitches"] == recorded
+    reopened = PlateDisciplineCalculator(data_file)
+    try:
+        pitches = reopened.get_game(game_id)["pitches"]
+        assert all(isinstance(p, Pitch) for p in pitches)
+        assert [p.to_dict() for p in pitches] == recorded
+    finally:
+        reopened.close()
@@ -0,0 +1,56 @@
+from helpers import start_game
+from players import PlayerIndex, name_key, normalize_name, search_key
+
+
+def test_spellings_fold_to_one_key():
+    assert name_key("石川 昂弥") == name_key("石川　昂弥") == name_key("石川昂弥")
+    assert normalize_name("  Ｏｋａｍｏｔｏ   Kazuma ") == "Okamoto Kazuma"
+    assert search_key("イシカワ") == search_key("いしかわ")
+
+
+def test_resolve_uses_registered_spelling_and_aliases():
+    index = PlayerIndex(["石川 昂弥", "Okamoto"])
+    assert index.resolve("石川昂弥") == "石川 昂弥"
+    assert index.resolve("okamoto") == "Okamoto"
+    assert index.resolve("  New  Guy ") == "New Guy"
+
+    index.add_alias("Okamoto K", "Okamoto")
+    index.add_alias("Okamoto", "岡本 和真") # Earlier aliases follow the merge
+    assert index.resolve("Okamoto K") == index.resolve("okamoto") == "岡本 和真"
+
+
+def test_complete_matches_any_word_and_reading():
+    index = PlayerIndex(["石川 昂弥", "石橋 康太", "細川 成也"])
+    index.set_reading("石川 昂弥", "いしかわ たかや")
+    assert index.complete("石") == ["石川 昂弥", "石橋 康太"]
+    assert index.complete("成也") == ["細川 成也"]
+    assert index.complete("イシカ") == ["石川 昂弥"] # Katakana finds a hiragana reading
+    assert index.complete("x") == []
+
+
+def test_complete_sees_players_added_after_the_first_search():
+    index = PlayerIndex(["Abe"])
+    assert index.complete("a") == ["Abe"]
+    index.add("Aoki")
+    index.add_alias("A-ron", "Abe")
+    assert index.complete("a") == ["Abe", "Aoki"]
+    assert index.complete("a-r") == ["Abe"]
+
+
+def test_complete_ranks_by_team_then_recency():
+    index = PlayerIndex(["Sato", "Saito", "Sasaki"])
+    index.touch("Sato", "2024-04-01", "Tigers")
+    index.touch("Saito", "2024-05-01", "Giants")
+    index.touch("Sasaki", "2024-03-01", "Giants")
+    assert index.complete("sa") == ["Saito", "Sato", "Sasaki"]
+    assert index.complete("sa", team="Giants") == ["Saito", "Sasaki", "Sato"]
+    assert index.complete("sa", limit=1) == ["Saito"]
+    index.touch("Saito", "2024-01-01", "Tigers") # An older appearance does not count
+    assert index.recent["Saito"]["team"] == "Giants"
+
+
+def test_calculator_completes_from_recorded_lineups(calc):
+    start_game(calc, "Home", "Away", date="2024-05-01")
+    assert calc.complete_players("home", team="Home", limit=3) == ["Home1", "Home2", "Home3"]
+    calc.set_player_reading("Home1", "ほーむわん")
+    assert calc.complete_players("ホームワ") == ["Home1"]
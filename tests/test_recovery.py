@@ -0,0 +1,105 @@
+import glob
+import os
+import shutil
+
+import pytest
+
+from helpers import start_game, pitch, strikeout
+from plate_discipline import PlateDisciplineCalculator
+from storage import CorruptDataError
+
+
+def record(calc):
+    game = start_game(calc)
+    strikeout(calc)
+    return game["id"]
+
+
+def damage(path, raw=b'{"games": [], "players": ["Intruder"]}'):
+    """Overwrite a file behind the storage's back (valid JSON by default, so only the checksum catches it)."""
+    with open(path, "wb") as f:
+        f.write(raw)
+
+
+@pytest.mark.parametrize("raw", [b'{"games": [', b'{"games": [], "players": ["Intruder"]}'])
+def test_damaged_json_file_is_restored_from_backup(calc, data_file, raw):
+    gid = record(calc)
+    assert calc.create_backup()
+    damage(data_file, raw)
+
+    restored = PlateDisciplineCalculator(data_file)
+    assert [g["id"] for g in restored.data["games"]] == [gid]
+    (note,) = restored.pop_recovery_notes()
+    assert note["backup"] and os.path.exists(note["moved_to"])
+    with open(note["moved_to"], "rb") as f:
+        assert f.read() == raw # Kept for inspection, never overwritten
+    restored.close()
+    # The restored file passes its checksum again
+    again = PlateDisciplineCalculator(data_file)
+    assert again.pop_recovery_notes() == [] and len(again.data["games"]) == 1
+    again.close()
+
+
+def test_damaged_json_file_without_backup_is_moved_aside(calc, data_file):
+    record(calc)
+    calc.close()
+    shutil.rmtree(os.path.join(os.path.dirname(data_file), "backups"), ignore_errors=True)
+    damage(data_file, b"not json")
+
+    fresh = PlateDisciplineCalculator(data_file)
+    assert fresh.data["games"] == []
+    (note,) = fresh.pop_recovery_notes()
+    assert note["backup"] is None and glob.glob(data_file + ".corrupt-*") == [note["moved_to"]]
+    fresh.close()
+
+
+@pytest.fixture
+def sharded(calc, tmp_path):
+    gid = record(calc)
+    start_game(calc, "Second", "Foes")
+    pitch(calc)
+    path = str(tmp_path / "shards")
+    calc.convert_storage(path)
+    assert calc.create_backup()
+    return calc, path, gid
+
+
+def test_damaged_shard_is_restored_when_the_game_loads(sharded):
+    calc, path, gid = sharded
+    shard = os.path.join(path, *calc.storage.shard_file(calc._games_by_id[gid]).split("/"))
+    calc.close()
+    damage(shard)
+
+    reopened = PlateDisciplineCalculator(path)
+    game = reopened._games_by_id[gid]
+    assert len(game["pitches"]) == 3
+    (note,) = reopened.pop_recovery_notes()
+    assert note["file"] == shard and os.path.exists(note["moved_to"])
+    reopened.close()
+
+
+@pytest.mark.parametrize("name", ["manifest.json", "players.json", "archives.json"])
+def test_damaged_manifest_or_side_file_is_restored(sharded, name):
+    calc, path, gid = sharded
+    players = sorted(calc.data["players"])
+    calc.close()
+    damage(os.path.join(path, name), b"\x00garbage")
+
+    reopened = PlateDisciplineCalculator(path)
+    assert gid in reopened._games_by_id and sorted(reopened.data["players"]) == players
+    assert [n["file"] for n in reopened.pop_recovery_notes()] == [os.path.join(path, name)]
+    reopened.close()
+
+
+def test_damaged_shard_without_backup_raises(calc, tmp_path):
+    gid = record(calc)
+    path = str(tmp_path / "shards")
+    calc.convert_storage(path)
+    shard = os.path.join(path, *calc.storage.shard_file(calc._games_by_id[gid]).split("/"))
+    calc.close()
+    damage(shard)
+
+    reopened = PlateDisciplineCalculator(path)
+    with pytest.raises(CorruptDataError):
+        reopened._games_by_id[gid].load()
+    reopened.close()
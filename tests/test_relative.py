@@ -0,0 +1,60 @@
+import pytest
+
+from helpers import start_game, pitch
+
+
+@pytest.fixture
+def season(calc):
+    """
+    Away1 and Away2 strike out looking, Away3 strikes out swinging, then Home1 walks:
+    13 pitches, 3 swings, all of them in the zone.
+    """
+    start_game(calc)
+    for _ in range(2):
+        for _ in range(3):
+            pitch(calc, "In", "Called Strike")
+    for _ in range(3):
+        pitch(calc, "In", "Swinging Strike")
+    for _ in range(4):
+        pitch(calc, "Out", "Ball")
+    return calc
+
+
+def test_league_rate_comes_from_summed_counters(season):
+    rel = season.get_relative_stats("batter", "2024")
+    assert rel["league"]["Swing%"] == pytest.approx(3 / 13 * 100)
+    assert rel["league"]["Zone%"] == pytest.approx(9 / 13 * 100)
+    assert rel["league"]["PA"] == 4 and rel["league"]["Pitches"] == 13
+
+
+def test_plus_is_relative_to_the_league(season):
+    plus = season.get_relative_stats("batter", "2024")["plus"]
+    assert plus["Away3"]["Swing%"] == pytest.approx(100 / (3 / 13 * 100) * 100)
+    assert plus["Away1"]["Swing%"] == 0
+    assert plus["Home1"]["Zone%"] == 0
+    # Nobody swung at a pitch out of the zone: no league rate to compare with
+    assert all(p["O-Contact%"] is None for p in plus.values())
+
+
+def test_percentiles_use_mid_ranks_for_ties(season):
+    rel = season.get_relative_stats("batter", "2024")
+    assert rel["qualified"] == 4
+    pct = {n: p["Swing%"] for n, p in rel["percentile"].items()}
+    # Swing% 0, 0, 0 (Away1, Away2, Home1) and 100 (Away3)
+    assert pct == {"Away1": 37.5, "Away2": 37.5, "Home1": 37.5, "Away3": 87.5}
+
+
+def test_thresholds_limit_who_is_ranked(season):
+    rel = season.get_relative_stats("batter", "2024", min_pitches=4)
+    assert rel["qualified"] == 1 and rel["percentile"] == {"Home1": {s: 50.0 for s in season.RATE_STATS}}
+    rel = season.get_relative_stats("batter", "2024", min_pa=2)
+    assert rel["qualified"] == 0 and rel["percentile"] == {}
+    # Everyone still gets plus values
+    assert set(rel["plus"]) == {"Away1", "Away2", "Away3", "Home1"}
+
+
+def test_empty_season_and_unknown_role(season):
+    rel = season.get_relative_stats("batter", "1999")
+    assert rel["qualified"] == 0 and rel["plus"] == {} and rel["league"]["Pitches"] == 0
+    with pytest.raises(ValueError):
+        season.get_relative_stats("fielder")
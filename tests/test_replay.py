@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+import replay
+from differential import play_game
+
+
+def full_replay(game, k):
+    """State before pitch k, replayed from the first pitch without any checkpoint."""
+    return replay.GameReplay(game, checkpoint_every=10 ** 9).state_at(k)
+
+
+@pytest.fixture
+def game(calc):
+    return play_game(calc, random.Random(3), "2024", max_pitches=150)
+
+
+def test_state_from_checkpoints_matches_a_full_replay(game):
+    n = len(game["pitches"])
+    rp = replay.GameReplay(game, checkpoint_every=7)
+    rng = random.Random(5)
+    # Random access, backwards as well, so later calls start from checkpoints earlier ones left
+    for k in rng.sample(range(n + 1), n + 1) + [n, 0, n // 2]:
+        assert rp.state_at(k) == full_replay(game, k), k
+    assert len(rp.checkpoints) == n // 7 + 1
+
+
+def test_rebuild_matches_the_stored_state(calc, game):
+    state, teams = replay.GameReplay(game, checkpoint_every=5).rebuild()
+    assert state == game["state"]
+    assert all(teams[side][key] == game["teams"][side][key] for side in ("home", "away") for key in ("lineup", "pitcher"))
+    assert calc.rebuild_state(game["id"]) == []
+
+    game["state"]["outs"] = (game["state"]["outs"] + 1) % 3
+    assert calc.rebuild_state(game["id"]) == ["outs"]
+    assert calc.rebuild_state(game["id"]) == []
+
+
+def test_invalidate_from_drops_checkpoints_after_an_edit(game):
+    rp = replay.GameReplay(game, checkpoint_every=5)
+    n = len(game["pitches"])
+    rp.state_at(n)
+    k = 23
+    game["pitches"][k]["result"] = "In Play (Out)" if game["pitches"][k]["result"] != "In Play (Out)" else "Ball"
+    # Without invalidation the checkpoints after k still describe the old pitch
+    assert any(rp.state_at(j) != full_replay(game, j) for j in range(k + 1, n + 1))
+
+    rp.invalidate_from(k)
+    assert max(rp.checkpoints) <= k
+    assert all(rp.state_at(j) == full_replay(game, j) for j in range(n + 1))
+
+
+def test_calculator_edits_invalidate_its_checkpoints(calc, game):
+    n = len(game["pitches"])
+    assert calc.get_state_at(n, game["id"])["inning"] == game["state"]["inning"] # Fills the checkpoints
+    for k, edit in ((40, lambda: calc.delete_pitch(40, game_id=game["id"])),
+                    (12, lambda: calc.insert_pitch(12, "In", "In Play (Out)", game_id=game["id"])),
+                    (3, lambda: calc.edit_pitch(3, result="Foul", game_id=game["id"]))):
+        edit()
+        for j in range(len(game["pitches"]) + 1):
+            state = calc.get_state_at(j, game["id"])
+            expected, teams = full_replay(game, j)
+            assert {key: state[key] for key in expected if key != "score"} == \
+                {key: v for key, v in expected.items() if key != "score"}, (k, j)
+            assert state["teams"] == teams
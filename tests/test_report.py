@@ -0,0 +1,77 @@
+import json
+import os
+
+import report
+from helpers import start_game, pitch
+
+
+def two_games(calc):
+    start_game(calc, season="2024")
+    pitch(calc, "Out", "Ball")
+    calc.close_game()
+    start_game(calc, home="Hawks", away="Lions", season="2024")
+    pitch(calc, "In", "Foul")
+    calc.close_game()
+
+
+def test_second_export_only_rewrites_changed_pages(calc, tmp_path):
+    out = str(tmp_path / "report")
+    two_games(calc)
+    first = calc.export_report(out, "2024")
+    assert first["written"] == first["pages"] and first["removed"] == 0
+    assert os.path.exists(os.path.join(out, report.page_path("player", "Away1")))
+
+    assert calc.export_report(out, "2024")["written"] == 0
+
+    # A pitch in the Home/Away game: the index and that game's teams and players change, the other game's do not
+    game = calc.get_games("2024")[0]
+    calc.load_game(game["id"])
+    pitch(calc, "In", "Called Strike")
+    again = calc.export_report(out, "2024")
+    assert 0 < again["written"] < first["pages"]
+    with open(os.path.join(out, report.MANIFEST), encoding="utf-8") as f:
+        assert set(json.load(f)["pages"]) == {p for p in _pages(out)}
+
+    assert calc.export_report(out, "2024", force=True)["written"] == first["pages"]
+
+
+def _pages(out):
+    for root, _dirs, files in os.walk(out):
+        for name in files:
+            if name.endswith(".html"):
+                yield os.path.relpath(os.path.join(root, name), out).replace(os.sep, "/")
+
+
+def test_merged_player_page_is_removed(calc, tmp_path):
+    out = str(tmp_path / "report")
+    two_games(calc)
+    calc.export_report(out, "2024")
+    old_page = os.path.join(out, report.page_path("player", "Away1"))
+    assert os.path.exists(old_page)
+
+    calc.merge_players({"Away1": "Merged"})
+    result = calc.export_report(out, "2024")
+    assert result["removed"] == 1
+    assert not os.path.exists(old_page)
+    with open(os.path.join(out, report.page_path("player", "Merged")), encoding="utf-8") as f:
+        assert "Merged" in f.read()
+
+
+def test_merged_player_page_is_removed_from_archived_season(calc, tmp_path):
+    out = str(tmp_path / "report")
+    two_games(calc)
+    calc.archive_season("2024")
+    calc.export_report(out, "2024")
+    assert ("Away", "Away1") in calc.get_zone_result_splits("batter", "2024")
+
+    calc.merge_players({"Away1": "Merged"})
+    splits = calc.get_zone_result_splits("batter", "2024")
+    assert ("Away", "Away1") not in splits and ("Away", "Merged") in splits
+    assert calc.export_report(out, "2024")["removed"] == 1
+    assert not os.path.exists(os.path.join(out, report.page_path("player", "Away1")))
+
+
+def test_split_svg_scales_circles_by_share():
+    svg = report.split_svg([["In", "Foul", 3], ["Out", "Ball", 1]])
+    assert svg.count("<circle") == 2
+    assert "75.0%" in svg and "25.0%" in svg
@@ -0,0 +1,39 @@
+import sequences
+from helpers import start_game, pitch
+
+
+def test_build_counts_transitions_and_ngrams_within_plate_appearances():
+    def p(batter, zone, result, first, balls=0, strikes=0):
+        return {"batter": batter, "pitcher": "P", "inning": 1, "is_top": True, "is_first_pitch": first,
+                "zone": zone, "result": result, "balls_before": balls, "strikes_before": strikes}
+    game = {"pitches": [
+        p("A", "Out", "Ball", True),
+        p("A", "In", "Called Strike", False, balls=1),
+        p("B", "In", "Foul", True)
+    ]}
+    tables = sequences.build([game])
+    a = tables["batter"]["A"]
+    # One transition inside A's plate appearance; none across to B
+    assert sum(tables["pitcher"]["P"]["transitions"].values()) == 1
+    (key,) = a["transitions"]
+    state, nxt = divmod(key, sequences.N_CODES)
+    assert sequences.decode_state(state) == (0, 0, "Out", "Ball")
+    assert sequences.decode_pitch(nxt) == ("In", "Called Strike")
+    runs = {sequences.decode_ngram(k): n for k, n in a["ngrams"].items()}
+    ball, strike = sequences.pitch_code("Out", "Ball"), sequences.pitch_code("In", "Called Strike")
+    assert runs == {(ball,): 1, (strike,): 1, (ball, strike): 1}
+
+
+def test_transitions_follow_player_merge_in_archived_season(calc):
+    start_game(calc, season="2024")
+    for _ in range(3):
+        pitch(calc, "Out", "Ball")
+    calc.close_game()
+    calc.archive_season("2024")
+    assert calc.get_transition_stats("batter", "Away1")[("Out", "Ball")]["Next"] == 2
+
+    calc.merge_players({"Away1": "Merged"})
+    assert calc.get_transition_stats("batter", "Away1") == {}
+    assert calc.get_transition_stats("batter", "Merged")[("Out", "Ball")]["Next"] == 2
+    top = calc.get_sequence_frequencies("batter", "Merged", n=3)
+    assert top[0]["count"] == 1
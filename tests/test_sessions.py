@@ -0,0 +1,76 @@
+from helpers import start_game, pitch
+from plate_discipline import PlateDisciplineCalculator
+from sessions import SessionManager
+
+
+def test_session_manager_open_close_and_replace():
+    a, b, c = {"id": "a"}, {"id": "b"}, {"id": "c"}
+    sessions = SessionManager()
+    for g in (a, b, c):
+        sessions.open(g)
+    sessions.get("a").history.append("snapshot")
+    assert sessions.open(a).history == ["snapshot"] # Reopening only switches
+    assert sessions.active.game is a
+
+    sessions.close("a")
+    assert sessions.active.game is c # Most recently opened remaining session
+    sessions.close("b")
+    assert [s.game for s in sessions] == [c] and len(sessions) == 1
+
+    c2 = {"id": "c"}
+    sessions.get("c").history.append("snapshot")
+    sessions.replace(c, c2)
+    assert sessions.active.game is c2 and sessions.active.history == []
+    sessions.close("missing")
+    assert len(sessions) == 1
+
+
+def test_undo_history_is_kept_per_game(calc):
+    first = start_game(calc, "First", "Foes")
+    pitch(calc, "Out", "Ball")
+    pitch(calc, "Out", "Ball")
+    second = start_game(calc, "Second", "Rivals")
+    pitch(calc, "In", "Foul")
+
+    assert [(g["id"], g["undo"], g["active"]) for g in calc.get_open_games()] == \
+        [(first["id"], 2, False), (second["id"], 1, True)]
+    assert calc.switch_game(first["id"])
+    assert calc.undo()
+    assert [p["result"] for p in first["pitches"]] == ["Ball"]
+    assert [p["result"] for p in second["pitches"]] == ["Foul"]
+
+    assert calc.switch_game(second["id"])
+    assert calc.undo() and not calc.undo()
+    assert second["pitches"] == [] and calc.current_game is second
+
+
+def test_pitches_go_to_the_active_game_and_reach_disk_together(calc, data_file):
+    first = start_game(calc, "First", "Foes")
+    second = start_game(calc, "Second", "Rivals")
+    saves = []
+    save = calc.storage.save
+    calc.storage.save = lambda data, games=None: saves.append([g["id"] for g in games]) or save(data, games)
+    with calc.deferred_saves():
+        pitch(calc)
+        calc.switch_game(first["id"])
+        pitch(calc, "Out", "Ball")
+    calc.flush()
+    assert len(first["pitches"]) == len(second["pitches"]) == 1
+    assert [sorted(ids) for ids in saves] == [sorted([first["id"], second["id"]])]
+
+    reloaded = PlateDisciplineCalculator(data_file)
+    assert [len(g["pitches"]) for g in reloaded.data["games"]] == [1, 1]
+    assert reloaded.current_game is None
+    reloaded.close()
+
+
+def test_closing_a_game_keeps_it_saved(calc):
+    first = start_game(calc, "First", "Foes")
+    second = start_game(calc, "Second", "Rivals")
+    calc.close_game()
+    assert calc.current_game is first
+    assert not calc.switch_game(second["id"])
+    assert calc.load_game(second["id"]) and calc.current_game is second
+    assert calc.history == []
+    calc.close_game(first["id"])
+    assert [g["id"] for g in calc.get_open_games()] == [second["id"]]
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import diagnostics
+import storage
+from diagnostics import Diagnostics
+from helpers import start_game, strikeout
+from plate_discipline import PlateDisciplineCalculator
+
+
+def test_only_the_first_mark_of_a_milestone_counts(monkeypatch, tmp_path):
+    monkeypatch.setattr(diagnostics, "PROCESS_START", time.time() - 2)
+    d = Diagnostics()
+    d.mark("First frame")
+    d.mark("Data loaded")
+    first = d.get_startup()
+    d.mark("First frame")
+    assert d.get_startup() == first
+    assert [name for name, _ in first] == ["First frame", "Data loaded"]
+    assert 2 <= first[0][1] <= first[1][1] < 60
+
+    path = tmp_path / "diag.json"
+    d.dump(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["startup_s"] == dict(first)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="reads the launch time from /proc")
+def test_launch_time_is_read_from_the_process():
+    started = diagnostics.process_start_time()
+    # This interpreter (and pytest's own startup) began a little before now
+    assert started is not None and time.time() - 600 < started <= time.time()
+    assert diagnostics.PROCESS_START <= time.time()
+
+
+def test_calculator_loads_the_data_once(data_file, monkeypatch):
+    c = PlateDisciplineCalculator(data_file)
+    start_game(c)
+    strikeout(c)
+    c.close()
+
+    loads = []
+    original = storage.JsonStorage.load
+    monkeypatch.setattr(storage.JsonStorage, "load", lambda self: loads.append(1) or original(self))
+    reopened = PlateDisciplineCalculator(data_file)
+    try:
+        assert len(loads) == 1 and len(reopened.get_games()) == 1
+    finally:
+        reopened.close()
+
+
+def test_heavy_modules_stay_off_the_startup_path():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import sys, plate_discipline; "
+            "print(sorted(m for m in ('report', 'concurrent.futures', 'multiprocessing', 'cProfile', 'pstats') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+
+from helpers import start_game, pitch, strikeout
+from storage import MANIFEST_NAME, SIDE_FILES, BackgroundSaver, ShardedStorage, _encode_json, _write_json_atomic
+
+
+def hold_writes(calc):
+    """Make the writer thread wait on the returned event; returns (event, list the written data is encoded into)."""
+    release = threading.Event()
+    written = []
+    save = calc.storage.save
+
+    def held(data, games=None):
+        release.wait(5)
+        written.append(json.loads(_encode_json(data)))
+        save(data, games)
+
+    calc.storage.save = held
+    return release, written
+
+
+def test_background_flush_writes_the_state_at_flush_time(calc):
+    finished = start_game(calc, "Old", "Foes")
+    strikeout(calc)
+    live = start_game(calc)
+    with calc.deferred_saves():
+        pitch(calc, "Out", "Ball")
+    release, written = hold_writes(calc)
+    calc.flush(background=True)
+
+    # The UI thread keeps changing data while the save is queued: a game that was not
+    # dirty, the live game and nested top-level containers
+    finished["teams"]["home"]["name"] = "Renamed"
+    live["pitches"].clear()
+    calc.data["player_recent"]["Home1"]["team"] = "Elsewhere"
+    calc.data["players"].append("Late")
+    release.set()
+    calc.flush()
+
+    saved = written[0]
+    old = next(g for g in saved["games"] if g["id"] == finished["id"])
+    assert old["teams"]["home"]["name"] == "Old"
+    assert len(next(g for g in saved["games"] if g["id"] == live["id"])["pitches"]) == 1
+    assert saved["player_recent"]["Home1"]["team"] == "Home"
+    assert "Late" not in saved["players"]
+
+
+def test_snapshot_copies_only_games_changed_since_the_last_flush(calc):
+    start_game(calc, "Old", "Foes")
+    strikeout(calc)
+    start_game(calc)
+    with calc.deferred_saves():
+        pitch(calc)
+    calc.flush(background=True)
+    calc.flush()
+    first = {gid: hit[2] for gid, hit in calc._saved_copies.items()}
+
+    with calc.deferred_saves():
+        pitch(calc)
+    calc.flush(background=True)
+    calc.flush()
+    current = calc.current_game["id"]
+    for gid, hit in calc._saved_copies.items():
+        assert (hit[2] is first[gid]) == (gid != current)
+
+
+def test_background_flush_keeps_unloaded_shards_unloaded(tmp_path):
+    from plate_discipline import PlateDisciplineCalculator
+    path = str(tmp_path / "shards")
+    calc = PlateDisciplineCalculator(path)
+    start_game(calc, "Old", "Foes")
+    strikeout(calc)
+    calc.close()
+
+    calc = PlateDisciplineCalculator(path)
+    assert isinstance(calc.storage, ShardedStorage)
+    old = calc.data["games"][0]
+    start_game(calc)
+    with calc.deferred_saves():
+        pitch(calc)
+    calc.flush(background=True)
+    calc.close()
+    assert not old.loaded
+
+    reloaded = PlateDisciplineCalculator(path)
+    assert [g["teams"]["home"]["name"] for g in reloaded.data["games"]] == ["Old", "Home"]
+    assert len(reloaded.data["games"][1]["pitches"]) == 1
+    reloaded.close()
+
+
+def written_names(storage):
+    """Record the names of the files every save of a sharded storage writes."""
+    names = []
+    write = storage._write_files
+
+    def spy(files):
+        names.extend(rel for rel, _raw in files)
+        write(files)
+
+    storage._write_files = spy
+    return names
+
+
+def test_manifest_holds_only_the_game_index(calc, tmp_path):
+    start_game(calc, season="2023")
+    strikeout(calc)
+    calc.archive_season("2023")
+    start_game(calc)
+    strikeout(calc)
+    calc.data["saved_lineups"] = {"Home": ["Home1"]}
+    calc.save_data([])
+    path = str(tmp_path / "shards")
+    calc.convert_storage(path)
+    expected = json.loads(_encode_json({k: v for k, v in calc.data.items() if k != "games"}))
+
+    with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+        assert set(json.load(f)) == {"format", "format_version", "games"}
+    with open(os.path.join(path, "archives.json"), encoding="utf-8") as f:
+        assert json.load(f) == {"archives": expected["archives"]}
+
+    storage = ShardedStorage(path)
+    loaded = storage.load()
+    assert json.loads(_encode_json({k: v for k, v in loaded.items() if k != "games"})) == expected
+    assert [g["id"] for g in loaded["games"]] == [g["id"] for g in calc.data["games"]]
+
+
+def test_pitch_save_leaves_archives_and_manifest_alone(calc, tmp_path):
+    start_game(calc, season="2023")
+    strikeout(calc)
+    calc.archive_season("2023")
+    start_game(calc)
+    calc.convert_storage(str(tmp_path / "shards"))
+    names = written_names(calc.storage)
+
+    pitch(calc)
+    assert names == [calc.storage.shard_file(calc.current_game)]
+
+    calc.archive_season("2024")
+    assert "archives.json" in names and MANIFEST_NAME in names
+
+
+def test_old_manifest_with_every_key_still_loads(tmp_path):
+    path = str(tmp_path / "shards")
+    os.makedirs(path)
+    _write_json_atomic(os.path.join(path, MANIFEST_NAME), {
+        "format": "sharded", "format_version": 1, "games": [],
+        "players": ["A"], "archives": {}, "sync": {"unexported": [], "deleted": {}}, "saved_lineups": {"X": []}
+    }, indent=1)
+    storage = ShardedStorage(path)
+    data = storage.load()
+    assert data["players"] == ["A"] and data["saved_lineups"] == {"X": []}
+
+    storage.save(data)
+    with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+        assert set(json.load(f)) == {"format", "format_version", "games"}
+    assert all(os.path.exists(os.path.join(path, name)) for name in SIDE_FILES)
+    assert ShardedStorage(path).load() == data
+
+
+def test_submit_while_the_idle_writer_exits_is_written():
+    written = []
+    saver = BackgroundSaver(lambda data, games: written.append(data))
+    saver.IDLE_TIMEOUT = 0.01
+    run = saver._run
+    exited = threading.Event()
+
+    def run_then_submit():
+        run()
+        if not exited.is_set():
+            exited.set()
+            saver.submit("late", []) # This thread has left its loop but is still alive
+
+    saver._run = run_then_submit
+    saver.submit("first", [])
+    assert exited.wait(5)
+    waiter = threading.Thread(target=saver.wait, daemon=True)
+    waiter.start()
+    waiter.join(5)
+    assert not waiter.is_alive() and written == ["first", "late"]
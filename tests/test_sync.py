@@ -0,0 +1,119 @@
+import pytest
+
+import sync
+from helpers import start_game, pitch, strikeout
+from plate_discipline import PlateDisciplineCalculator
+
+
+@pytest.fixture
+def machines(tmp_path):
+    """Two scoring machines: calculators with their own data files."""
+    for name in "ab":
+        (tmp_path / name).mkdir()
+    a = PlateDisciplineCalculator(str(tmp_path / "a" / "data.json"))
+    b = PlateDisciplineCalculator(str(tmp_path / "b" / "data.json"))
+    yield a, b
+    a.close()
+    b.close()
+
+
+def transfer(src, dst, path, resolve=None):
+    src.export_changeset(str(path))
+    return dst.import_changeset(str(path), resolve=resolve)
+
+
+def pitch_results(calc, game_id):
+    return [p["result"] for p in calc._games_by_id[game_id]["pitches"]]
+
+
+def test_compare_and_merge_version_vectors():
+    assert sync.compare({"a": 2}, {"a": 1}) == sync.NEWER
+    assert sync.compare({"a": 1}, {"a": 1, "b": 1}) == sync.OLDER
+    assert sync.compare({"a": 2}, {"a": 1, "b": 1}) == sync.CONCURRENT
+    assert sync.compare({}, {}) == sync.EQUAL
+    assert sync.merged({"a": 2, "b": 1}, {"b": 3}) == {"a": 2, "b": 3}
+
+
+def test_export_sends_only_unexported_games(machines, tmp_path):
+    a, b = machines
+    game = start_game(a)
+    strikeout(a)
+    report = transfer(a, b, tmp_path / "1.json.gz")
+    assert report["added"] == 1 and pitch_results(b, game["id"]) == pitch_results(a, game["id"])
+    assert a.get_unexported_count() == 0
+
+    assert transfer(a, b, tmp_path / "2.json")["added"] == 0
+    pitch(a, "Out", "Ball")
+    report = transfer(a, b, tmp_path / "3.json")
+    assert report["updated"] == 1 and pitch_results(b, game["id"])[-1] == "Ball"
+    # Importing the same changeset again changes nothing
+    assert b.import_changeset(str(tmp_path / "3.json"))["unchanged"] == 1
+
+
+def edit_on_both(a, b, tmp_path):
+    game = start_game(a)
+    pitch(a)
+    transfer(a, b, tmp_path / "base.json")
+    pitch(a, "Out", "Ball")
+    b.load_game(game["id"])
+    pitch(b, "In", "Swinging Strike")
+    return game["id"]
+
+
+def test_concurrent_edits_are_reported_as_conflicts(machines, tmp_path):
+    a, b = machines
+    gid = edit_on_both(a, b, tmp_path)
+    report = transfer(a, b, tmp_path / "c.json")
+    assert [c["id"] for c in report["conflicts"]] == [gid]
+    assert pitch_results(b, gid)[-1] == "Swinging Strike"
+
+
+@pytest.mark.parametrize("resolve, last", [("theirs", "Ball"), ("mine", "Swinging Strike")])
+def test_resolved_conflict_supersedes_both_copies(machines, tmp_path, resolve, last):
+    a, b = machines
+    gid = edit_on_both(a, b, tmp_path)
+    report = transfer(a, b, tmp_path / "c.json", resolve=resolve)
+    assert report["conflicts"] == []
+    assert pitch_results(b, gid)[-1] == last
+
+    # The settled copy is newer than both, so it flows back to A without a conflict
+    report = transfer(b, a, tmp_path / "back.json")
+    assert report["conflicts"] == [] and report["updated"] == 1
+    assert pitch_results(a, gid) == pitch_results(b, gid)
+
+
+def test_deletions_travel_as_tombstones(machines, tmp_path):
+    a, b = machines
+    game = start_game(a)
+    pitch(a)
+    transfer(a, b, tmp_path / "1.json")
+    a.delete_game(game["id"])
+    assert transfer(a, b, tmp_path / "2.json")["deleted"] == 1
+    assert game["id"] not in b._games_by_id
+    # The old changeset does not bring the game back
+    assert b.import_changeset(str(tmp_path / "1.json"))["unchanged"] == 1
+    assert game["id"] not in b._games_by_id
+
+
+def test_player_registry_is_merged(machines, tmp_path):
+    a, b = machines
+    start_game(a)
+    b.add_player("Bonly")
+    transfer(a, b, tmp_path / "1.json")
+    assert {"Home1", "Away9", "Bonly"} <= set(b.data["players"])
+
+
+@pytest.mark.parametrize("edit", [False, True])
+def test_undo_after_an_export_reaches_the_other_machine(machines, tmp_path, edit):
+    a, b = machines
+    game = start_game(a)
+    pitch(a)
+    pitch(a, "Out", "Ball")
+    if edit:
+        a.edit_pitch(0, result="Foul")
+    transfer(a, b, tmp_path / "1.json")
+
+    assert a.undo()
+    report = transfer(a, b, tmp_path / "2.json")
+    assert report["updated"] == 1 and report["conflicts"] == []
+    assert pitch_results(b, game["id"]) == pitch_results(a, game["id"])